@@ -1,3 +1,14 @@
-from beancounter.basics.account import Account, Logbook
+from beancounter.basics.account import Account, Logbook, LogbookSubscriber
+from beancounter.basics.concurrent import ConcurrentLogbook
+from beancounter.basics.query import Query
 from beancounter.basics.transaction import Bill, Deposit, Transfer, TransferOut, TransferIn
-from beancounter.budget.plans import PlannedBill
+from beancounter.basics.money import Money
+from beancounter.basics.fx import RateTable
+from beancounter.basics.instrumentation import Instrumentation
+from beancounter.budget.plans import PlannedBill, PlannedIncome, PlannedTransfer, Budget
+from beancounter.budget.forecast import Forecast
+from beancounter.budget.reports import AccountReport, TotalReport
+from beancounter.budget.categories import Category, CategoryTree, CategoryTotals
+from beancounter.budget.variance import VarianceReport
+from beancounter.basics.storage import ColumnarStore
+from beancounter.basics.reconcile import Reconciler
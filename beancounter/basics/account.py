@@ -1,38 +1,125 @@
+from datetime import date
 from decimal import Decimal
+from beancounter.basics.index import DateIndex, PendingIndex, fork_index
+from beancounter.basics.money import Money
+from beancounter.basics.query import Query, TransactionIndex
+from beancounter.basics.storage import ForkedStore
 from beancounter.basics.transaction import Deposit, Bill, Transfer
 
 
 class Account:
     """
     Represents an account (a place to keep cash)
+
+    An account opened with a Money balance is Money-denominated: its transactions must have
+    Money amounts in the same currency, and it keeps balances as integer minor units, only
+    converting them to Money when returned.
     """
 
-    def __init__(self, name, balance=Decimal('0.00')):
+    def __init__(self, name, balance=Decimal('0.00'), logbook=None):
+        """
+        Constructor
+        :param name: account name
+        :param balance: initial balance
+        :param logbook: Logbook the account belongs to, notified when operations get recorded
+        """
         self._name = name
-        self._balance = balance
-        self._recorded_balance = balance
+        self._logbook = logbook
+        self._money = type(balance) is Money
+        self._currency = balance.currency() if self._money else None
+        self._balance = balance.units() if self._money else balance
+        self._recorded_balance = self._balance
         self._initial_balance = self._balance
+        self._history = DateIndex()
+        self._recorded_history = DateIndex()
+        # Stores that index unrecorded operations keep the pending ones of their Logbook's
+        # accounts.
+        pending_index = getattr(getattr(logbook, '_transactions', None), 'pending_index', None)
+        self._pending = pending_index(self) if pending_index else PendingIndex(self.amount_of(0))
 
     def name(self):
         """Returns Account name"""
         return self._name
 
+    def currency(self):
+        """Returns the currency of a Money-denominated account, None for other accounts"""
+        return self._currency
+
     def balance(self):
         """Returns the current balance"""
-        return self._balance
+        return self._amount(self._balance)
+
+    def initial_balance(self):
+        """Returns the balance the account was opened with"""
+        return self._amount(self._initial_balance)
 
     def recorded_balance(self):
         """
         Recorded balance - a balance of an account that includes only recorded transactions
         """
-        return self._recorded_balance
+        return self._amount(self._recorded_balance)
+
+    def balance_at(self, on):
+        """
+        Returns the balance at the end of a given day, including operations dated on or before it
+        """
+        return self._amount(self._initial_balance + self._history.total_until(on))
+
+    def recorded_balance_at(self, on):
+        """
+        Returns the recorded balance at the end of a given day, including operations recorded on
+        or before it
+        """
+        return self._amount(self._initial_balance + self._recorded_history.total_until(on))
+
+    def to_amount(self, value):
+        """
+        Converts a Decimal (or int) to an amount of this account: Money in its currency for
+        Money-denominated accounts, the value itself for others
+        """
+        return Money(value, self._currency) if self._money else value
+
+    def amount_of(self, units, places=2):
+        """
+        Converts an integer number of minor units to an amount of this account
+        """
+        if self._money and places == Money.PLACES:
+            return Money.from_units(units, self._currency)
+        return self.to_amount(Decimal(units).scaleb(-places))
+
+    def _amount(self, value):
+        return Money.from_units(value, self._currency) if self._money else value
+
+    def changes_between(self, start, end, recorded=False):
+        """
+        Returns a list of (date ordinal, total balance change) pairs for days between start and
+        end (both inclusive, open-ended if None) with operations dated on them, in date order
+        :param recorded: use operations recorded on the days instead
+        """
+        history = self._recorded_history if recorded else self._history
+        if self._money:
+            return [(day, Money.from_units(units, self._currency))
+                    for day, units in history.items(start, end)]
+        return history.items(start, end)
+
+    def _fork(self, logbook):
+        """
+        Returns a copy of the account for a forked Logbook, sharing its history. Its pending
+        operations are set by the Logbook, once copied onto the forked accounts.
+        """
+        account = type(self).__new__(type(self))
+        account.__dict__.update(self.__dict__)
+        account._logbook = logbook
+        self._history, account._history = fork_index(self._history)
+        self._recorded_history, account._recorded_history = fork_index(self._recorded_history)
+        return account
 
     def __str__(self):
         return "Account('{name}')".format(name=self._name)
 
     def __repr__(self):
         return "Account('{name}', balance={balance})".format(
-            name=self._name, balance=repr(self._balance)
+            name=self._name, balance=repr(self.balance())
         )
 
     def enter(self, operation):
@@ -40,14 +127,93 @@ class Account:
         Registers an operation, updating the account balance
         :param operation:
         """
-        self._balance += operation.balance_change()
+        change = operation.balance_units() if self._money else operation.balance_change()
+        self._balance += change
+        self._history.add(operation.date(), change)
+        self._pending.add(operation)
+
+    def enter_changes(self, changes, operations=()):
+        """
+        Registers a batch of balance changes, updating the account balance once
+        :param changes: dict of total balance changes per day, in minor units for
+                        Money-denominated accounts
+        :param operations: all operations making up the changes, indexed if not recorded yet
+        """
+        for day, change in changes.items():
+            self._history.add(day, change)
+        self._balance += sum(changes.values())
+        self._pending.extend(operations)
+
+    def record_changes(self, changes, operations=()):
+        """
+        Registers a batch of recorded balance changes, updating the recorded balance once
+        :param changes: dict of total recorded balance changes per day, in minor units for
+                        Money-denominated accounts
+        :param operations: the recorded operations making up the changes
+        """
+        for day, change in changes.items():
+            self._recorded_history.add(day, change)
+        self._recorded_balance += sum(changes.values())
+        for operation in operations:
+            self._pending.discard(operation)
 
-    def record(self, operation):
+    def record(self, operation, recorded=None):
         """
         Registers an operation, updating the account balance
         :param operation:
+        :param recorded: date to record the operation on (see Operation.record()), None if
+                         it is recorded already
+        :raises ValueError: if recorded is given and the operation is recorded already
         """
-        self._recorded_balance += operation.balance_change()
+        if recorded is not None:
+            if operation._recorded:
+                raise ValueError('This operation has already been recorded.')
+            if self._logbook is not None:
+                self._logbook._recording(operation)
+            operation._recorded = recorded
+        change = operation.balance_units() if self._money else operation.balance_change()
+        self._recorded_balance += change
+        self._recorded_history.add(operation.recorded(), change)
+        self._pending.discard(operation)
+        if self._logbook is not None:
+            self._logbook._recorded(operation)
+
+
+_ROW_TYPES = {'deposit': Deposit, 'bill': Bill, 'transfer': Transfer}
+
+
+class LogbookSubscriber:
+    """
+    Base class for objects notified of changes to a Logbook (see Logbook.subscribe()).
+    """
+
+    def account_added(self, account):
+        """Called after an account was added to the Logbook."""
+        pass
+
+    def entering(self, transaction):
+        """Called before a transaction is entered into the Logbook."""
+        pass
+
+    def entered(self, transaction):
+        """Called after a transaction was entered into the Logbook."""
+        pass
+
+    def rejected(self, transaction):
+        """Called instead of entered() when the Logbook's storage rejected a transaction."""
+        pass
+
+    def recording(self, operation):
+        """Called before an operation on one of the Logbook's accounts is recorded."""
+        pass
+
+    def recorded(self, operation):
+        """Called after an operation on one of the Logbook's accounts was recorded."""
+        pass
+
+    def categorized(self, transaction):
+        """Called after the category of a transaction of the Logbook was changed."""
+        pass
 
 
 class Logbook:
@@ -55,12 +221,18 @@ class Logbook:
     Container class for all accounts, transactions and budget.
     """
 
-    def __init__(self):
+    # Class of the accounts opened by add_account().
+    _account_type = Account
+
+    def __init__(self, store=None):
         """
         Constructor. Returns a new Logbook object.
+        :param store: transaction storage, a plain list (the fastest to enter into) if None
         """
         self._accounts = []
-        self._transactions = []
+        self._transactions = store if store is not None else []
+        self._subscribers = []
+        self._index = None
 
     def accounts(self):
         return self._accounts
@@ -68,35 +240,191 @@ class Logbook:
     def transactions(self):
         return self._transactions
 
-    def add_account(self, name, balance=Decimal('0.00')):
+    def query(self):
         """
-        TODO: docstring :-)
+        Returns a Query over all transactions of the Logbook, to be narrowed down with filters.
+        """
+        return Query(self)
+
+    def _transaction_index(self):
+        if self._index is None:
+            self._index = TransactionIndex(self._transactions)
+        self._index.update()
+        return self._index
+
+    def subscribe(self, subscriber):
+        """
+        Registers a LogbookSubscriber, notified before and after every change to the Logbook.
+        """
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """
+        Removes a subscriber registered with subscribe().
+        """
+        self._subscribers.remove(subscriber)
+
+    def save(self, path):
+        """
+        Saves the Logbook to a compact binary file (see beancounter.io.binary).
+        """
+        from beancounter.io import binary
+        binary.save(self, path)
+
+    @staticmethod
+    def load(path):
+        """
+        Loads a Logbook saved with save(). Transactions are memory-mapped and materialised lazily.
+        """
+        from beancounter.io import binary
+        return binary.load(path)
+
+    def replay(self, processes=None):
         """
-        account = Account(name, balance=balance)
+        Recomputes the balances of all accounts from the transactions, in parallel processes
+        (see beancounter.basics.replay).
+        :param processes: number of worker processes, os.cpu_count() if None
+        :return: dict of (balance, recorded balance) pairs by account
+        """
+        from beancounter.basics import replay
+        return replay.replay(self, processes)
+
+    def verify(self, processes=None):
+        """
+        Checks the balances of all accounts against a replay of the transactions.
+        :param processes: number of worker processes, os.cpu_count() if None
+        :return: dict of replayed (balance, recorded balance) pairs of accounts that do not
+                 match, empty if all of them do
+        """
+        from beancounter.basics import replay
+        return replay.verify(self, processes)
+
+    def fork(self):
+        """
+        Returns a copy-on-write fork of the Logbook, e.g. to try out a budget scenario.
+
+        The fork has its own copies of the accounts (in the same order) and shares the
+        transactions entered so far and the accounts' history with this Logbook, without
+        copying them: each side keeps its later changes in its own layer. Transactions entered
+        into either Logbook afterwards are not seen by the other. The fork reads the shared
+        transactions as copies on its own accounts, so operations recorded on either side are
+        not recorded on the other.
+        :return: a Logbook, forking costs O(accounts + pending operations)
+        """
+        return self._fork(read_only=False)
+
+    def snapshot(self):
+        """
+        Returns an immutable fork of the Logbook (see fork()): its balances stay as they are now,
+        and transactions cannot be entered into it.
+        """
+        return self._fork(read_only=True)
+
+    def _new_fork(self):
+        """
+        Returns an empty Logbook of the same kind, to become a fork of this one.
+        """
+        return type(self)()
+
+    def _fork(self, read_only):
+        fork = self._new_fork()
+        accounts = {account: account._fork(fork) for account in self._accounts}
+        fork._accounts = list(accounts.values())
+        fork._transactions = store = ForkedStore(self._transactions, len(self._transactions),
+                                                 read_only, accounts)
+        for account, forked in accounts.items():
+            forked._pending = account._pending.copy(store.fork_operation)
+        return fork
+
+    def pending(self, account):
+        """
+        Returns a list of operations on an account entered, but not yet recorded, in the order
+        they were entered.
+        """
+        return list(account._pending)
+
+    def pending_total(self, account):
+        """
+        Returns the total balance change of operations on an account not yet recorded.
+        """
+        return account._pending.total()
+
+    def pending_aging(self, account, on, limits=(30, 60, 90)):
+        """
+        Returns total balance changes of operations on an account not yet recorded, grouped by
+        their age at a given day.
+        :param limits: ascending ages in days separating the groups
+        :return: list of len(limits) + 1 totals, from the youngest operations to the oldest
+        """
+        return account._pending.aging(on, limits)
+
+    def balances_at(self, on):
+        """
+        Returns a dict of balances of all accounts at the end of a given day.
+        """
+        return {account: account.balance_at(on) for account in self._accounts}
+
+    def net_worth(self, rates, on=None):
+        """
+        Returns the total balance of all accounts, in the base currency of a RateTable.
+
+        Balances are totalled per currency first, so each currency is converted once. Accounts
+        without a currency are taken as being in the base currency.
+        :param rates: RateTable
+        :param on: the date of the balances and rates, current balances and today's rates if None
+        :return: Money in the base currency
+        """
+        totals = {}
+        for account in self._accounts:
+            balance = account.balance() if on is None else account.balance_at(on)
+            currency = account.currency()
+            totals[currency] = totals[currency] + balance if currency in totals else balance
+        on = on if on is not None else date.today()
+        net_worth = Money(0, rates.base())
+        for currency, total in totals.items():
+            if currency is None:
+                net_worth += total.decimal() if isinstance(total, Money) else total
+            else:
+                net_worth += rates.convert(total, on)
+        return net_worth
+
+    def add_account(self, name, balance=Decimal('0.00'), currency=None):
+        """
+        Opens a new account in the Logbook.
+        :param name: account name
+        :param balance: initial balance
+        :param currency: currency code; if given, the account is Money-denominated
+        """
+        if currency is not None:
+            balance = Money(balance, currency) if type(balance) is not Money else balance
+        account = self._account_type(name, balance=balance, logbook=self)
         self._accounts.append(account)
+        for subscriber in self._subscribers:
+            subscriber.account_added(account)
         return account
 
-    def deposit(self, account, amount, tx_date, entered=None, recorded=None):
+    def deposit(self, account, amount, tx_date, entered=None, recorded=None, category=None):
         """
         Enters a deposit to an account into the log.
         """
-        deposit = Deposit(account, amount, tx_date, entered)
+        deposit = Deposit(account, amount, tx_date, entered, category)
         self.enter(deposit)
         return deposit
 
-    def bill(self, account, amount, tx_date, entered=None, recorded=None):
+    def bill(self, account, amount, tx_date, entered=None, recorded=None, category=None):
         """
         Enters a deposit to an account into the log.
         """
-        bill = Bill(account, amount, tx_date, entered)
+        bill = Bill(account, amount, tx_date, entered, category)
         self.enter(bill)
         return bill
 
-    def transfer(self, account_from, account_to, amount, tx_date, entered=None, recorded=None):
+    def transfer(self, account_from, account_to, amount, tx_date, entered=None, recorded=None,
+                 amount_in=None):
         """
         Enters a deposit to an account into the log.
         """
-        transfer = Transfer(account_from, account_to, amount, tx_date, entered)
+        transfer = Transfer(account_from, account_to, amount, tx_date, entered, amount_in)
         self.enter(transfer)
         return transfer
 
@@ -104,7 +432,155 @@ class Logbook:
         """
         Enters a transaction into the log.
         """
-        self._transactions.append(transaction)
+        for subscriber in self._subscribers:
+            subscriber.entering(transaction)
+        try:
+            self._transactions.append(transaction)
+        except Exception:
+            self._rejected((transaction,))
+            raise
         for operation in transaction.operations():
             operation.account().enter(operation)
+        for subscriber in self._subscribers:
+            subscriber.entered(transaction)
         return self
+
+    def enter_many(self, transactions):
+        """
+        Enters a batch of transactions into the log.
+
+        The whole batch is validated first and nothing is entered if any transaction is invalid.
+        Balance changes are aggregated per account and applied once.
+        :param transactions: iterable of transactions
+        :raises ValueError: if a transaction is invalid
+        """
+        transactions = list(transactions)
+        changes = {id(account): ({}, [], account._money) for account in self._accounts}
+        for transaction in transactions:
+            day = transaction.date()
+            if not isinstance(day, date) or not isinstance(transaction.entered(), date):
+                raise ValueError('Transaction dates must be dates.')
+            for operation in transaction.operations():
+                account_changes = changes.get(id(operation.account()))
+                if account_changes is None:
+                    raise ValueError('{account} does not belong to this Logbook.'.format(
+                        account=operation.account()))
+                account_changes, operations, money = account_changes
+                operations.append(operation)
+                change = operation.balance_units() if money else operation.balance_change()
+                if day in account_changes:
+                    account_changes[day] += change
+                else:
+                    account_changes[day] = change
+
+        for subscriber in self._subscribers:
+            for transaction in transactions:
+                subscriber.entering(transaction)
+        try:
+            self._transactions.extend(transactions)
+        except Exception:
+            self._rejected(transactions)
+            raise
+        for account in self._accounts:
+            account_changes, operations, _ = changes[id(account)]
+            if account_changes:
+                account.enter_changes(account_changes, operations)
+        for subscriber in self._subscribers:
+            for transaction in transactions:
+                subscriber.entered(transaction)
+        return self
+
+    def _rejected(self, transactions):
+        for subscriber in self._subscribers:
+            for transaction in transactions:
+                subscriber.rejected(transaction)
+
+    def enter_rows(self, rows):
+        """
+        Builds transactions from tuples and enters them as a single batch (see enter_many()).
+        :param rows: iterable of ('deposit' or 'bill', account, amount, tx_date[, entered]) and
+                     ('transfer', account_from, account_to, amount, tx_date[, entered]) tuples
+        :return: list of entered transactions
+        :raises ValueError: if a row is invalid
+        """
+        transactions = []
+        for row in rows:
+            transaction_type = _ROW_TYPES.get(row[0])
+            if transaction_type is None:
+                raise ValueError('Unknown transaction type: {type!r}.'.format(type=row[0]))
+            try:
+                transactions.append(transaction_type(*row[1:]))
+            except TypeError:
+                raise ValueError('Invalid {type} row: {row!r}.'.format(type=row[0], row=row))
+        self.enter_many(transactions)
+        return transactions
+
+    def record_many(self, operations):
+        """
+        Records a batch of operations.
+
+        The whole batch is validated first and nothing is recorded if any operation is invalid.
+        Recorded balance changes are aggregated per account and applied once.
+        :param operations: iterable of (operation, recorded date) pairs
+        :raises ValueError: if an operation is invalid
+        """
+        operations = list(operations)
+        changes = {id(account): ({}, [], account._money) for account in self._accounts}
+        seen = set()
+        for operation, recorded in operations:
+            if not isinstance(recorded, date):
+                raise ValueError('Recorded dates must be dates.')
+            if operation.recorded() or id(operation) in seen:
+                raise ValueError('This operation has already been recorded.')
+            seen.add(id(operation))
+            account_changes = changes.get(id(operation.account()))
+            if account_changes is None:
+                raise ValueError('{account} does not belong to this Logbook.'.format(
+                    account=operation.account()))
+            account_changes, recorded_operations, money = account_changes
+            recorded_operations.append(operation)
+            change = operation.balance_units() if money else operation.balance_change()
+            if recorded in account_changes:
+                account_changes[recorded] += change
+            else:
+                account_changes[recorded] = change
+
+        for subscriber in self._subscribers:
+            for operation, _ in operations:
+                subscriber.recording(operation)
+        for operation, recorded in operations:
+            operation._recorded = recorded
+        for account in self._accounts:
+            account_changes, recorded_operations, _ = changes[id(account)]
+            if account_changes:
+                account.record_changes(account_changes, recorded_operations)
+        for operation, _ in operations:
+            self._recorded(operation)
+        return self
+
+    def _recording(self, operation):
+        """
+        Called by operations of this Logbook's accounts before they get recorded.
+        """
+        for subscriber in self._subscribers:
+            subscriber.recording(operation)
+
+    def _recorded(self, operation):
+        """
+        Called by accounts of this Logbook once an operation gets recorded.
+        """
+        record = getattr(self._transactions, 'record', None)
+        if record is not None:
+            record(operation)
+        for subscriber in self._subscribers:
+            subscriber.recorded(operation)
+
+    def _categorized(self, transaction):
+        """
+        Called by transactions on this Logbook's accounts once their category gets changed.
+        """
+        categorize = getattr(self._transactions, 'categorize', None)
+        if categorize is not None:
+            categorize(transaction)
+        for subscriber in self._subscribers:
+            subscriber.categorized(transaction)
@@ -0,0 +1,250 @@
+from beancounter.basics.account import Account, Logbook
+from contextlib import contextmanager
+from decimal import Decimal
+import threading
+import time
+
+
+class _LockedAccount(Account):
+    """
+    Account of a ConcurrentLogbook: recording an operation holds the account's lock, from
+    checking it is not recorded yet on.
+    """
+
+    def record(self, operation, recorded=None):
+        logbook = self._logbook
+        with logbook._locked((self,)):
+            logbook._begin((self,))
+            try:
+                super().record(operation, recorded)
+            finally:
+                logbook._end((self,))
+
+
+class ConcurrentLogbook(Logbook):
+    """
+    Logbook that can be written and read from several threads.
+
+    Every account has its own lock, so writers touching disjoint accounts do not wait for each
+    other; a transaction holds the locks of all its accounts, always taken in the order the
+    accounts were added, so transfers in opposite directions cannot deadlock. Appending to the
+    transaction store and notifying subscribers is serialised by a short store lock, taken
+    after the account locks.
+
+    Every account also has a version, odd while a writer changes it. balances() reads a
+    consistent snapshot without locking: it reads the versions, the balances and the versions
+    again, and retries if any write overlapped, taking the locks only after `retries` failed
+    attempts.
+    """
+
+    def __init__(self, store=None, retries=16):
+        """
+        Constructor
+        :param store: transaction storage, a plain list (the fastest to enter into) if None
+        :param retries: lock-free attempts of balances() before it takes the account locks
+        """
+        super().__init__(store)
+        self._retries = retries
+        self._init_locks()
+
+    _account_type = _LockedAccount
+
+    def _init_locks(self):
+        self._store_lock = threading.RLock()
+        self._accounts_lock = threading.Lock()
+        self._locks = {}
+        self._order = {}
+        self._versions = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('_store_lock', '_accounts_lock', '_locks'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        order, versions = state['_order'], state['_versions']
+        self.__dict__.update(state)
+        self._init_locks()
+        self._order = order
+        self._versions = {account: 0 for account in versions}
+        self._locks = {account: threading.RLock() for account in order}
+
+    def _lock(self, account):
+        lock = self._locks.get(account)
+        if lock is None:
+            with self._accounts_lock:
+                lock = self._locks.get(account)
+                if lock is None:
+                    self._order[account] = len(self._order)
+                    self._versions[account] = 0
+                    lock = self._locks[account] = threading.RLock()
+        return lock
+
+    def _ordered(self, accounts):
+        """
+        Returns the distinct accounts among accounts, in lock order.
+        """
+        if len(accounts) == 1:
+            return accounts
+        if len(accounts) == 2:
+            first, second = accounts
+            if first is second:
+                return (first,)
+            self._lock(first)
+            self._lock(second)
+            if self._order[first] > self._order[second]:
+                return second, first
+            return accounts
+        accounts = set(accounts)
+        for account in accounts:
+            self._lock(account)
+        return sorted(accounts, key=self._order.__getitem__)
+
+    @contextmanager
+    def _locked(self, accounts):
+        """
+        Context manager holding the locks of accounts, taken in account order.
+        """
+        locks = [self._lock(account) for account in self._ordered(tuple(accounts))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _begin(self, accounts):
+        """
+        Marks distinct accounts, locked by the caller, as being changed: their versions become
+        odd.
+        """
+        versions = self._versions
+        for account in accounts:
+            versions[account] += 1
+
+    def _end(self, accounts):
+        """Marks distinct accounts, locked by the caller, as changed: their versions become even."""
+        versions = self._versions
+        for account in accounts:
+            versions[account] += 1
+
+    def add_account(self, name, balance=Decimal('0.00'), currency=None):
+        with self._store_lock:
+            account = super().add_account(name, balance, currency)
+        self._lock(account)
+        return account
+
+    def enter(self, transaction):
+        operations = transaction.operations()
+        accounts = self._ordered(tuple(operation.account() for operation in operations))
+        locks = [self._lock(account) for account in accounts]
+        for lock in locks:
+            lock.acquire()
+        try:
+            # Stored first, as by Logbook.enter(): a transaction the store rejects leaves the
+            # balances untouched.
+            with self._store_lock:
+                for subscriber in self._subscribers:
+                    subscriber.entering(transaction)
+                try:
+                    self._transactions.append(transaction)
+                except Exception:
+                    self._rejected((transaction,))
+                    raise
+            self._begin(accounts)
+            try:
+                for operation in operations:
+                    operation.account().enter(operation)
+            finally:
+                self._end(accounts)
+            if self._subscribers:
+                with self._store_lock:
+                    for subscriber in self._subscribers:
+                        subscriber.entered(transaction)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+        return self
+
+    def enter_many(self, transactions):
+        transactions = list(transactions)
+        accounts = self._ordered(tuple({operation.account() for transaction in transactions
+                                        for operation in transaction.operations()}))
+        with self._locked(accounts), self._store_lock:
+            self._begin(accounts)
+            try:
+                return super().enter_many(transactions)
+            finally:
+                self._end(accounts)
+
+    def record_many(self, operations):
+        operations = list(operations)
+        accounts = self._ordered(tuple({operation.account() for operation, _ in operations}))
+        with self._locked(accounts), self._store_lock:
+            self._begin(accounts)
+            try:
+                return super().record_many(operations)
+            finally:
+                self._end(accounts)
+
+    def _new_fork(self):
+        return ConcurrentLogbook(retries=self._retries)
+
+    def _fork(self, read_only):
+        with self._locked(self._accounts), self._store_lock:
+            fork = super()._fork(read_only)
+        # Locked in the order of the accounts, as if they were added to the fork.
+        for account in fork._accounts:
+            fork._lock(account)
+        return fork
+
+    def _recording(self, operation):
+        if self._subscribers:
+            with self._store_lock:
+                super()._recording(operation)
+
+    def _recorded(self, operation):
+        with self._store_lock:
+            super()._recorded(operation)
+
+    def _categorized(self, transaction):
+        with self._store_lock:
+            super()._categorized(transaction)
+
+    def balances(self):
+        """
+        Returns a dict of the current balances of all accounts, as of a single point in time.
+        """
+        accounts = list(self._accounts)
+        versions = self._versions
+        for _ in range(self._retries):
+            before = [versions.get(account, 0) for account in accounts]
+            balances = [account._balance for account in accounts]
+            if before == [versions.get(account, 0) for account in accounts] and not any(
+                    version & 1 for version in before):
+                return {account: account._amount(balance)
+                        for account, balance in zip(accounts, balances)}
+            time.sleep(0)
+        with self._locked(accounts):
+            return {account: account.balance() for account in accounts}
+
+    def balances_at(self, on):
+        with self._locked(self._accounts):
+            return super().balances_at(on)
+
+    # Pending operations are read under the store lock too: stores indexing unrecorded
+    # operations update their index as they are read (see ColumnarStore.unrecorded_rows()).
+
+    def pending(self, account):
+        with self._locked((account,)), self._store_lock:
+            return super().pending(account)
+
+    def pending_total(self, account):
+        with self._locked((account,)), self._store_lock:
+            return super().pending_total(account)
+
+    def pending_aging(self, account, on, limits=(30, 60, 90)):
+        with self._locked((account,)), self._store_lock:
+            return super().pending_aging(account, on, limits)
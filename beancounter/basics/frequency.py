@@ -1,18 +1,76 @@
+from array import array
+from calendar import monthrange
 from datetime import timedelta, date
 
 
 class Frequency:
     """
     Base class for all frequencies
+
+    A frequency is a sequence of dates (occurrences), happening every `step` periods from
+    `start`. Subclasses map an occurrence number to its date and a date to the number of
+    occurrences up to it, so ranges are computed arithmetically instead of by iterating.
     """
 
+    def __init__(self, start, step=1):
+        if step < 1:
+            raise ValueError('Step must be a positive number, got {step}.'.format(step=step))
+        self.start = start
+        self.step = step
+
+    def __str__(self):
+        return "{name}(step {step} from {start})".format(
+            name=type(self).__name__, step=self.step, start=self.start)
+
+    def __repr__(self):
+        return "{name}(start={start}, step={step})".format(
+            name=type(self).__name__, start=repr(self.start), step=self.step)
+
     def __iter__(self):
         """
-        Abstract. When implemented it should return an iterator for list of dates, starting on start.
+        Returns a generator of all occurrences, starting on start.
         """
-        pass
+        n = 0
+        while True:
+            yield self.occurrence(n)
+            n += 1
 
-        # TODO: range, based on iterator
+    def occurrence(self, n):
+        """
+        Abstract. When implemented it should return the date of the n-th occurrence (from 0).
+        """
+        raise NotImplementedError()
+
+    def count_until(self, day):
+        """
+        Abstract. When implemented it should return the number of occurrences on or before day.
+        """
+        raise NotImplementedError()
+
+    def count_between(self, start, end):
+        """
+        Returns the number of occurrences between start and end (both inclusive).
+        """
+        if end < start:
+            return 0
+        return self.count_until(end) - self.count_until(start - timedelta(days=1))
+
+    def ordinals_between(self, start, end):
+        """
+        Returns date ordinals of occurrences between start and end (both inclusive), as an
+        array('i') or a range.
+        """
+        if end < start:
+            return array('i')
+        first = self.count_until(start - timedelta(days=1))
+        return array('i', (self.occurrence(n).toordinal()
+                           for n in range(first, self.count_until(end))))
+
+    def between(self, start, end):
+        """
+        Returns a list of occurrences between start and end (both inclusive).
+        """
+        return [date.fromordinal(ordinal) for ordinal in self.ordinals_between(start, end)]
 
 
 class Daily(Frequency):
@@ -20,25 +78,94 @@ class Daily(Frequency):
     Frequency instance, happening every n days
     """
 
-    def __init__(self, start, step=1):
-        self.start = start
-        self.step = step
+    def _days(self):
+        return self.step
+
+    def occurrence(self, n):
+        return self.start + timedelta(days=n * self._days())
+
+    def count_until(self, day):
+        days = (day - self.start).days
+        return days // self._days() + 1 if days >= 0 else 0
+
+    def ordinals_between(self, start, end):
+        """
+        Returns date ordinals of occurrences between start and end (both inclusive), as a range.
+        """
+        if end < start:
+            return range(0)
+        days = self._days()
+        origin = self.start.toordinal()
+        first = self.count_until(start - timedelta(days=1))
+        return range(origin + first * days, origin + self.count_until(end) * days, days)
+
+
+class Weekly(Daily):
+    """
+    Frequency instance, happening every n weeks
+    """
+
+    def _days(self):
+        return 7 * self.step
+
+
+class Monthly(Frequency):
+    """
+    Frequency instance, happening every n months on the day of month of start.
+
+    In shorter months the occurrence falls on the last day of the month instead.
+    """
+
+    def _months(self):
+        return self.step
+
+    def occurrence(self, n):
+        year, month = divmod(self.start.year * 12 + self.start.month - 1 + n * self._months(), 12)
+        month += 1
+        return date(year, month, min(self.start.day, monthrange(year, month)[1]))
+
+    def count_until(self, day):
+        if day < self.start:
+            return 0
+        months = day.year * 12 + day.month - self.start.year * 12 - self.start.month
+        n = months // self._months()
+        if self.occurrence(n) > day:
+            n -= 1
+        return n + 1
+
+
+class Yearly(Monthly):
+    """
+    Frequency instance, happening every n years on the month and day of start.
+
+    Occurrences of a February 29 start fall on February 28 in common years.
+    """
+
+    def _months(self):
+        return 12 * self.step
+
+
+class Once(Frequency):
+    """
+    Frequency instance, happening only on start
+    """
+
+    def __init__(self, start):
+        super().__init__(start)
 
     def __str__(self):
-        return "Daily(step {step} from {start})".format(step=self.step, start=self.start)
+        return "Once({start})".format(start=self.start)
 
     def __repr__(self):
-        return "Daily(start={start}, step={step})".format(start=repr(self.start), step=self.step)
+        return "Once(start={start})".format(start=repr(self.start))
 
     def __iter__(self):
-        """
-        Returns a generator containing n-th date
-        """
+        yield self.start
 
-        # Wanted to do this, but count() only accepts numbers:
-        # return count(start, timedelta(days=self.step))
+    def occurrence(self, n):
+        if n != 0:
+            raise IndexError('Once happens only once.')
+        return self.start
 
-        next = self.start
-        while (True):
-            yield next
-            next = next + timedelta(days=self.step)
\ No newline at end of file
+    def count_until(self, day):
+        return 1 if day >= self.start else 0
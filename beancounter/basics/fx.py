@@ -0,0 +1,100 @@
+from beancounter.basics.money import Money
+from bisect import bisect_right
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_EVEN
+from functools import lru_cache
+import csv
+
+
+class RateTable:
+    """
+    Exchange rates of currencies to a base currency, over time.
+
+    Rates are kept per currency in date order; the rate of a currency on a day is the latest one
+    on or before it. Looked up rates are kept in an LRU cache, so converting many amounts on the
+    same day bisects the table once per currency.
+    """
+
+    def __init__(self, base, cache_size=4096):
+        """
+        Constructor
+        :param base: base currency code
+        :param cache_size: number of (currency, day) rates kept in the LRU cache
+        """
+        self._base = base
+        self._dates = {}
+        self._rates = {}
+        self._rate = lru_cache(maxsize=cache_size)(self._lookup)
+
+    @classmethod
+    def load(cls, path, base, cache_size=4096):
+        """
+        Loads rates from a CSV file with a header and `date,currency,rate` rows, where rate is
+        the value of one unit of the currency in the base currency and date is YYYY-MM-DD.
+        :param path: file path
+        :param base: base currency code
+        :param cache_size: number of (currency, day) rates kept in the LRU cache
+        """
+        table = cls(base, cache_size)
+        with open(path, newline='', encoding='utf-8') as stream:
+            for row in csv.DictReader(stream):
+                table.add(row['currency'].strip(),
+                          datetime.strptime(row['date'].strip(), '%Y-%m-%d').date(),
+                          Decimal(row['rate'].strip()))
+        return table
+
+    def base(self):
+        """Base currency code."""
+        return self._base
+
+    def currencies(self):
+        """A list of currencies with rates, not including the base currency."""
+        return list(self._dates)
+
+    def add(self, currency, day, rate):
+        """
+        Adds (or replaces) the rate of a currency on a day.
+        :param currency: currency code
+        :param day: the date the rate is effective from
+        :param rate: value of one unit of the currency in the base currency
+        """
+        dates = self._dates.setdefault(currency, [])
+        rates = self._rates.setdefault(currency, [])
+        key = day.toordinal()
+        position = bisect_right(dates, key)
+        if position and dates[position - 1] == key:
+            rates[position - 1] = rate
+        else:
+            dates.insert(position, key)
+            rates.insert(position, rate)
+        self._rate.cache_clear()
+
+    def rate(self, currency, on):
+        """
+        Returns the value of one unit of a currency in the base currency on a given day.
+        :raises ValueError: if there is no rate of the currency on or before the day
+        """
+        if currency is None or currency == self._base:
+            return Decimal(1)
+        return self._rate(currency, on.toordinal())
+
+    def _lookup(self, currency, key):
+        position = bisect_right(self._dates.get(currency, ()), key)
+        if not position:
+            raise ValueError('No {currency} rate on or before {day}.'.format(
+                currency=currency, day=date.fromordinal(key)))
+        return self._rates[currency][position - 1]
+
+    def convert(self, amount, on, currency=None):
+        """
+        Converts Money to another currency, through the base currency, rounding to cents.
+        :param amount: Money to convert; amounts without a currency are taken as base currency
+        :param on: the date of the rates to use
+        :param currency: target currency, the base currency if None
+        :return: Money in the target currency
+        """
+        target = currency or self._base
+        if amount.currency() == target:
+            return amount
+        value = amount.decimal() * self.rate(amount.currency(), on) / self.rate(target, on)
+        return Money(value.quantize(Decimal(1).scaleb(-Money.PLACES), ROUND_HALF_EVEN), target)
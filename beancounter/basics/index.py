@@ -0,0 +1,331 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, compress, islice
+from operator import attrgetter, methodcaller
+
+_recorded = attrgetter('_recorded')
+_balance_change = methodcaller('balance_change')
+
+
+class DateIndex:
+    """
+    Sorted index of dates with aggregated amounts, answering "total up to a date" queries.
+
+    Amounts are aggregated per distinct date and kept in date order, with a running total
+    checkpoint every `step` dates. A query costs a bisection plus at most `step` additions.
+    Adding an amount for a date earlier than the existing ones updates the checkpoints
+    following it in place, without rebuilding the index.
+    """
+
+    def __init__(self, step=64):
+        """
+        Constructor
+        :param step: number of dates between two running total checkpoints
+        """
+        self._step = step
+        self._dates = []
+        self._amounts = []
+        self._checkpoints = []
+
+    @classmethod
+    def from_items(cls, items, step=64):
+        """
+        Builds an index out of (date ordinal, amount) pairs sorted by distinct dates.
+        :param items: iterable of pairs, as returned by items()
+        :param step: number of dates between two running total checkpoints
+        """
+        index = cls(step)
+        for key, amount in items:
+            index._dates.append(key)
+            index._amounts.append(amount)
+        totals = accumulate(index._amounts)
+        index._checkpoints = list(islice(totals, step - 1, None, step))
+        return index
+
+    def __len__(self):
+        return len(self._dates)
+
+    def __eq__(self, other):
+        if not isinstance(other, DateIndex):
+            return NotImplemented
+        return self._dates == other._dates and self._amounts == other._amounts
+
+    def items(self, start=None, end=None):
+        """
+        Returns a list of (date ordinal, amount) pairs, in date order.
+        :param start: first date to include, from the earliest if None
+        :param end: last date to include, up to the latest if None
+        """
+        first = bisect_left(self._dates, start.toordinal()) if start is not None else 0
+        last = bisect_right(self._dates, end.toordinal()) if end is not None else len(self._dates)
+        return list(zip(self._dates[first:last], self._amounts[first:last]))
+
+    def add(self, day, amount):
+        """
+        Adds an amount on a given date.
+        :param day: date of the change
+        :param amount: the change
+        """
+        key = day.toordinal()
+        step = self._step
+        dates, amounts, checkpoints = self._dates, self._amounts, self._checkpoints
+        pos = bisect_left(dates, key)
+
+        if pos < len(dates) and dates[pos] == key:
+            amounts[pos] += amount
+            for k in range(pos // step, len(checkpoints)):
+                checkpoints[k] += amount
+            return
+
+        dates.insert(pos, key)
+        amounts.insert(pos, amount)
+        # Checkpoint k covers the first (k + 1) * step dates; one of them got pushed out.
+        for k in range(pos // step, len(checkpoints)):
+            checkpoints[k] += amount - amounts[(k + 1) * step]
+
+        covered = len(checkpoints) * step
+        if len(amounts) == covered + step:
+            previous = checkpoints[-1] if checkpoints else 0
+            checkpoints.append(previous + sum(amounts[covered:]))
+
+    def total_until(self, day):
+        """
+        Returns the sum of amounts added on or before a given date.
+        :param day: the date
+        """
+        count = bisect_right(self._dates, day.toordinal())
+        blocks = count // self._step
+        total = self._checkpoints[blocks - 1] if blocks else 0
+        return total + sum(self._amounts[blocks * self._step:count])
+
+
+class PendingIndex:
+    """
+    Live set of pending (entered, but not yet recorded) operations of an account.
+
+    Operations are kept in the order they were entered, together with their total balance
+    change. Added operations are only appended to a batch, indexed for O(1) removal on the
+    first query or removal, so entering stays cheap; listing costs O(pending).
+    """
+
+    def __init__(self, zero=0):
+        """
+        Constructor
+        :param zero: zero amount of the totals, e.g. Account.amount_of(0)
+        """
+        self._operations = {}
+        self._batch = []
+        self._zero = zero
+        self._total = zero
+
+    def __len__(self):
+        self._index()
+        return len(self._operations)
+
+    def __iter__(self):
+        self._index()
+        return iter(self._operations)
+
+    def __eq__(self, other):
+        if not isinstance(other, PendingIndex):
+            return NotImplemented
+        return self._entries() == other._entries()
+
+    def _entries(self):
+        return [(operation.date(), operation.balance_change()) for operation in self]
+
+    def _index(self):
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self._operations.update(dict.fromkeys(batch))
+            self._total = sum(map(_balance_change, batch), self._total)
+            # Operations recorded before they were entered were never pending.
+            for operation in compress(batch, map(_recorded, batch)):
+                self.discard(operation)
+
+    def total(self):
+        """Returns the total balance change of pending operations."""
+        self._index()
+        return self._total
+
+    def add(self, operation):
+        """
+        Adds an operation, unless already recorded.
+        """
+        self._batch.append(operation)
+
+    def extend(self, operations):
+        """
+        Adds a batch of operations, leaving out ones already recorded.
+        """
+        self._batch.extend(operations)
+
+    def copy(self, mapped=None):
+        """
+        Returns a copy of the index, holding the same operations.
+        :param mapped: function returning the operation held by the copy instead of each one,
+                       with the same balance change
+        """
+        self._index()
+        index = PendingIndex(self._zero)
+        if mapped is None:
+            index._operations = self._operations.copy()
+        else:
+            index._operations = dict.fromkeys(map(mapped, self._operations))
+        index._total = self._total
+        return index
+
+    def discard(self, operation):
+        """
+        Removes an operation, if pending.
+        """
+        self._index()
+        if self._operations.pop(operation, False) is None:
+            self._total -= operation.balance_change()
+
+    def aging(self, on, limits=(30, 60, 90)):
+        """
+        Returns total balance changes of pending operations grouped by age.
+        :param on: the date ages are counted at
+        :param limits: ascending ages in days separating the groups
+        :return: list of len(limits) + 1 totals; the first one for operations younger than
+                 limits[0] days (or dated after on), the last one for limits[-1] days or older
+        """
+        totals = [self._zero] * (len(limits) + 1)
+        day = on.toordinal()
+        for operation in self:
+            totals[bisect_right(limits, day - operation.date().toordinal())] += \
+                operation.balance_change()
+        return totals
+
+
+class LayeredIndex:
+    """
+    DateIndex layered over a base index shared with other layers and never changed any more.
+
+    Amounts added to the layer go to its own DateIndex, queries combine both. Forked accounts
+    share their history this way (see fork_index()), without copying it.
+    """
+
+    # Layers over layers are flattened into a new DateIndex beyond this depth.
+    MAX_DEPTH = 8
+
+    def __init__(self, base, step=64):
+        """
+        Constructor
+        :param base: the shared DateIndex (or LayeredIndex), not to be changed any more
+        :param step: number of dates between two running total checkpoints of the layer
+        """
+        self._base = base
+        self._delta = DateIndex(step)
+        self._depth = getattr(base, '_depth', 0) + 1
+
+    def __len__(self):
+        return len(self.items())
+
+    def __eq__(self, other):
+        if not isinstance(other, (DateIndex, LayeredIndex)):
+            return NotImplemented
+        return self.items() == other.items()
+
+    def items(self, start=None, end=None):
+        """
+        Returns a list of (date ordinal, amount) pairs, in date order.
+        :param start: first date to include, from the earliest if None
+        :param end: last date to include, up to the latest if None
+        """
+        items = self._base.items(start, end)
+        delta = self._delta.items(start, end)
+        if not delta:
+            return items
+        totals = dict(items)
+        for key, amount in delta:
+            totals[key] = totals[key] + amount if key in totals else amount
+        return sorted(totals.items())
+
+    def add(self, day, amount):
+        """
+        Adds an amount on a given date, to the layer.
+        """
+        self._delta.add(day, amount)
+
+    def total_until(self, day):
+        """
+        Returns the sum of amounts added on or before a given date.
+        """
+        return self._base.total_until(day) + self._delta.total_until(day)
+
+
+def fork_index(index):
+    """
+    Forks an index: returns two LayeredIndexes over a common base, to be used in place of the
+    index by its current owner and by the fork. The index itself must not be changed any more.
+    """
+    if isinstance(index, LayeredIndex) and not len(index._delta):
+        base = index._base
+    elif getattr(index, '_depth', 0) >= LayeredIndex.MAX_DEPTH:
+        base = DateIndex.from_items(index.items())
+    else:
+        base = index
+    return LayeredIndex(base), LayeredIndex(base)
+
+
+class FenwickTree:
+    """
+    Prefix sums of amounts at positions 0, 1, 2..., as a Fenwick (binary indexed) tree: adding an
+    amount and totalling a prefix both cost O(log n). The tree grows as positions beyond its
+    size are added to, each new position in O(log n).
+    """
+
+    def __init__(self, zero=0):
+        """
+        Constructor
+        :param zero: the zero amount, initial value of all positions
+        """
+        self._zero = zero
+        # Node i (from 1) holds the sum of positions i - (i & -i) to i - 1.
+        self._tree = [zero]
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def _grow(self, size):
+        tree = self._tree
+        while len(tree) <= size:
+            node = len(tree)
+            # The new position is still zero; the others covered by the node are already in.
+            tree.append(self.total_until(node - 2) - self.total_until(node - (node & -node) - 1))
+
+    def add(self, position, amount):
+        """
+        Adds an amount at a position.
+        """
+        if position < 0:
+            raise ValueError('Position must not be negative, got {position}.'.format(
+                position=position))
+        tree = self._tree
+        node = position + 1
+        if node >= len(tree):
+            self._grow(node)
+        while node < len(tree):
+            tree[node] += amount
+            node += node & -node
+
+    def total_until(self, position):
+        """
+        Returns the sum of amounts at positions up to position (inclusive).
+        """
+        tree = self._tree
+        node = min(position + 1, len(tree) - 1)
+        total = self._zero
+        while node > 0:
+            total += tree[node]
+            node -= node & -node
+        return total
+
+    def total_between(self, first, last):
+        """
+        Returns the sum of amounts at positions between first and last (both inclusive).
+        """
+        if last < first:
+            return self._zero
+        return self.total_until(last) - self.total_until(first - 1)
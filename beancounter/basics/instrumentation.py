@@ -0,0 +1,146 @@
+from beancounter.basics.account import LogbookSubscriber
+from bisect import bisect_left
+import time
+
+# Upper bounds of the latency histogram buckets, in seconds: 1 µs to 1 s, twice a decade.
+LATENCY_BOUNDS = tuple(10 ** (exponent / 2) for exponent in range(-12, 1))
+
+
+class Histogram:
+    """
+    Latency histogram with fixed bucket bounds; the last bucket counts values above all bounds.
+    """
+
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        """
+        Constructor
+        :param bounds: ascending upper bounds of the buckets (inclusive)
+        """
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)
+        self._count = 0
+        self._total = 0.0
+
+    def add(self, value):
+        """
+        Counts a value in the first bucket whose bound is not below it.
+        """
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._total += value
+
+    def count(self):
+        """Number of values added."""
+        return self._count
+
+    def total(self):
+        """Sum of the values added."""
+        return self._total
+
+    def as_dict(self):
+        """
+        Exports the histogram as a dict of its count, total (as 'seconds') and bucket counts.
+        """
+        return {'count': self._count, 'seconds': self._total, 'buckets': list(self._counts)}
+
+
+class Instrumentation(LogbookSubscriber):
+    """
+    Counters and latency histograms of a Logbook's operations, by transaction (for entering) and
+    operation (for recording) type:
+
+        instrumentation = Instrumentation()
+        logbook.subscribe(instrumentation)
+        ...
+        metrics = instrumentation.as_dict()
+
+    Latencies are measured from the entering()/recording() notification to the matching
+    entered()/recorded() one, so for batches (enter_many(), record_many()) every transaction or
+    operation gets the latency of the whole batch. A Logbook without subscribers pays nothing
+    but the loops over its empty subscriber list. Transactions rejected by the Logbook's storage
+    are not counted.
+    """
+
+    def __init__(self, clock=time.perf_counter, bounds=LATENCY_BOUNDS):
+        """
+        Constructor
+        :param clock: function returning the current time in seconds
+        :param bounds: upper bounds of the latency histogram buckets, in seconds
+        """
+        self._clock = clock
+        self._bounds = bounds
+        self.reset()
+
+    def reset(self):
+        """
+        Clears all counters and histograms.
+        """
+        self._accounts_added = 0
+        self._entered = {}
+        self._recorded = {}
+        self._started = {}
+
+    def account_added(self, account):
+        self._accounts_added += 1
+
+    def entering(self, transaction):
+        self._started[id(transaction)] = self._clock()
+
+    def entered(self, transaction):
+        self._add(self._entered, transaction)
+
+    def rejected(self, transaction):
+        self._started.pop(id(transaction), None)
+
+    def recording(self, operation):
+        self._started[id(operation)] = self._clock()
+
+    def recorded(self, operation):
+        self._add(self._recorded, operation)
+
+    def _add(self, histograms, instance):
+        now = self._clock()
+        started = self._started.pop(id(instance), now)
+        name = type(instance).__name__
+        histogram = histograms.get(name)
+        if histogram is None:
+            histogram = histograms[name] = Histogram(self._bounds)
+        histogram.add(now - started)
+
+    def entered_count(self, kind=None):
+        """
+        Returns the number of transactions entered, of the given type (e.g. Bill) if not None.
+        """
+        return self._count(self._entered, kind)
+
+    def recorded_count(self, kind=None):
+        """
+        Returns the number of operations recorded, of the given type (e.g. TransferIn) if not
+        None.
+        """
+        return self._count(self._recorded, kind)
+
+    @staticmethod
+    def _count(histograms, kind):
+        if kind is None:
+            return sum(histogram.count() for histogram in histograms.values())
+        histogram = histograms.get(kind.__name__)
+        return histogram.count() if histogram is not None else 0
+
+    def as_dict(self):
+        """
+        Exports counters and histograms as a dict of plain values, e.g.
+
+            {'accounts_added': 2,
+             'latency_bounds': [1e-06, ...],
+             'entered': {'Bill': {'count': 10, 'seconds': 0.0001, 'buckets': [0, 7, 3, ...]}},
+             'recorded': {'BillOperation': {...}}}
+
+        where buckets counts latencies up to the matching latency bound, plus those above all.
+        """
+        return {
+            'accounts_added': self._accounts_added,
+            'latency_bounds': list(self._bounds),
+            'entered': {name: histogram.as_dict() for name, histogram in self._entered.items()},
+            'recorded': {name: histogram.as_dict() for name, histogram in self._recorded.items()},
+        }
@@ -0,0 +1,132 @@
+from decimal import Decimal
+from functools import total_ordering
+
+
+@total_ordering
+class Money:
+    """
+    An amount of money: an integer number of minor units (cents) of a currency.
+
+    Money adds, subtracts and compares with Money of the same currency, and with Decimals and
+    ints, which convert losslessly (an amount with fractions of a cent raises ValueError). It
+    also equals and hashes like the Decimal of the same value, so the two can be used
+    interchangeably as amounts. Accounts opened with a Money balance keep integer minor units
+    internally.
+    """
+
+    __slots__ = ('_units', '_currency')
+
+    PLACES = 2
+
+    def __init__(self, amount, currency=None):
+        """
+        Constructor
+        :param amount: amount in major units (Decimal, int or str)
+        :param currency: currency code (e.g. 'EUR'), None if not specified
+        """
+        units = Decimal(amount).scaleb(self.PLACES)
+        if units != units.to_integral_value():
+            raise ValueError('Amount {amount} has more than {places} decimal places.'.format(
+                amount=amount, places=self.PLACES))
+        self._units = int(units)
+        self._currency = currency
+
+    @classmethod
+    def from_units(cls, units, currency=None):
+        """
+        Builds Money out of an integer number of minor units.
+        """
+        money = object.__new__(cls)
+        money._units = units
+        money._currency = currency
+        return money
+
+    def units(self):
+        """Amount in minor units (cents)."""
+        return self._units
+
+    def currency(self):
+        """Currency code, None if not specified."""
+        return self._currency
+
+    def decimal(self):
+        """Amount as a Decimal, with exactly PLACES decimal places."""
+        return Decimal(self._units).scaleb(-self.PLACES)
+
+    def __repr__(self):
+        return "Money('{amount}', {currency})".format(amount=self.decimal(),
+                                                      currency=repr(self._currency))
+
+    def __str__(self):
+        if self._currency is None:
+            return str(self.decimal())
+        return '{amount} {currency}'.format(amount=self.decimal(), currency=self._currency)
+
+    def _other_units(self, other):
+        if type(other) is Money:
+            if other._currency != self._currency:
+                raise ValueError('Cannot combine {currency} with {other}.'.format(
+                    currency=self._currency, other=other._currency))
+            return other._units
+        if isinstance(other, (int, Decimal)) and not isinstance(other, bool):
+            return Money(other)._units
+        return None
+
+    def __add__(self, other):
+        units = self._other_units(other)
+        if units is None:
+            return NotImplemented
+        return Money.from_units(self._units + units, self._currency)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        units = self._other_units(other)
+        if units is None:
+            return NotImplemented
+        return Money.from_units(self._units - units, self._currency)
+
+    def __rsub__(self, other):
+        units = self._other_units(other)
+        if units is None:
+            return NotImplemented
+        return Money.from_units(units - self._units, self._currency)
+
+    def __mul__(self, factor):
+        if not isinstance(factor, int) or isinstance(factor, bool):
+            return NotImplemented
+        return Money.from_units(self._units * factor, self._currency)
+
+    __rmul__ = __mul__
+
+    def __neg__(self):
+        return Money.from_units(-self._units, self._currency)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money.from_units(abs(self._units), self._currency)
+
+    def __bool__(self):
+        return self._units != 0
+
+    def __eq__(self, other):
+        if type(other) is Money:
+            return self._units == other._units and self._currency == other._currency
+        if isinstance(other, (int, Decimal)):
+            return self.decimal() == other
+        return NotImplemented
+
+    def __lt__(self, other):
+        if type(other) is Money:
+            return self._units < self._other_units(other)
+        if isinstance(other, (int, Decimal)):
+            return self.decimal() < other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.decimal())
+
+    def __reduce__(self):
+        return Money.from_units, (self._units, self._currency)
@@ -0,0 +1,184 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import islice
+
+# Index keys pack a transaction date ordinal and the transaction's position in the Logbook,
+# so sorting them sorts by date, then by entry order.
+_POSITION_BITS = 32
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+
+
+class TransactionIndex:
+    """
+    Secondary indexes over the transactions of a Logbook: all transactions sorted by date, and
+    the transactions of each account sorted by date.
+
+    Transactions are only ever appended to a Logbook, so the index catches up with the ones
+    entered since its last update() instead of following every change. Stores providing
+    summaries() (see ColumnarStore) are indexed without materialising their transactions.
+    """
+
+    def __init__(self, transactions):
+        """
+        Constructor
+        :param transactions: the Logbook's transactions (a list or a store)
+        """
+        self._transactions = transactions
+        self._count = 0
+        self._keys = array('q')
+        self._accounts = {}
+
+    def update(self):
+        """
+        Indexes transactions entered since the last update.
+        """
+        count = len(self._transactions)
+        if count == self._count:
+            return
+        keys = []
+        account_keys = {}
+        summaries = getattr(self._transactions, 'summaries', None)
+        if summaries is not None:
+            for position, day, accounts in summaries(self._count):
+                key = day << _POSITION_BITS | position
+                keys.append(key)
+                for account in accounts:
+                    _add_key(account_keys, account, key)
+        else:
+            for position, transaction in enumerate(islice(self._transactions, self._count, None),
+                                                   self._count):
+                key = transaction._date.toordinal() << _POSITION_BITS | position
+                keys.append(key)
+                for operation in transaction.operations():
+                    _add_key(account_keys, operation._account, key)
+
+        self._keys = _merge(self._keys, keys)
+        for account, added in account_keys.items():
+            self._accounts[account] = _merge(self._accounts.get(account, array('q')), added)
+        self._count = count
+
+    def positions(self, account=None, start=None, end=None):
+        """
+        Returns an iterator of positions of transactions dated between start and end (both
+        inclusive, open-ended if None), in date order.
+        :param account: only transactions with an operation on this account, if given
+        """
+        keys = self._keys if account is None else self._accounts.get(account, ())
+        low = 0 if start is None else bisect_left(keys, start.toordinal() << _POSITION_BITS)
+        high = len(keys) if end is None else bisect_left(
+            keys, (end.toordinal() + 1) << _POSITION_BITS)
+        return (key & _POSITION_MASK for key in islice(keys, low, high))
+
+
+def _add_key(account_keys, account, key):
+    added = account_keys.get(account)
+    if added is None:
+        account_keys[account] = [key]
+    elif added[-1] != key:
+        added.append(key)
+
+
+def _merge(keys, added):
+    """
+    Adds keys to a sorted array of keys, in place. Only the added keys are sorted; the keys
+    sorting after the first of them are merged with them in a single pass.
+    """
+    added.sort()
+    if not keys or not added or added[0] >= keys[-1]:
+        keys.extend(added)
+        return keys
+    split = bisect_right(keys, added[0])
+    tail = keys[split:]
+    del keys[split:]
+    keys.extend(merge(tail, added))
+    return keys
+
+
+class Query:
+    """
+    Query over the transactions of a Logbook, built by chaining filters:
+
+        logbook.query().between(date(2015, 3, 1), date(2015, 3, 31)).account(checking) \\
+            .kind(Bill).amount(minimum=Decimal('500.00'))
+
+    Each filter returns a new Query. Iterating a query lazily yields matching transactions in
+    date order (entry order within a day). The date range and account are looked up in the
+    Logbook's TransactionIndex, so only transactions in range on the account are visited; the
+    other filters are checked on those.
+    """
+
+    def __init__(self, logbook, start=None, end=None, account=None, kinds=None, minimum=None,
+                 maximum=None, recorded=None):
+        """
+        Constructor, see Logbook.query().
+        """
+        self._logbook = logbook
+        self._start = start
+        self._end = end
+        self._account = account
+        self._kinds = kinds
+        self._minimum = minimum
+        self._maximum = maximum
+        self._recorded = recorded
+
+    def _filtered(self, **filters):
+        query = Query(self._logbook)
+        query.__dict__.update(self.__dict__)
+        for name, value in filters.items():
+            setattr(query, '_' + name, value)
+        return query
+
+    def between(self, start=None, end=None):
+        """
+        Transactions dated between start and end (both inclusive, open-ended if None).
+        """
+        if start is not None and end is not None and end < start:
+            raise ValueError('Query end {end} is before its start {start}.'.format(
+                end=end, start=start))
+        return self._filtered(start=start, end=end)
+
+    def account(self, account):
+        """
+        Transactions with an operation on an account.
+        """
+        return self._filtered(account=account)
+
+    def kind(self, *kinds):
+        """
+        Transactions of any of the given types (e.g. Bill, Transfer).
+        """
+        return self._filtered(kinds=kinds)
+
+    def amount(self, minimum=None, maximum=None):
+        """
+        Transactions with an amount between minimum and maximum (both inclusive, open-ended if
+        None).
+        """
+        return self._filtered(minimum=minimum, maximum=maximum)
+
+    def recorded(self, recorded=True):
+        """
+        Transactions with all operations recorded, or with any not recorded if recorded is False.
+        """
+        return self._filtered(recorded=recorded)
+
+    def __iter__(self):
+        index = self._logbook._transaction_index()
+        transactions = self._logbook.transactions()
+        for position in index.positions(self._account, self._start, self._end):
+            transaction = transactions[position]
+            if self._matches(transaction):
+                yield transaction
+
+    def _matches(self, transaction):
+        if self._kinds is not None and not isinstance(transaction, self._kinds):
+            return False
+        if self._minimum is not None and transaction.amount() < self._minimum:
+            return False
+        if self._maximum is not None and transaction.amount() > self._maximum:
+            return False
+        if self._recorded is not None and self._recorded != all(
+                operation.recorded() for operation in transaction.operations()):
+            return False
+        return True
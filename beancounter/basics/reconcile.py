@@ -0,0 +1,84 @@
+from beancounter.basics.account import LogbookSubscriber
+from bisect import bisect_left, bisect_right
+
+
+class Reconciler(LogbookSubscriber):
+    """
+    Matches bank statement records to unrecorded operations of a Logbook, and records them.
+
+    Pending operations of the Logbook's accounts are indexed by (account, balance change),
+    each bucket sorted by operation date, so a statement record only looks at operations of
+    its own account and amount within the date window. Operations entered later are added to
+    the index as the Logbook notifies the reconciler; ones recorded meanwhile by other means
+    are skipped.
+    """
+
+    def __init__(self, logbook, window=3):
+        """
+        Constructor. The reconciler subscribes to the Logbook until close() is called.
+        :param logbook: the Logbook
+        :param window: maximum number of days between an operation and its statement record
+        """
+        self._logbook = logbook
+        self._window = window
+        self._index = {}
+        for account in logbook.accounts():
+            for operation in logbook.pending(account):
+                self._add(operation)
+        logbook.subscribe(self)
+
+    def close(self):
+        """
+        Stops indexing new operations.
+        """
+        self._logbook.unsubscribe(self)
+
+    def entered(self, transaction):
+        for operation in transaction.operations():
+            if operation.recorded() is None:
+                self._add(operation)
+
+    def _add(self, operation):
+        key = (id(operation.account()), operation.balance_change())
+        dates, operations = self._index.setdefault(key, ([], []))
+        day = operation.date().toordinal()
+        position = bisect_right(dates, day)
+        dates.insert(position, day)
+        operations.insert(position, operation)
+
+    def match(self, record):
+        """
+        Finds the unrecorded operation matching a statement record and removes it from the index.
+
+        The operation must affect the record's account by the record's amount, and be dated at
+        most `window` days from it. The closest date wins, the earlier operation on a tie.
+        :param record: a StatementRecord (or any object with account(), amount() and date())
+        :return: the matching Operation, None if there is none
+        """
+        bucket = self._index.get((id(record.account()), record.amount()))
+        if bucket is None:
+            return None
+        dates, operations = bucket
+        day = record.date().toordinal()
+        best = None
+        for position in range(bisect_left(dates, day - self._window),
+                              bisect_right(dates, day + self._window)):
+            if operations[position].recorded() is None and (
+                    best is None or abs(dates[position] - day) < abs(dates[best] - day)):
+                best = position
+        if best is None:
+            return None
+        del dates[best]
+        return operations.pop(best)
+
+    def reconcile(self, records):
+        """
+        Matches statement records to operations and records the matched operations as a single
+        batch (see Logbook.record_many()), on the statement dates.
+        :param records: iterable of StatementRecords
+        :return: list of (record, operation) pairs, operation being None for unmatched records
+        """
+        pairs = [(record, self.match(record)) for record in records]
+        self._logbook.record_many((operation, record.date())
+                                  for record, operation in pairs if operation is not None)
+        return pairs
@@ -0,0 +1,125 @@
+"""
+Replay of a Logbook's transactions, recomputing account balances to verify them.
+
+Transactions are split into ranges summed by a pool of forked worker processes: a worker
+inherits the Logbook from the parent and only receives the bounds of its range, returning the
+total balance changes (and recorded changes) per account. A Transfer contributes to the
+totals of both its accounts, whichever range it falls into, so the partial totals simply add
+up. Transactions kept by a ColumnarStore are summed from its columns, without materialising
+them. Where processes cannot be forked, or the transactions are not kept in memory, the
+replay runs in the calling process.
+"""
+from beancounter.basics.storage import ColumnarStore
+import multiprocessing
+import os
+
+# Number of transactions read from the store at once, outside of a ColumnarStore.
+BATCH_SIZE = 1000
+
+# (logbook, account indexes by id) of the replay in progress, inherited by forked workers.
+_replayed = None
+
+
+def replay(logbook, processes=None, chunks_per_process=4):
+    """
+    Recomputes the balances of the Logbook's accounts from their initial balances and the
+    Logbook's transactions.
+    :param logbook: the Logbook
+    :param processes: number of worker processes, os.cpu_count() if None; 1 to replay in the
+                      calling process
+    :param chunks_per_process: number of transaction ranges per worker process
+    :return: dict of (balance, recorded balance) pairs by account
+    """
+    global _replayed
+    accounts = logbook.accounts()
+    count = len(logbook.transactions())
+    processes = processes or os.cpu_count() or 1
+    # Forked workers share the parent's memory, but not safely its open files or connections.
+    in_memory = isinstance(logbook.transactions(), (list, ColumnarStore))
+    if processes > 1 and count and in_memory and \
+            'fork' in multiprocessing.get_all_start_methods():
+        chunks = min(processes * chunks_per_process, count)
+        bounds = [(count * i // chunks, count * (i + 1) // chunks) for i in range(chunks)]
+        _replayed = (logbook, {id(account): i for i, account in enumerate(accounts)})
+        try:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                parts = pool.map(_replay_range, bounds)
+        finally:
+            _replayed = None
+    else:
+        parts = [_sum(logbook, {id(account): i for i, account in enumerate(accounts)}, 0, count)]
+
+    balances = {}
+    for i, account in enumerate(accounts):
+        entered = sum(part[0][i] for part in parts)
+        recorded = sum(part[1][i] for part in parts)
+        if isinstance(logbook.transactions(), ColumnarStore):
+            places = logbook.transactions().places()
+            entered, recorded = account.amount_of(entered, places), account.amount_of(
+                recorded, places)
+        else:
+            entered, recorded = account._amount(entered), account._amount(recorded)
+        initial = account.initial_balance()
+        balances[account] = (initial + entered, initial + recorded)
+    return balances
+
+
+def verify(logbook, processes=None):
+    """
+    Replays the Logbook (see replay()) and compares the results with the accounts' balances.
+    :return: dict of replayed (balance, recorded balance) pairs of the accounts that do not
+             match, empty if all of them do
+    """
+    return {account: replayed for account, replayed in replay(logbook, processes).items()
+            if replayed != (account.balance(), account.recorded_balance())}
+
+
+def _replay_range(bounds):
+    logbook, ids = _replayed
+    return _sum(logbook, ids, *bounds)
+
+
+def _sum(logbook, ids, start, stop):
+    """
+    Totals balance changes per account of the transactions from start to stop, in minor
+    units for a ColumnarStore, in the accounts' internal amounts otherwise.
+    :return: lists of entered and recorded totals, by account index
+    """
+    entered = [0] * len(ids)
+    recorded = [0] * len(ids)
+    store = logbook.transactions()
+    if start >= stop:
+        return entered, recorded
+    if isinstance(store, ColumnarStore):
+        starts = store._starts
+        first = starts[start]
+        last = starts[stop] if stop < len(starts) else store.operation_count()
+        # Store account ids to Logbook account indexes; operations on other accounts are
+        # totalled at the end of the lists and dropped.
+        positions = [ids.get(id(account), len(ids)) for account in store.accounts()]
+        entered.append(0)
+        recorded.append(0)
+        for account, change, day in zip(store._account_col[first:last],
+                                        store._changes[first:last],
+                                        store._recorded[first:last]):
+            account = positions[account]
+            entered[account] += change
+            if day:
+                recorded[account] += change
+        return entered[:-1], recorded[:-1]
+
+    # Read in batches: slicing an SQLiteStore fetches the whole range at once.
+    for transaction in (transaction for offset in range(start, stop, BATCH_SIZE)
+                        for transaction in store[offset:min(offset + BATCH_SIZE, stop)]):
+        for operation in transaction.operations():
+            account = ids.get(id(operation._account))
+            if account is None:
+                continue
+            if operation._account._money:
+                change = operation.balance_units()
+            else:
+                change = operation.balance_change()
+            entered[account] += change
+            if operation._recorded is not None:
+                recorded[account] += change
+    return entered, recorded
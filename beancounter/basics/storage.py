@@ -0,0 +1,651 @@
+from array import array
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal
+from itertools import chain, compress, count, islice
+from operator import not_
+import threading
+import weakref
+
+from beancounter.basics.index import PendingIndex
+from beancounter.basics.money import Money
+from beancounter.basics.transaction import Deposit, Bill, Transfer, DepositOperation, \
+    BillOperation, TransferOut, TransferIn
+from beancounter.basics.utils import to_minor
+
+DEPOSIT, BILL, TRANSFER_OUT, TRANSFER_IN = range(4)
+
+COLUMNS = (('_starts', 'q'), ('_dates', 'i'), ('_entered', 'i'), ('_categories', 'i'),
+           ('_kinds', 'b'), ('_account_col', 'i'), ('_changes', 'q'), ('_recorded', 'i'))
+# Columns with one entry per transaction; the others have one per operation.
+TRANSACTION_COLUMNS = ('_starts', '_dates', '_entered', '_categories')
+
+_KINDS = {DepositOperation: DEPOSIT, BillOperation: BILL,
+          TransferOut: TRANSFER_OUT, TransferIn: TRANSFER_IN}
+
+
+class ColumnarStore:
+    """
+    Transaction storage for a Logbook, keeping transactions in parallel arrays.
+
+    Every operation is one row (kind, account id, balance change in minor units, recorded
+    date); transaction dates and category ids are kept once per transaction, category paths
+    once per category. Transactions handed out by the store are materialised on demand and
+    shared while referenced, so the store itself holds no Transaction objects. Recording an
+    operation or re-categorising a transaction of the owning Logbook writes it through to the
+    columns; materialised transactions carry their category as a path.
+
+    The store trades entering speed for memory: storing a transaction converts its amounts to
+    minor units and writes every column, so Logbook.enter() is slower than with the default list
+    storage, which remains the one to use unless the ledger is too large to keep as objects.
+
+    Stored and handed out transactions are indexed by their id, checked against the live ones,
+    so finding the row of an operation costs no per-operation bookkeeping. The store also keeps
+    the rows of unrecorded operations per account, read from the columns when first asked for:
+    the accounts of the owning Logbook list their pending operations from them (see
+    PendingRows), without holding any.
+
+    Columns may also be memoryviews over a mapped file (see beancounter.io.binary); they are
+    copied into arrays once the store needs to grow.
+    """
+
+    # Number of live transaction references below which dead ones are not swept.
+    SWEEP_MIN = 1024
+
+    def __init__(self, places=2):
+        """
+        Constructor
+        :param places: number of decimal places kept for amounts (2 for cents)
+        """
+        self._places = places
+        self._accounts = []
+        self._account_ids = {}
+        # Category paths by category id, id 0 standing for no category.
+        self._category_paths = [None]
+        self._category_ids = {None: 0}
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+        self._mapped = None
+        # Weak references to live transactions by index, and their indexes by transaction id;
+        # both swept as the store grows.
+        self._views = {}
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._sweep_at = self.SWEEP_MIN
+        # Rows of unrecorded operations by account id, in row order, up to row _scanned.
+        self._unrecorded = {}
+        self._scanned = 0
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('ColumnarStore index out of range')
+
+        reference = self._views.get(index)
+        transaction = reference() if reference is not None else None
+        if transaction is None:
+            transaction = self._materialise(index)
+        return transaction
+
+    def __getstate__(self):
+        # Live views are pickled along, so objects pickled with the store stay bound to their
+        # rows.
+        state = self.__dict__.copy()
+        state['_views'] = {index: transaction for index, transaction in (
+            (index, reference()) for index, reference in list(self._views.items()))
+            if transaction is not None}
+        del state['_lock'], state['_indexes']
+        if self._mapped is not None:
+            state.update(self._arrays())
+            state['_mapped'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views = {index: weakref.ref(transaction)
+                       for index, transaction in state['_views'].items()}
+        self._indexes = {id(transaction): index
+                         for index, transaction in state['_views'].items()}
+        self._lock = threading.Lock()
+
+    def operation_count(self):
+        """Number of stored operations (rows)."""
+        return len(self._kinds)
+
+    def places(self):
+        """Number of decimal places kept for amounts."""
+        return self._places
+
+    def nbytes(self):
+        """Memory used by the columns, in bytes."""
+        return sum(len(column) * column.itemsize for column in self.columns().values())
+
+    def columns(self):
+        """Returns a dict of the columns (arrays or memoryviews) by name."""
+        return {name: getattr(self, name) for name, _ in COLUMNS}
+
+    def accounts(self):
+        """Accounts referenced by the stored operations, in account id order."""
+        return self._accounts
+
+    def categories(self):
+        """Paths of the categories of stored transactions, in category id order from 1."""
+        return self._category_paths[1:]
+
+    def map_columns(self, accounts, columns, mapped, categories=()):
+        """
+        Replaces the contents of an empty store with columns mapped from a file.
+        :param accounts: accounts, in account id order
+        :param columns: dict of memoryviews by column name (see columns())
+        :param mapped: the mapped file, kept open while the columns are in use
+        :param categories: category paths, in category id order from 1 (see categories())
+        """
+        if len(self):
+            raise ValueError('Only an empty store can map columns.')
+        for account in accounts:
+            self._account_id(account)
+        self._category_paths = [None] + list(categories)
+        self._category_ids = {path: category_id
+                              for category_id, path in enumerate(self._category_paths)}
+        for name, _ in COLUMNS:
+            setattr(self, name, columns[name])
+        self._mapped = mapped
+
+    def _arrays(self):
+        arrays = {}
+        for name, typecode in COLUMNS:
+            arrays[name] = array(typecode)
+            arrays[name].frombytes(memoryview(getattr(self, name)).cast('B'))
+        return arrays
+
+    def append(self, transaction):
+        """
+        Stores a transaction.
+        :param transaction: a Deposit, Bill or Transfer
+        :raises TypeError: if the transaction is of another type
+        :raises ValueError: if an amount has more decimal places than the store keeps, or is
+                            too large
+        """
+        if self._mapped is not None:
+            self.__dict__.update(self._arrays())
+            self._mapped = None
+        places = self._places
+        units = places == Money.PLACES
+        kinds, account_col, changes, recorded = \
+            self._kinds, self._account_col, self._changes, self._recorded
+        rows, accounts = len(kinds), len(self._accounts)
+        try:
+            for operation in transaction.operations():
+                kind = _KINDS.get(type(operation))
+                if kind is None:
+                    raise TypeError('Cannot store a {type}.'.format(
+                        type=type(transaction).__name__))
+                account = operation._account
+                account_id = self._account_ids.get(account)
+                if account_id is None:
+                    account_id = self._account_id(account)
+                if account._money and units:
+                    change = operation.balance_units()
+                else:
+                    amount = transaction._amount_in if kind == TRANSFER_IN else \
+                        transaction._amount
+                    # Decimal amounts with at most `places` decimal places convert exactly.
+                    if type(amount) is Decimal:
+                        change, denominator = amount.scaleb(places).as_integer_ratio()
+                        if denominator != 1:
+                            change = to_minor(amount, places)
+                    else:
+                        change = to_minor(amount, places)
+                    if kind == BILL or kind == TRANSFER_OUT:
+                        change = -change
+                # The change goes first: it is the only column that may overflow.
+                changes.append(change)
+                day = operation._recorded
+                kinds.append(kind)
+                account_col.append(account_id)
+                recorded.append(day.toordinal() if day else 0)
+        except OverflowError:
+            self._truncate(len(self._starts), rows, accounts)
+            raise ValueError('Amount {amount} is too large to store.'.format(
+                amount=operation.balance_change()))
+        except Exception:
+            self._truncate(len(self._starts), rows, accounts)
+            raise
+        starts = self._starts
+        index = len(starts)
+        starts.append(rows)
+        self._dates.append(transaction._date.toordinal())
+        self._entered.append(transaction._entered.toordinal())
+        self._categories.append(self._category_id(getattr(transaction, '_category', None)))
+        views = self._views
+        views[index] = weakref.ref(transaction)
+        self._indexes[id(transaction)] = index
+        if len(views) > self._sweep_at:
+            self._sweep()
+
+    def extend(self, transactions):
+        """
+        Stores a batch of transactions. Nothing is stored if any of them cannot be.
+        :param transactions: iterable of Deposits, Bills and Transfers
+        """
+        count, rows, accounts = len(self._starts), len(self._kinds), len(self._accounts)
+        try:
+            for transaction in transactions:
+                self.append(transaction)
+        except Exception:
+            self._truncate(count, rows, accounts)
+            raise
+
+    def _truncate(self, count, rows, accounts):
+        """
+        Drops transactions from index count, rows from row rows and accounts from account id
+        accounts on, left behind by a failed append.
+        """
+        with self._lock:
+            for index in range(count, len(self._starts)):
+                self._views.pop(index, None)
+            # Indexes of dropped transactions are left to the sweep: their views are gone.
+            for name, _ in COLUMNS:
+                column = getattr(self, name)
+                del column[count if name in TRANSACTION_COLUMNS else rows:]
+            self._drop_accounts(accounts)
+            if self._scanned > rows:
+                for unrecorded in self._unrecorded.values():
+                    for row in [row for row in unrecorded if row >= rows]:
+                        del unrecorded[row]
+                self._scanned = rows
+
+    def _sweep(self):
+        """
+        Drops the references to transactions no longer alive.
+        """
+        with self._lock:
+            self._views = {index: reference for index, reference in self._views.items()
+                           if reference() is not None}
+            self._indexes = {key: index for key, index in self._indexes.items()
+                             if self._index_of(key, index) is not None}
+            self._sweep_at = max(2 * len(self._views), self.SWEEP_MIN)
+
+    def row(self, operation):
+        """
+        Finds the row of a stored operation.
+        :param operation: an operation handed out by (or entered into) this store
+        :return: the row, or None if not stored
+        """
+        transaction = operation._transaction
+        index = self._index_of(id(transaction), self._indexes.get(id(transaction)))
+        if index is None:
+            return None
+        return self._starts[index] + transaction.operations().index(operation)
+
+    def _index_of(self, key, index):
+        """
+        Returns index if the live transaction there has id key, None otherwise.
+        """
+        reference = self._views.get(index)
+        if reference is None or id(reference()) != key:
+            return None
+        return index
+
+    def operation(self, row):
+        """
+        Returns the operation of a row.
+        """
+        index = bisect_right(self._starts, row) - 1
+        return self[index].operations()[row - self._starts[index]]
+
+    def record(self, operation):
+        """
+        Writes the recorded date of a stored operation through to its row.
+        :param operation: an operation handed out by (or entered into) this store
+        """
+        row = self.row(operation)
+        if row is not None:
+            self._recorded[row] = operation.recorded().toordinal()
+            if row < self._scanned:
+                self._unrecorded[self._account_col[row]].pop(row, None)
+
+    def categorize(self, transaction):
+        """
+        Writes the category of a stored transaction through to its column.
+        :param transaction: a Deposit or Bill handed out by (or entered into) this store
+        """
+        index = self._index_of(id(transaction), self._indexes.get(id(transaction)))
+        if index is not None:
+            self._categories[index] = self._category_id(transaction._category)
+
+    def locate(self, operation):
+        """
+        Finds a stored operation.
+        :param operation: an operation handed out by (or entered into) this store
+        :return: (transaction index, position within the transaction), or None if not stored
+        """
+        row = self.row(operation)
+        if row is None:
+            return None
+        index = self._indexes[id(operation._transaction)]
+        return index, row - self._starts[index]
+
+    def unrecorded(self):
+        """
+        Returns a generator of indexes of transactions with any operation not recorded yet.
+        """
+        starts = self._starts
+        last = -1
+        for row, recorded in enumerate(self._recorded):
+            if not recorded:
+                index = bisect_right(starts, row) - 1
+                if index != last:
+                    last = index
+                    yield index
+
+    def unrecorded_rows(self, account):
+        """
+        Returns the rows of operations on an account not recorded yet, in row order.
+        :return: a dict of the rows (with None values), kept up to date by the store
+        """
+        stop = len(self._kinds)
+        if self._scanned < stop:
+            unrecorded = self._unrecorded
+            start = self._scanned
+            for row, account_id in compress(
+                    zip(count(start), islice(self._account_col, start, stop)),
+                    map(not_, islice(self._recorded, start, stop))):
+                rows = unrecorded.get(account_id)
+                if rows is None:
+                    rows = unrecorded[account_id] = {}
+                rows[row] = None
+            self._scanned = stop
+        return self._unrecorded.get(self._account_ids.get(account), {})
+
+    def pending_index(self, account):
+        """
+        Returns the PendingIndex of an account of the owning Logbook, read from the store.
+        """
+        return PendingRows(self, account)
+
+    def summaries(self, start=0):
+        """
+        Returns a generator of (transaction index, date ordinal, accounts of its operations) of
+        the transactions from start on, read from the columns without materialising them.
+        """
+        accounts = self._accounts
+        account_col = self._account_col
+        starts = self._starts
+        ends = chain(islice(starts, start + 1, None), (len(self._kinds),))
+        for index, day, first, last in zip(count(start), islice(self._dates, start, None),
+                                           islice(starts, start, None), ends):
+            if last == first + 1:
+                yield index, day, (accounts[account_col[first]],)
+            else:
+                yield index, day, [accounts[account_col[row]] for row in range(first, last)]
+
+    def _account_id(self, account):
+        account_id = self._account_ids.get(account)
+        if account_id is None:
+            account_id = len(self._accounts)
+            self._accounts.append(account)
+            self._account_ids[account] = account_id
+        return account_id
+
+    def _category_id(self, category):
+        path = str(category) if category is not None else None
+        category_id = self._category_ids.get(path)
+        if category_id is None:
+            category_id = len(self._category_paths)
+            self._category_paths.append(path)
+            self._category_ids[path] = category_id
+        return category_id
+
+    def _drop_accounts(self, accounts):
+        for account in self._accounts[accounts:]:
+            del self._account_ids[account]
+        del self._accounts[accounts:]
+
+    def _materialise(self, index):
+        start = self._starts[index]
+        end = self._starts[index + 1] if index + 1 < len(self._starts) else len(self._kinds)
+        transaction = build_transaction(
+            self._kinds[start], [self._accounts[i] for i in self._account_col[start:end]],
+            self._changes[start:end], self._recorded[start:end],
+            date.fromordinal(self._dates[index]), date.fromordinal(self._entered[index]),
+            self._places, self._category_paths[self._categories[index]])
+        with self._lock:
+            # Another thread may have materialised it meanwhile.
+            reference = self._views.get(index)
+            existing = reference() if reference is not None else None
+            if existing is not None:
+                return existing
+            self._views[index] = weakref.ref(transaction)
+            self._indexes[id(transaction)] = index
+        return transaction
+
+
+class PendingRows(PendingIndex):
+    """
+    PendingIndex of an account of a Logbook backed by a ColumnarStore, read from the rows of
+    unrecorded operations the store keeps: entering and recording operations cost nothing
+    here, and operations are only materialised when listed.
+    """
+
+    def __init__(self, store, account):
+        """
+        Constructor
+        :param store: the ColumnarStore
+        :param account: the account, whose operations are all stored in store
+        """
+        self._store = store
+        self._account = account
+
+    def __len__(self):
+        return len(self._store.unrecorded_rows(self._account))
+
+    def __iter__(self):
+        operation = self._store.operation
+        return iter([operation(row) for row in self._store.unrecorded_rows(self._account)])
+
+    def total(self):
+        rows = self._store.unrecorded_rows(self._account)
+        changes = self._store._changes
+        return self._account.amount_of(sum(changes[row] for row in rows),
+                                       self._store.places())
+
+    def add(self, operation):
+        """Does nothing, the store indexes stored operations."""
+
+    def extend(self, operations):
+        """Does nothing, the store indexes stored operations."""
+
+    def discard(self, operation):
+        """Does nothing, the store drops recorded operations."""
+
+    def copy(self, mapped=None):
+        index = PendingIndex(self._account.amount_of(0))
+        index.extend(map(mapped, self) if mapped is not None else self)
+        return index
+
+    def aging(self, on, limits=(30, 60, 90)):
+        store = self._store
+        rows = store.unrecorded_rows(self._account)
+        starts, dates, changes = store._starts, store._dates, store._changes
+        totals = [0] * (len(limits) + 1)
+        day = on.toordinal()
+        for row in rows:
+            age = day - dates[bisect_right(starts, row) - 1]
+            totals[bisect_right(limits, age)] += changes[row]
+        return [self._account.amount_of(units, store.places()) for units in totals]
+
+
+class ForkedStore:
+    """
+    Transaction storage of a forked Logbook (see Logbook.fork()): the first transactions of the
+    parent's storage, shared and read-only, followed by the fork's own transactions in a list.
+
+    Shared transactions are read as copies on the fork's accounts. The store keeps the copies
+    of transactions pending at the time of the fork, whose operations get recorded separately
+    on either side; the other ones were fully recorded already, so they are copied when
+    accessed and shared while referenced.
+    """
+
+    def __init__(self, base, count, read_only=False, accounts=None):
+        """
+        Constructor
+        :param base: the parent's transaction storage (a list or a store)
+        :param count: number of the parent's transactions included in the fork
+        :param read_only: refuse new transactions
+        :param accounts: dict of the fork's accounts by the parent's; shared transactions are
+                         read as they are if None
+        """
+        accounts = accounts or {}
+        # Copies kept by the store, with their originals in `base`, by id() of the original.
+        pinned = {}
+        self._forwarded = None
+        # A fork of a fork only including shared transactions shares them directly, reading
+        # them through the parent fork's accounts and copies. The parent's own base is never
+        # such a fork.
+        if isinstance(base, ForkedStore) and count <= base._count:
+            for key, (original, copy) in base._pinned.items():
+                pinned[key] = (original, copy_transaction(copy, accounts))
+            self._forwarded = base._originals
+            accounts = {original: accounts.get(forked, forked)
+                        for original, forked in base._accounts.items()}
+            base = base._base
+        self._base = base
+        self._count = count
+        self._own = []
+        self._read_only = read_only
+        self._accounts = accounts
+        self._pinned = pinned
+        self._originals = {id(copy): original for original, copy in pinned.values()}
+        self._views = weakref.WeakValueDictionary()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pinned'] = list(self._pinned.values())
+        state['_forwarded'] = None
+        del state['_originals'], state['_views']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._pinned = {id(original): (original, copy) for original, copy in state['_pinned']}
+        self._originals = {id(copy): original for original, copy in state['_pinned']}
+        self._views = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return self._count + len(self._own)
+
+    def __iter__(self):
+        for index, transaction in enumerate(islice(self._base, self._count)):
+            yield self._shared(index, transaction)
+        yield from self._own
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('ForkedStore index out of range')
+        if index < self._count:
+            return self._shared(index, self._base[index])
+        return self._own[index - self._count]
+
+    def _shared(self, index, transaction):
+        if not self._accounts:
+            return transaction
+        pinned = self._pinned.get(id(transaction))
+        if pinned is not None:
+            return pinned[1]
+        copy = self._views.get(index)
+        if copy is None:
+            copy = self._views[index] = copy_transaction(transaction, self._accounts)
+        return copy
+
+    def fork_operation(self, operation):
+        """
+        Returns the fork's copy of an operation of a shared transaction, kept by the store.
+        :param operation: an operation of the parent Logbook pending at the time of the fork
+        """
+        transaction = operation._transaction
+        if self._forwarded is not None:
+            transaction = self._forwarded.get(id(transaction), transaction)
+        pinned = self._pinned.get(id(transaction))
+        if pinned is None:
+            copy = copy_transaction(transaction, self._accounts)
+            self._pinned[id(transaction)] = (transaction, copy)
+            self._originals[id(copy)] = transaction
+        else:
+            copy = pinned[1]
+        for original, copied in zip(operation._transaction.operations(), copy.operations()):
+            if original is operation:
+                return copied
+
+    def append(self, transaction):
+        """
+        Stores a transaction.
+        """
+        self.extend((transaction,))
+
+    def extend(self, transactions):
+        """
+        Stores a batch of transactions.
+        :raises ValueError: if the store is read-only
+        """
+        if self._read_only:
+            raise ValueError('Transactions cannot be entered into a Logbook snapshot.')
+        self._own.extend(transactions)
+
+
+def copy_transaction(transaction, accounts):
+    """
+    Copies a transaction, with the same recorded dates, onto other accounts.
+    :param transaction: a Deposit, Bill or Transfer
+    :param accounts: dict of the copy's accounts by the transaction's; accounts not in it are
+                     kept
+    """
+    operations = transaction.operations()
+    mapped = [accounts.get(operation._account, operation._account) for operation in operations]
+    if isinstance(transaction, Transfer):
+        copy = type(transaction)(mapped[0], mapped[1], transaction._amount, transaction._date,
+                                 transaction._entered, transaction._amount_in)
+    else:
+        copy = type(transaction)(mapped[0], transaction._amount, transaction._date,
+                                 transaction._entered, transaction._category)
+    for operation, original in zip(copy.operations(), operations):
+        operation._recorded = original._recorded
+    return copy
+
+
+def build_transaction(kind, accounts, changes, recorded, tx_date, entered, places=2,
+                      category=None):
+    """
+    Builds a transaction out of its stored operation rows.
+    :param kind: kind of the first operation (DEPOSIT, BILL or TRANSFER_OUT)
+    :param accounts: accounts of the operations
+    :param changes: balance changes of the operations, in minor units
+    :param recorded: recorded date ordinals of the operations, 0 if not recorded
+    :param places: number of decimal places of the minor units
+    :param category: category path of a Deposit or Bill, None if not categorised
+    """
+    change = accounts[0].amount_of(changes[0], places)
+    if kind == DEPOSIT:
+        transaction = Deposit(accounts[0], change, tx_date, entered, category)
+    elif kind == BILL:
+        transaction = Bill(accounts[0], -change, tx_date, entered, category)
+    else:
+        transaction = Transfer(accounts[0], accounts[1], -change, tx_date, entered,
+                               accounts[1].amount_of(changes[1], places))
+    for operation, day in zip(transaction.operations(), recorded):
+        operation._recorded = date.fromordinal(day) if day else None
+    return transaction
@@ -1,13 +1,30 @@
+from beancounter.basics.money import Money
 from datetime import date
 
 
+def _check_amount(account, amount):
+    """
+    Checks an amount fits an account: Money in the account's currency for Money-denominated
+    accounts, anything else for the others.
+    """
+    money = getattr(account, '_money', None)
+    if money is None:
+        return
+    if money != (type(amount) is Money) or (money and amount.currency() != account.currency()):
+        raise ValueError('Amount {amount!r} does not fit {account!r}.'.format(
+            amount=amount, account=account))
+
+
 class Transaction:
     """
     Base class for all recorded transactions.
 
-    A transaction consists of one or more operations.
+    A transaction consists of one or more operations. Transactions and operations are slotted,
+    without a per-instance __dict__; the kind of an operation is its (slot-less) class.
     """
 
+    __slots__ = ('_date', '_entered', '__weakref__')
+
     def __init__(self, tx_date, entered=None):
         """
         Constructor
@@ -16,7 +33,6 @@ class Transaction:
         """
         self._date = tx_date
         self._entered = entered if entered else date.today()
-        self._operations = []
 
     # TODO: str() and repr()
 
@@ -29,8 +45,11 @@ class Transaction:
         return self._entered
 
     def operations(self):
-        """A list of operations included in this transaction."""
-        return self._operations
+        """
+        Abstract. When implemented it should return a tuple of the operations included in this
+        transaction.
+        """
+        raise NotImplementedError()
 
 
 class Operation:
@@ -38,6 +57,8 @@ class Operation:
     Represents an atomic operation performed on a given account.
     """
 
+    __slots__ = ('_transaction', '_account', '_recorded', '__weakref__')
+
     def __init__(self, transaction, account):
         self._transaction = transaction
         self._account = account
@@ -47,16 +68,28 @@ class Operation:
         """Account affected by this operation."""
         return self._account
 
+    def transaction(self):
+        """Transaction this operation belongs to."""
+        return self._transaction
+
+    def date(self):
+        """Date of the transaction this operation belongs to."""
+        return self._transaction.date()
+
     def recorded(self):
         """Date the Transaction was recorded by bank"""
         return self._recorded
 
     def record(self, recorded):
         """Records the operation and updates the affected account."""
-        if self._recorded:
-            raise ValueError('This operation has already been recorded.')
-        self._recorded = recorded
-        self._account.record(self)
+        self._account.record(self, recorded)
+
+    def balance_units(self):
+        """
+        Abstract. When implemented it should return the balance change in minor units, for
+        operations with Money amounts.
+        """
+        raise NotImplementedError()
 
 
 class DepositOperation(Operation):
@@ -64,18 +97,28 @@ class DepositOperation(Operation):
     Represents a deposit operation
     """
 
+    __slots__ = ()
+
     def balance_change(self):
         return self._transaction._amount
 
+    def balance_units(self):
+        return self._transaction._amount._units
+
 
 class BillOperation(Operation):
     """
     Represents a bill operation
     """
 
+    __slots__ = ()
+
     def balance_change(self):
         return -self._transaction._amount
 
+    def balance_units(self):
+        return -self._transaction._amount._units
+
 
 class Deposit(Transaction):
     """
@@ -84,18 +127,45 @@ class Deposit(Transaction):
     Simple transactions affect a single account with a single operation.
     """
 
-    def __init__(self, account, amount, tx_date, entered=None):
+    __slots__ = ('_amount', '_operation', '_category')
+
+    def __init__(self, account, amount, tx_date, entered=None, category=None):
         """
         Constructor
         :param account: affected account
         :param amount: transaction amount
         :param tx_date: transaction date
         :param entered: date it was entered to the system, today() if None
+        :param category: budget category, a Category or a path (see CategoryTree)
         """
         super().__init__(tx_date, entered)
+        _check_amount(account, amount)
 
         self._amount = amount
-        self._operations.append(DepositOperation(self, account))
+        self._operation = DepositOperation(self, account)
+        self._category = category
+
+    def amount(self):
+        """The transaction amount."""
+        return self._amount
+
+    def category(self):
+        """Budget category, None if not categorised."""
+        return self._category
+
+    def categorize(self, category):
+        """
+        Changes the budget category, writing it through to the Logbook of the account if any.
+        :param category: a Category or a path (see CategoryTree), None if not categorised
+        """
+        self._category = category
+        logbook = getattr(self._operation._account, '_logbook', None)
+        if logbook is not None:
+            logbook._categorized(self)
+
+    def operations(self):
+        """A tuple of the single operation of this transaction."""
+        return self._operation,
 
         # TODO: str() and repr()
 
@@ -107,18 +177,45 @@ class Bill(Transaction):
     Simple transactions affect a single account with a single operation.
     """
 
-    def __init__(self, account, amount, tx_date, entered=None):
+    __slots__ = ('_amount', '_operation', '_category')
+
+    def __init__(self, account, amount, tx_date, entered=None, category=None):
         """
         Constructor
         :param account: affected account
         :param amount: transaction amount
         :param tx_date: transaction date
         :param entered: date it was entered to the system, today() if None
+        :param category: budget category, a Category or a path (see CategoryTree)
         """
         super().__init__(tx_date, entered)
+        _check_amount(account, amount)
 
         self._amount = amount
-        self._operations.append(BillOperation(self, account))
+        self._operation = BillOperation(self, account)
+        self._category = category
+
+    def amount(self):
+        """The transaction amount."""
+        return self._amount
+
+    def category(self):
+        """Budget category, None if not categorised."""
+        return self._category
+
+    def categorize(self, category):
+        """
+        Changes the budget category, writing it through to the Logbook of the account if any.
+        :param category: a Category or a path (see CategoryTree), None if not categorised
+        """
+        self._category = category
+        logbook = getattr(self._operation._account, '_logbook', None)
+        if logbook is not None:
+            logbook._categorized(self)
+
+    def operations(self):
+        """A tuple of the single operation of this transaction."""
+        return self._operation,
 
         # TODO: str() and repr()
 
@@ -128,9 +225,14 @@ class TransferIn(Operation):
     Represents an incoming side of a Transfer
     """
 
+    __slots__ = ()
+
     def balance_change(self):
         """The actual change to the account_balance. Usually equal to amount() or -amount()."""
-        return self._transaction._amount
+        return self._transaction._amount_in
+
+    def balance_units(self):
+        return self._transaction._amount_in._units
 
 
 class TransferOut(Operation):
@@ -138,38 +240,56 @@ class TransferOut(Operation):
     Represents an incoming side of a Transfer
     """
 
+    __slots__ = ()
+
     def balance_change(self):
         """The actual change to the account _balance. Usually equal to amount() or -amount()."""
         return -self._transaction._amount
 
+    def balance_units(self):
+        return -self._transaction._amount._units
+
 
 class Transfer(Transaction):
     """
     Represents a transfer between accounts
     """
 
-    def __init__(self, account_from, account_to, amount, tx_date, entered=None):
+    __slots__ = ('_amount', '_amount_in', '_out', '_in')
+
+    def __init__(self, account_from, account_to, amount, tx_date, entered=None, amount_in=None):
         """
         Constructor
         :param amount: transfer amount
         :param tx_date: transfer date (when initiated)
         :param entered: date the transfer was entered to the system
-        :param out_recorded: date the transfer was recorded at source bank
-        :param in_recorded: date the transfer was recorded at destination bank
+        :param amount_in: amount received by account_to, when in a different currency; the
+                          same as amount if None
         :return:
         """
         super().__init__(tx_date, entered)
+        if amount_in is None:
+            amount_in = amount
+        _check_amount(account_from, amount)
+        _check_amount(account_to, amount_in)
 
         self._amount = amount
+        self._amount_in = amount_in
         self._out = TransferOut(self, account_from)
         self._in = TransferIn(self, account_to)
-        self._operations.append(self._out)
-        self._operations.append(self._in)
+
+    def operations(self):
+        """The outgoing and incoming operations, in this order."""
+        return self._out, self._in
 
     def amount(self):
         """The transfer amount."""
         return self._amount
 
+    def amount_in(self):
+        """The amount received, in the currency of the destination account."""
+        return self._amount_in
+
     def incoming(self):
         """Incoming side of the Transfer"""
         return self._in
@@ -0,0 +1,30 @@
+from beancounter.basics.money import Money
+from decimal import Decimal
+
+
+def to_minor(amount, places=2):
+    """
+    Converts an amount to an integer number of minor units (e.g. cents).
+    :param amount: amount to convert (Decimal, Money or int)
+    :param places: number of decimal places in a minor unit
+    :return: int
+    """
+    if isinstance(amount, Money):
+        if places == Money.PLACES:
+            return amount.units()
+        amount = amount.decimal()
+    units, denominator = Decimal(amount).scaleb(places).as_integer_ratio()
+    if denominator != 1:
+        raise ValueError('Amount {amount} has more than {places} decimal places.'.format(
+            amount=amount, places=places))
+    return units
+
+
+def from_minor(units, places=2):
+    """
+    Converts an integer number of minor units back to a Decimal amount.
+    :param units: number of minor units
+    :param places: number of decimal places in a minor unit
+    :return: Decimal with exactly `places` decimal places
+    """
+    return Decimal(units).scaleb(-places)
@@ -0,0 +1,256 @@
+from beancounter.basics.account import LogbookSubscriber
+from beancounter.basics.index import FenwickTree
+from decimal import Decimal
+
+SEPARATOR = ' > '
+
+
+class Category:
+    """
+    Node of a CategoryTree, e.g. Electricity in Housing > Utilities > Electricity.
+    """
+
+    def __init__(self, name, parent=None):
+        """
+        Constructor, use CategoryTree.category() or Category.child() instead.
+        :param name: name of the category, unique among its siblings
+        :param parent: parent Category, None for a top-level one
+        """
+        self._name = name
+        self._parent = parent
+        self._children = {}
+
+    def name(self):
+        return self._name
+
+    def parent(self):
+        """Parent Category, None for a top-level one."""
+        return self._parent
+
+    def children(self):
+        """A list of subcategories, in the order they were added."""
+        return list(self._children.values())
+
+    def child(self, name):
+        """
+        Returns the subcategory of a given name, adding it if there is none.
+        """
+        child = self._children.get(name)
+        if child is None:
+            child = self._children[name] = Category(name, self)
+        return child
+
+    def ancestors(self):
+        """
+        Returns a list of the category and its ancestors, up to the top-level one.
+        """
+        categories = []
+        category = self
+        while category is not None:
+            categories.append(category)
+            category = category._parent
+        return categories
+
+    def path(self):
+        """Names of the categories from the top-level one, joined by ' > '."""
+        return SEPARATOR.join(category._name for category in reversed(self.ancestors()))
+
+    def __str__(self):
+        return self.path()
+
+    def __repr__(self):
+        return "Category('{path}')".format(path=self.path())
+
+
+class CategoryTree:
+    """
+    Hierarchy of budget categories. Categories are identified by their paths, names from a
+    top-level category down joined by ' > ', and added as they are first looked up.
+    """
+
+    def __init__(self):
+        self._roots = {}
+
+    def roots(self):
+        """A list of top-level categories, in the order they were added."""
+        return list(self._roots.values())
+
+    def category(self, path):
+        """
+        Returns the category of a path, adding it and its missing ancestors.
+        :param path: e.g. 'Housing > Utilities > Electricity', or a Category, returned as is
+        """
+        if isinstance(path, Category):
+            return path
+        names = [name.strip() for name in path.split(SEPARATOR.strip())]
+        if not all(names):
+            raise ValueError('Invalid category path: {path!r}.'.format(path=path))
+        category = self._roots.get(names[0])
+        if category is None:
+            category = self._roots[names[0]] = Category(names[0])
+        for name in names[1:]:
+            category = category.child(name)
+        return category
+
+    def __iter__(self):
+        """
+        Returns a generator of all categories, depth first.
+        """
+        stack = list(reversed(self.roots()))
+        while stack:
+            category = stack.pop()
+            yield category
+            stack.extend(reversed(category.children()))
+
+
+def _change(transaction):
+    return transaction.operations()[0].balance_change()
+
+
+class CategoryTotals(LogbookSubscriber):
+    """
+    Totals of categorised transactions per category and day, including those of subcategories.
+    Transactions count with their balance change: deposits add to the totals, bills subtract.
+
+    Every category keeps a FenwickTree of its subtree's totals by day (from `start`), so adding,
+    removing or re-categorising a transaction updates the category and its ancestors in
+    O(depth * log days), and the total of a category over any date range costs O(log days),
+    without scanning transactions.
+
+    Subscribed to a Logbook, it adds categorised transactions as they are entered, follows them
+    as they are re-categorised and adds the ones entered without a category once they get one;
+    budgets add projected occurrences of their plans directly.
+
+    Transactions of a Logbook whose storage locates them (e.g. ColumnarStore) are tracked by
+    their location, so ones materialised again by the store are still known; other transactions
+    are kept referenced until removed.
+    """
+
+    def __init__(self, start, tree=None, zero=Decimal('0.00')):
+        """
+        Constructor
+        :param start: first day of the totals; transactions dated before it are rejected
+        :param tree: the CategoryTree transaction categories are looked up in, a new one if None
+        :param zero: zero amount of the totals, e.g. Money('0.00', 'EUR')
+        """
+        self._origin = start.toordinal()
+        self._tree = tree if tree is not None else CategoryTree()
+        self._zero = zero
+        self._totals = {}
+        # Categories the transactions were added under, by key (see _key()).
+        self._added = {}
+        # Keys of transactions entered without a category, added when they get one.
+        self._uncategorized = set()
+
+    def tree(self):
+        return self._tree
+
+    def entered(self, transaction):
+        if getattr(transaction, '_category', None) is not None:
+            self.add(transaction)
+        elif hasattr(transaction, '_category'):
+            self._uncategorized.add(self._key(transaction))
+
+    def categorized(self, transaction):
+        self._follow(transaction)
+
+    def _key(self, transaction):
+        """
+        Returns (storage id, transaction index) for a transaction of a Logbook whose storage
+        locates it, the transaction itself otherwise.
+        """
+        operation = transaction.operations()[0]
+        logbook = getattr(operation._account, '_logbook', None)
+        store = logbook._transactions if logbook is not None else None
+        locate = getattr(store, 'locate', None)
+        location = locate(operation) if locate is not None else None
+        return (id(store), location[0]) if location is not None else transaction
+
+    def _position(self, transaction):
+        position = transaction.date().toordinal() - self._origin
+        if position < 0:
+            raise ValueError('Transaction on {day} is before the start of the totals.'.format(
+                day=transaction.date()))
+        return position
+
+    def _update(self, category, position, amount):
+        for category in category.ancestors():
+            totals = self._totals.get(category)
+            if totals is None:
+                totals = self._totals[category] = FenwickTree(self._zero)
+            totals.add(position, amount)
+
+    def add(self, transaction):
+        """
+        Adds a transaction's balance change to its category and the category's ancestors.
+        :param transaction: a Bill or Deposit, with a category
+        :raises ValueError: if the transaction has no category, was already added or is dated
+                            before the start of the totals
+        """
+        if transaction.category() is None:
+            raise ValueError('The transaction has no category.')
+        key = self._key(transaction)
+        if key in self._added:
+            raise ValueError('The transaction has already been added.')
+        category = self._tree.category(transaction.category())
+        self._update(category, self._position(transaction), _change(transaction))
+        self._added[key] = category
+
+    def remove(self, transaction):
+        """
+        Removes a transaction added to the totals.
+        :raises ValueError: if the transaction was not added
+        """
+        category = self._added.pop(self._key(transaction), None)
+        if category is None:
+            raise ValueError('The transaction has not been added.')
+        self._update(category, self._position(transaction), -_change(transaction))
+
+    def recategorize(self, transaction, category):
+        """
+        Moves a transaction to another category, updating the totals if it was added to them.
+        A transaction entered without a category into a Logbook the totals are subscribed to
+        is added to them.
+        :param category: a Category or a path
+        """
+        transaction.categorize(self._tree.category(category))
+        # Already followed if the totals are subscribed to the transaction's Logbook.
+        self._follow(transaction)
+
+    def _follow(self, transaction):
+        """
+        Moves an added transaction to its current category, and adds a transaction entered
+        without a category once it has one.
+        """
+        key = self._key(transaction)
+        category = transaction.category()
+        previous = self._added.get(key)
+        if previous is not None:
+            category = self._tree.category(category) if category is not None else None
+            if category is previous:
+                return
+            position = self._position(transaction)
+            change = _change(transaction)
+            self._update(previous, position, -change)
+            if category is None:
+                del self._added[key]
+                self._uncategorized.add(key)
+            else:
+                self._update(category, position, change)
+                self._added[key] = category
+        elif key in self._uncategorized and category is not None:
+            self._uncategorized.discard(key)
+            self.add(transaction)
+
+    def total(self, category, start=None, end=None):
+        """
+        Returns the total of transactions in a category and its subcategories, dated between
+        start and end (both inclusive, open-ended if None).
+        :param category: a Category or a path
+        """
+        totals = self._totals.get(self._tree.category(category))
+        if totals is None:
+            return self._zero
+        first = max(start.toordinal() - self._origin, 0) if start is not None else 0
+        last = end.toordinal() - self._origin if end is not None else len(totals)
+        return totals.total_between(first, last)
@@ -0,0 +1,138 @@
+"""
+Cash-flow forecast: per-day balances of accounts over a horizon, combining the operations
+already entered in a Logbook with the occurrences of planned transactions.
+
+Balances are kept per account as array('q') of integers in minor units, one item per day of
+the horizon. Plans are never projected transaction by transaction: occurrences of a fixed
+step (daily and weekly plans) are added as two marks into a strided difference array, other
+frequencies add their (few) occurrence dates directly.
+"""
+from beancounter.basics.utils import to_minor
+from array import array
+from bisect import bisect_right
+from datetime import date, timedelta
+from itertools import accumulate
+from operator import add
+
+
+class Forecast:
+    """
+    Per-day balance forecast of accounts between start and end (both inclusive).
+    """
+
+    def __init__(self, logbook, plans, start, end, places=2):
+        """
+        Constructor
+        :param logbook: Logbook with the accounts and their entered operations
+        :param plans: iterable of PlannedTransactions; operations of plans without an
+                      account are left out
+        :param start: first day of the forecast
+        :param end: last day of the forecast
+        :param places: number of decimal places of the amounts
+        """
+        if end < start:
+            raise ValueError('Forecast end {end} is before its start {start}.'.format(
+                end=end, start=start))
+        self._start = start
+        self._end = end
+        self._places = places
+        self._days = end.toordinal() - start.toordinal() + 1
+        self._accounts = []
+        self._deltas = {}
+        self._balances = {}
+        self._minimums = {}
+
+        for account in logbook.accounts():
+            self._add_account(account)
+        self._add_plans(plans)
+
+        for account in self._accounts:
+            deltas = self._deltas.pop(account)
+            deltas[0] += to_minor(account.balance_at(start - timedelta(days=1)), places)
+            self._balances[account] = array('q', accumulate(deltas))
+
+    def start(self):
+        """First day of the forecast."""
+        return self._start
+
+    def end(self):
+        """Last day of the forecast."""
+        return self._end
+
+    def accounts(self):
+        """A list of forecast accounts: the Logbook's, then the ones only used by plans."""
+        return self._accounts
+
+    def balances(self, account):
+        """
+        Returns an array('q') of the account's balance at the end of each day, in minor units.
+        """
+        return self._balances[account]
+
+    def balance_on(self, account, day):
+        """
+        Returns the forecast balance of an account at the end of a given day.
+        """
+        return account.amount_of(self._balances[account][self._position(day)], self._places)
+
+    def first_below(self, account, threshold):
+        """
+        Returns the first day the account's balance goes below threshold, None if it does not.
+        """
+        minimums = self._minimums.get(account)
+        if minimums is None:
+            # Negated running minimum of the balance: non-decreasing, so it can be bisected.
+            minimums = array('q', (-balance for balance in
+                                   accumulate(self._balances[account], min)))
+            self._minimums[account] = minimums
+        position = bisect_right(minimums, -to_minor(threshold, self._places))
+        if position == self._days:
+            return None
+        return date.fromordinal(self._start.toordinal() + position)
+
+    def _position(self, day):
+        position = day.toordinal() - self._start.toordinal()
+        if not 0 <= position < self._days:
+            raise ValueError('{day} is outside of the forecast ({start} to {end}).'.format(
+                day=day, start=self._start, end=self._end))
+        return position
+
+    def _add_account(self, account):
+        origin = self._start.toordinal()
+        deltas = array('q', bytes(8 * self._days))
+        for ordinal, change in account.changes_between(self._start, self._end):
+            deltas[ordinal - origin] += to_minor(change, self._places)
+        self._accounts.append(account)
+        self._deltas[account] = deltas
+
+    def _add_plans(self, plans):
+        origin = self._start.toordinal()
+        days = self._days
+        strided = {}
+        for plan in plans:
+            ordinals = plan.dates(self._start, self._end)
+            if not ordinals:
+                continue
+            changes = [(operation.account(), to_minor(operation.balance_change(), self._places))
+                       for operation in plan.project(plan.start()).operations()
+                       if operation.account() is not None]
+            for account, change in changes:
+                if account not in self._deltas:
+                    self._add_account(account)
+                if isinstance(ordinals, range):
+                    marks = strided.get((account, ordinals.step))
+                    if marks is None:
+                        marks = strided[account, ordinals.step] = array('q', bytes(8 * days))
+                    marks[ordinals[0] - origin] += change
+                    after = ordinals[-1] + ordinals.step - origin
+                    if after < days:
+                        marks[after] -= change
+                else:
+                    deltas = self._deltas[account]
+                    for ordinal in ordinals:
+                        deltas[ordinal - origin] += change
+
+        for (account, step), marks in strided.items():
+            for offset in range(min(step, days)):
+                marks[offset::step] = array('q', accumulate(marks[offset::step]))
+            self._deltas[account] = array('q', map(add, self._deltas[account], marks))
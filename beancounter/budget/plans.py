@@ -1,9 +1,289 @@
-#TODO: PlannedBill, PlannedIncome, PlannedTransfer?
-#TODO: Types: Once, Recurring, Ongoing
-#TODO: Has category, optional account (or maybe just default account?)
+from beancounter.basics.money import Money
+from beancounter.basics.transaction import Bill, Deposit, Transfer
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+from fractions import Fraction
+import heapq
+
 
 class PlannedTransaction:
-    pass
+    """
+    Base class for planned (budgeted) transactions.
+
+    A plan ties an amount to a Frequency: Once for a single planned transaction, any other
+    Frequency for a recurring one, optionally ending on a given date. Occurrences are projected
+    as regular transactions, lazily and only for the date window being asked for.
+    """
+
+    def __init__(self, amount, frequency, end=None, category=None):
+        """
+        Constructor
+        :param amount: planned amount
+        :param frequency: Frequency of the occurrences
+        :param end: last day the plan is in effect, open-ended if None
+        :param category: budget category
+        """
+        self._amount = amount
+        self._frequency = frequency
+        self._end = end
+        self._category = category
+
+    def amount(self):
+        """Planned amount of each occurrence."""
+        return self._amount
+
+    def frequency(self):
+        """Frequency of the occurrences."""
+        return self._frequency
+
+    def start(self):
+        """First day the plan is in effect."""
+        return self._frequency.start
+
+    def end(self):
+        """Last day the plan is in effect, None if open-ended."""
+        return self._end
+
+    def category(self):
+        """Budget category."""
+        return self._category
+
+    def dates(self, start, end):
+        """
+        Returns date ordinals of occurrences between start and end (both inclusive).
+        """
+        if self._end is not None and self._end < end:
+            end = self._end
+        return self._frequency.ordinals_between(start, end)
+
+    def count(self, start, end):
+        """
+        Returns the number of occurrences between start and end (both inclusive), in O(1).
+        """
+        if self._end is not None and self._end < end:
+            end = self._end
+        return self._frequency.count_between(start, end)
+
+    def occurrences(self, start, end):
+        """
+        Returns a generator of projected transactions between start and end (both inclusive).
+        """
+        for ordinal in self.dates(start, end):
+            yield self.project(date.fromordinal(ordinal))
+
+    def accrued(self, day):
+        """
+        Returns the number of occurrences accrued before a day, as a Fraction, in O(1).
+
+        Each occurrence accrues evenly over the days from its date to the next occurrence's (its
+        own date only, for the last occurrence of a Once frequency), until the end of the plan.
+        """
+        if self._end is not None and day > self._end:
+            day = self._end + timedelta(days=1)
+        count = self._frequency.count_until(day - timedelta(days=1))
+        if not count:
+            return Fraction(0)
+        last = self._frequency.occurrence(count - 1)
+        try:
+            following = self._frequency.occurrence(count)
+        except IndexError:
+            following = last + timedelta(days=1)
+        return count - 1 + min(Fraction((day - last).days, (following - last).days), 1)
+
+    def accrual(self, start, end):
+        """
+        Returns the amount accrued between start and end (both inclusive), see accrued(): the
+        prorated daily cost of an ongoing plan over the range.
+        """
+        if end < start:
+            return _prorated(self._amount, Fraction(0))
+        return _prorated(self._amount,
+                         self.accrued(end + timedelta(days=1)) - self.accrued(start))
+
+    def project(self, tx_date):
+        """
+        Abstract. When implemented it should return the transaction planned on a given date.
+        """
+        raise NotImplementedError()
+
 
 class PlannedBill(PlannedTransaction):
-    pass
\ No newline at end of file
+    """
+    Planned bill, paid from an account.
+    """
+
+    def __init__(self, account, amount, frequency, end=None, category=None):
+        """
+        Constructor
+        :param account: account paying the bill, may be None if not decided yet
+        :param amount: planned amount
+        :param frequency: Frequency of the occurrences
+        :param end: last day the plan is in effect, open-ended if None
+        :param category: budget category
+        """
+        super().__init__(amount, frequency, end, category)
+        self._account = account
+
+    def account(self):
+        """Account paying the bill."""
+        return self._account
+
+    def project(self, tx_date):
+        return Bill(self._account, self._amount, tx_date, tx_date, self._category)
+
+
+class PlannedIncome(PlannedTransaction):
+    """
+    Planned income, deposited to an account.
+    """
+
+    def __init__(self, account, amount, frequency, end=None, category=None):
+        """
+        Constructor
+        :param account: account receiving the income, may be None if not decided yet
+        :param amount: planned amount
+        :param frequency: Frequency of the occurrences
+        :param end: last day the plan is in effect, open-ended if None
+        :param category: budget category
+        """
+        super().__init__(amount, frequency, end, category)
+        self._account = account
+
+    def account(self):
+        """Account receiving the income."""
+        return self._account
+
+    def project(self, tx_date):
+        return Deposit(self._account, self._amount, tx_date, tx_date, self._category)
+
+
+class PlannedTransfer(PlannedTransaction):
+    """
+    Planned transfer between accounts.
+    """
+
+    def __init__(self, account_from, account_to, amount, frequency, end=None, category=None,
+                 amount_in=None):
+        """
+        Constructor
+        :param account_from: source account
+        :param account_to: destination account
+        :param amount: planned amount
+        :param frequency: Frequency of the occurrences
+        :param end: last day the plan is in effect, open-ended if None
+        :param category: budget category
+        :param amount_in: amount received by account_to, when in a different currency
+        """
+        super().__init__(amount, frequency, end, category)
+        self._account_from = account_from
+        self._account_to = account_to
+        self._amount_in = amount_in
+
+    def account_from(self):
+        """Source account."""
+        return self._account_from
+
+    def account_to(self):
+        """Destination account."""
+        return self._account_to
+
+    def project(self, tx_date):
+        return Transfer(self._account_from, self._account_to, self._amount, tx_date, tx_date,
+                        self._amount_in)
+
+
+class Budget:
+    """
+    A set of PlannedTransactions, projected together over date windows.
+
+    The last projected window is cached: queries for the same window, or one within it, are
+    answered from the cache instead of projecting the plans again.
+    """
+
+    def __init__(self, plans=()):
+        """
+        Constructor
+        :param plans: initial PlannedTransactions
+        """
+        self._plans = list(plans)
+        self._window = None
+        self._dates = []
+        self._occurrences = []
+
+    def plans(self):
+        """A tuple of the plans in this Budget, in the order they were added."""
+        return tuple(self._plans)
+
+    def add(self, plan):
+        """
+        Adds a plan to the Budget.
+        """
+        self._plans.append(plan)
+        self._window = None
+
+    def occurrences(self, start, end):
+        """
+        Returns a list of projected transactions of all plans between start and end (both
+        inclusive), in date order.
+        """
+        if self._window is None or not self._window[0] <= start <= end <= self._window[1]:
+            merged = heapq.merge(*[plan.occurrences(start, end) for plan in self._plans],
+                                 key=lambda transaction: transaction.date())
+            self._occurrences = list(merged)
+            self._dates = [transaction.date() for transaction in self._occurrences]
+            self._window = (start, end)
+        return self._occurrences[bisect_left(self._dates, start):bisect_right(self._dates, end)]
+
+    def accruals(self, timeline, end, kind=PlannedBill):
+        """
+        Returns amounts accrued by plans per period (see PlannedTransaction.accrual()).
+
+        Plans with equal frequencies and ends accrue the same fractions of their amounts, so they
+        are grouped and each group's accrued fractions are computed once per period boundary,
+        in closed form: the cost depends on the number of distinct schedules and periods, not on
+        the number of plans or days.
+        :param timeline: Frequency starting the periods (e.g. Monthly for monthly accruals)
+        :param end: last day of the last period
+        :param kind: type (or tuple of types) of the plans included
+        :return: list of (period start, accrued amount) pairs
+        :raises ValueError: if the plans included are in different currencies
+        """
+        groups = {}
+        currencies = set()
+        for plan in self._plans:
+            if isinstance(plan, kind):
+                frequency, amount = plan.frequency(), plan.amount()
+                currency = amount.currency() if isinstance(amount, Money) else None
+                currencies.add(currency)
+                if len(currencies) > 1:
+                    raise ValueError('Cannot total accruals of plans in {currencies}.'.format(
+                        currencies=', '.join(sorted(str(currency) for currency in currencies))))
+                key = (type(frequency), frequency.start, frequency.step, plan.end())
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = [plan, amount]
+                else:
+                    group[1] += amount
+
+        starts = [date.fromordinal(ordinal)
+                  for ordinal in timeline.ordinals_between(timeline.start, end)]
+        bounds = starts + [end + timedelta(days=1)]
+        totals = [Decimal('0.00')] * len(starts)
+        for plan, amount in groups.values():
+            accrued = [plan.accrued(bound) for bound in bounds]
+            for i in range(len(starts)):
+                totals[i] += _prorated(amount, accrued[i + 1] - accrued[i])
+        return list(zip(starts, totals))
+
+
+def _prorated(amount, fraction):
+    """
+    Returns a fraction of an amount, rounded half-even to minor units (or more decimal places,
+    for Decimals that have them).
+    """
+    if isinstance(amount, Money):
+        return Money.from_units(round(amount.units() * fraction), amount.currency())
+    exponent = min(Decimal(amount).as_tuple().exponent, -Money.PLACES)
+    return Decimal(round(Fraction(amount) * fraction * Fraction(10) ** -exponent)).scaleb(
+        exponent)
@@ -1,3 +1,165 @@
-#TODO: Single item over time (item's native timeline)
-#TODO: Total budget over time (probably only ongoig timeline makes sense)
-#TODO: Single item over time (specific timeline, probably only ongoing makes sense)
\ No newline at end of file
+from beancounter.basics.account import LogbookSubscriber
+from datetime import date, timedelta
+from decimal import Decimal
+
+ENTERED, RECORDED = 0, 1
+
+
+class Report(LogbookSubscriber):
+    """
+    Base class for reports: balance changes of selected accounts over a timeline.
+
+    The timeline is a Frequency, its occurrences starting the report periods (e.g. Monthly for
+    monthly totals). Per-period totals are built once from the accounts' date indexes and then
+    kept up to date as the Logbook notifies the report of entered transactions and recorded
+    operations, so a refresh costs O(1) per operation. Running balances are recomputed lazily,
+    only from the earliest period changed since the last query.
+    """
+
+    def __init__(self, logbook, timeline):
+        """
+        Constructor. The report subscribes to the Logbook until close() is called.
+        :param logbook: the Logbook
+        :param timeline: Frequency starting the report periods
+        """
+        self._logbook = logbook
+        self._timeline = timeline
+        self._opening = [Decimal('0.00'), Decimal('0.00')]
+        self._totals = ([], [])
+        self._balances = ([], [])
+        for account in logbook.accounts():
+            if self._selects(account):
+                self._add_account(account)
+        logbook.subscribe(self)
+
+    def timeline(self):
+        """Frequency starting the report periods."""
+        return self._timeline
+
+    def close(self):
+        """
+        Stops updating the report.
+        """
+        self._logbook.unsubscribe(self)
+
+    def periods(self):
+        """
+        A list of start dates of the report periods, up to the last one with any changes.
+        """
+        return [self._timeline.occurrence(n) for n in range(len(self._totals[ENTERED]))]
+
+    def opening_balance(self, recorded=False):
+        """
+        Balance at the end of the day before the first period.
+        :param recorded: use the recorded balance
+        """
+        return self._opening[RECORDED if recorded else ENTERED]
+
+    def totals(self, recorded=False):
+        """
+        Returns a list of (period start, total balance change) pairs.
+        :param recorded: total operations by the date they were recorded
+        """
+        return list(zip(self.periods(), self._totals[RECORDED if recorded else ENTERED]))
+
+    def balances(self, recorded=False):
+        """
+        Returns a list of (period start, balance at the end of the period) pairs.
+        :param recorded: use the recorded balance
+        """
+        kind = RECORDED if recorded else ENTERED
+        totals, balances = self._totals[kind], self._balances[kind]
+        balance = balances[-1] if balances else self._opening[kind]
+        for total in totals[len(balances):]:
+            balance += total
+            balances.append(balance)
+        return list(zip(self.periods(), balances))
+
+    def account_added(self, account):
+        if self._selects(account):
+            self._add_account(account)
+
+    def entered(self, transaction):
+        for operation in transaction.operations():
+            if self._selects(operation.account()):
+                self._add(ENTERED, operation.date(), operation.balance_change())
+
+    def recorded(self, operation):
+        if self._selects(operation.account()):
+            self._add(RECORDED, operation.recorded(), operation.balance_change())
+
+    def _selects(self, account):
+        """
+        Abstract. When implemented it should return True for accounts included in the report.
+        """
+        raise NotImplementedError()
+
+    def _add_account(self, account):
+        start = self._timeline.start
+        for kind, recorded in ((ENTERED, False), (RECORDED, True)):
+            if recorded:
+                self._opening[kind] += account.recorded_balance_at(start - timedelta(days=1))
+            else:
+                self._opening[kind] += account.balance_at(start - timedelta(days=1))
+            del self._balances[kind][:]
+            for ordinal, change in account.changes_between(start, None, recorded):
+                self._add(kind, date.fromordinal(ordinal), change)
+
+    def _add(self, kind, day, change):
+        period = self._timeline.count_until(day) - 1
+        if period < 0:
+            self._opening[kind] += change
+            del self._balances[kind][:]
+            return
+        for totals in self._totals:
+            if period >= len(totals):
+                totals.extend([Decimal('0.00')] * (period + 1 - len(totals)))
+        self._totals[kind][period] += change
+        del self._balances[kind][period:]
+
+
+class AccountReport(Report):
+    """
+    Report of a single account.
+    """
+
+    def __init__(self, logbook, account, timeline):
+        """
+        Constructor
+        :param logbook: the Logbook
+        :param account: the reported account
+        :param timeline: Frequency starting the report periods
+        """
+        self._account = account
+        super().__init__(logbook, timeline)
+
+    def account(self):
+        """The reported account."""
+        return self._account
+
+    def _selects(self, account):
+        return account is self._account
+
+
+class TotalReport(Report):
+    """
+    Report of all accounts of the Logbook together, including accounts added later.
+
+    Transfers between the accounts cancel out, leaving the overall cash flow.
+    """
+
+    def __init__(self, logbook, timeline):
+        """
+        Constructor
+        :param logbook: the Logbook
+        :param timeline: Frequency starting the report periods
+        """
+        self._members = set(map(id, logbook.accounts()))
+        super().__init__(logbook, timeline)
+
+    def account_added(self, account):
+        self._members.add(id(account))
+        super().account_added(account)
+
+    def _selects(self, account):
+        return id(account) in self._members
@@ -0,0 +1,144 @@
+from beancounter.basics.transaction import Bill, Deposit
+from datetime import timedelta
+from decimal import Decimal
+
+
+class VarianceReport:
+    """
+    Budget vs. actual: matches the Bills and Deposits of a Logbook to the projected occurrences
+    of a Budget's plans, and totals planned and actual amounts per period.
+
+    An actual transaction matches an occurrence of the same type (Bill or Deposit), account and
+    category, dated at most `tolerance` days from it; each one matches at most one occurrence.
+    Occurrences of plans without an account match actuals on any account, once the ones with an
+    account took theirs. Both sides are partitioned by that key, and actuals also by type and
+    category alone for those occurrences, keeping them in date order (occurrences come sorted
+    from the Budget, actuals from the Logbook's query index); each partition is joined in a
+    single merge pass, matching every occurrence with the earliest unmatched actual in its
+    window.
+    """
+
+    def __init__(self, budget, logbook, timeline, tolerance=3):
+        """
+        Constructor
+        :param budget: the Budget
+        :param logbook: the Logbook
+        :param timeline: Frequency starting the report periods (e.g. Monthly for monthly totals)
+        :param tolerance: maximum number of days between an occurrence and its actual
+                          transaction
+        """
+        self._budget = budget
+        self._logbook = logbook
+        self._timeline = timeline
+        self._tolerance = timedelta(days=tolerance)
+
+    def timeline(self):
+        """Frequency starting the report periods."""
+        return self._timeline
+
+    def matches(self, start, end):
+        """
+        Matches occurrences between start and end (both inclusive) to actual transactions.
+        Actuals up to `tolerance` days outside the range may match occurrences within it.
+        :return: list of (occurrence, matched actual transaction or None) pairs, in occurrence
+                 date order, and a list of unmatched actual transactions between start and end,
+                 in date order
+        """
+        occurrences = [occurrence for occurrence in self._budget.occurrences(start, end)
+                       if type(occurrence) in (Bill, Deposit)]
+        ordered = []
+        actuals = {}
+        # Actuals by type and category only, for occurrences of plans without an account.
+        any_account = {}
+        for transaction in self._logbook.query().between(start - self._tolerance,
+                                                         end + self._tolerance):
+            if type(transaction) in (Bill, Deposit):
+                ordered.append(transaction)
+                key = _key(transaction)
+                for partitions, partition_key in ((actuals, key), (any_account, key[::2])):
+                    partition = partitions.get(partition_key)
+                    if partition is None:
+                        partitions[partition_key] = partition = []
+                    partition.append(transaction)
+
+        planned = {}
+        for occurrence in occurrences:
+            key = _key(occurrence)
+            partition = planned.get(key)
+            if partition is None:
+                planned[key] = partition = []
+            partition.append(occurrence)
+
+        matched = {}
+        taken = set()
+        for key, partition in planned.items():
+            if key[1] is not None:
+                self._join(partition, actuals.get(key, ()), matched, taken)
+        for key, partition in planned.items():
+            if key[1] is None:
+                self._join(partition, any_account.get(key[::2], ()), matched, taken)
+
+        pairs = [(occurrence, matched.get(id(occurrence))) for occurrence in occurrences]
+        unplanned = [transaction for transaction in ordered
+                     if id(transaction) not in taken and start <= transaction.date() <= end]
+        return pairs, unplanned
+
+    def _join(self, occurrences, actuals, matched, taken):
+        """
+        Merges date-ordered occurrences and actuals of a partition, matching each occurrence
+        to the earliest actual not taken yet within its tolerance window.
+        """
+        tolerance = self._tolerance
+        position = 0
+        count = len(actuals)
+        for occurrence in occurrences:
+            day = occurrence.date()
+            low = day - tolerance
+            while position < count and (actuals[position].date() < low or
+                                        id(actuals[position]) in taken):
+                position += 1
+            if position < count and actuals[position].date() <= day + tolerance:
+                matched[id(occurrence)] = actuals[position]
+                taken.add(id(actuals[position]))
+                position += 1
+
+    def table(self, end):
+        """
+        Returns planned and actual totals per period, from the start of the timeline to end.
+
+        Amounts are balance changes: bills count as negative, deposits as positive. Matched
+        actuals count in the period of their occurrence, unmatched ones in their own.
+        :return: list of (period start, planned, actual, actual - planned) tuples
+        """
+        timeline = self._timeline
+        starts = timeline.between(timeline.start, end)
+        planned = [Decimal('0.00')] * len(starts)
+        actual = [Decimal('0.00')] * len(starts)
+        periods = {}
+
+        def period(day):
+            index = periods.get(day)
+            if index is None:
+                index = periods[day] = timeline.count_until(day) - 1
+            return index
+
+        pairs, unplanned = self.matches(timeline.start, end)
+        for occurrence, transaction in pairs:
+            index = period(occurrence.date())
+            planned[index] += _change(occurrence)
+            if transaction is not None:
+                actual[index] += _change(transaction)
+        for transaction in unplanned:
+            actual[period(transaction.date())] += _change(transaction)
+        return [(day, planned[i], actual[i], actual[i] - planned[i])
+                for i, day in enumerate(starts)]
+
+
+def _key(transaction):
+    category = transaction.category()
+    return (type(transaction), transaction.operations()[0].account(),
+            str(category) if category is not None else None)
+
+
+def _change(transaction):
+    return transaction.operations()[0].balance_change()
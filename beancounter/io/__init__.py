@@ -0,0 +1,2 @@
+from beancounter.io.statements import StatementRecord, ColumnMapping, CsvStatement, OfxStatement, \
+    Importer
@@ -0,0 +1,215 @@
+"""
+Compact, versioned binary file format for a Logbook.
+
+Layout (little endian, every section padded to 8 bytes):
+
+    header     magic b'BCLB', version, decimal places, counts of strings, accounts,
+               history entries, transactions, operations and categories
+    strings    string table: length-prefixed UTF-8 account names
+    categories length-prefixed UTF-8 category paths, in category id order
+    accounts   fixed-width records: name, flags, initial/current/recorded balance, the
+               number of entered and recorded history entries and the currency name of
+               Money-denominated accounts
+    history    per-account DateIndex contents: date ordinals, then amounts
+    columns    ColumnarStore columns, one after another
+
+Version 1 files have no account currencies, and version 1 and 2 files no categories (nor their
+count in the header or their column); both are still read.
+
+Amounts are integers in minor units. Loading memory-maps the file and hands the columns to a
+ColumnarStore as memoryviews, so Transaction objects are only materialised when accessed (or
+when they have operations not recorded yet, which accounts keep indexed as pending).
+"""
+from beancounter.basics.account import Account, Logbook
+from beancounter.basics.index import DateIndex
+from beancounter.basics.money import Money
+from beancounter.basics.storage import ColumnarStore, COLUMNS, TRANSACTION_COLUMNS
+from beancounter.basics.utils import to_minor, from_minor
+from array import array
+import mmap
+import os
+import struct
+
+MAGIC = b'BCLB'
+VERSION = 3
+
+_HEADER = struct.Struct('<4sHHIIQQQI')
+_HEADER_V2 = struct.Struct('<4sHHIIQQQ')
+_ACCOUNT = struct.Struct('<IIqqqIII')
+_ACCOUNT_V1 = struct.Struct('<IIqqqII')
+_IN_LOGBOOK = 1
+_MONEY = 2
+_NO_CURRENCY = 0xFFFFFFFF
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _strings(strings):
+    return b''.join(struct.pack('<I', len(string)) + string for string in strings)
+
+
+def save(logbook, path):
+    """
+    Saves a Logbook to a file.
+    :param logbook: the Logbook
+    :param path: file path
+    """
+    store = logbook.transactions()
+    if not isinstance(store, ColumnarStore):
+        store = ColumnarStore()
+        for account in logbook.accounts():
+            store._account_id(account)
+        store.extend(logbook.transactions())
+    places = store.places()
+    categories = [path.encode('utf-8') for path in store.categories()]
+
+    members = {id(account) for account in logbook.accounts()}
+    accounts = list(logbook.accounts())
+    accounts += [account for account in store.accounts() if id(account) not in members]
+    file_ids = {id(account): i for i, account in enumerate(accounts)}
+
+    columns = store.columns()
+    remap = [file_ids[id(account)] for account in store.accounts()]
+    if remap != list(range(len(remap))):
+        columns['_account_col'] = array('i', (remap[i] for i in columns['_account_col']))
+
+    names = []
+    records = []
+    history_dates = array('i')
+    history_amounts = array('q')
+    for account in accounts:
+        names.append(account.name().encode('utf-8'))
+        name = len(names) - 1
+        flags = _IN_LOGBOOK if id(account) in members else 0
+        currency = _NO_CURRENCY
+        if isinstance(account.balance(), Money):
+            flags |= _MONEY
+            if account.currency() is not None:
+                names.append(account.currency().encode('utf-8'))
+                currency = len(names) - 1
+        counts = []
+        for recorded in (False, True):
+            changes = account.changes_between(None, None, recorded)
+            for key, amount in changes:
+                history_dates.append(key)
+                history_amounts.append(to_minor(amount, places))
+            counts.append(len(changes))
+        records.append(_ACCOUNT.pack(
+            name, flags, to_minor(account.initial_balance(), places),
+            to_minor(account.balance(), places), to_minor(account.recorded_balance(), places),
+            counts[0], counts[1], currency))
+
+    # Written next to the target and moved over it: a Logbook loaded from `path` still maps
+    # the old file, which must not be truncated under it.
+    temporary = os.fspath(path) + '.saving'
+    with open(temporary, 'wb') as stream:
+        sections = [_HEADER.pack(MAGIC, VERSION, places, len(names), len(accounts),
+                                 len(history_dates), len(store), store.operation_count(),
+                                 len(categories))]
+        sections.append(_strings(names))
+        sections.append(_strings(categories))
+        sections.append(b''.join(records))
+        sections.append(history_dates)
+        sections.append(history_amounts)
+        sections.extend(columns[name] for name, _ in COLUMNS)
+        for section in sections:
+            data = section if isinstance(section, bytes) else memoryview(section).cast('B')
+            stream.write(data)
+            stream.write(b'\0' * _padding(len(data)))
+    os.replace(temporary, path)
+
+
+def load(path):
+    """
+    Loads a Logbook saved with save(), memory-mapping its transactions.
+    :param path: file path
+    :return: Logbook backed by a ColumnarStore
+    """
+    with open(path, 'rb') as stream:
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(mapped)
+
+    if len(view) < _HEADER_V2.size:
+        raise ValueError('{path} is not a Logbook file.'.format(path=path))
+    magic, version = struct.unpack_from('<4sH', view)
+    if magic != MAGIC:
+        raise ValueError('{path} is not a Logbook file.'.format(path=path))
+    if version not in (1, 2, VERSION):
+        raise ValueError('Unsupported Logbook file version: {version}.'.format(version=version))
+    header = _HEADER if version == VERSION else _HEADER_V2
+    _, _, places, n_strings, n_accounts, n_history, n_transactions, n_operations, \
+        *n_categories = header.unpack_from(view)
+    position = header.size + _padding(header.size)
+
+    def strings(count):
+        nonlocal position
+        result = []
+        start = position
+        for _ in range(count):
+            size, = struct.unpack_from('<I', view, position)
+            result.append(bytes(view[position + 4:position + 4 + size]).decode('utf-8'))
+            position += 4 + size
+        position += _padding(position - start)
+        return result
+
+    names = strings(n_strings)
+    categories = strings(n_categories[0]) if n_categories else []
+
+    def section(typecode, count):
+        nonlocal position
+        size = count * array(typecode).itemsize
+        data = view[position:position + size].cast(typecode)
+        position += size + _padding(size)
+        return data
+
+    record = _ACCOUNT if version > 1 else _ACCOUNT_V1
+    records = list(record.iter_unpack(section('B', record.size * n_accounts)))
+    history_dates = section('i', n_history)
+    history_amounts = section('q', n_history)
+
+    logbook = Logbook(store=ColumnarStore(places))
+    accounts = []
+    offset = 0
+    for name, flags, initial, balance, recorded, n_entered, n_recorded, *currency in records:
+        member = flags & _IN_LOGBOOK
+        if flags & _MONEY:
+            currency = names[currency[0]] if currency[0] != _NO_CURRENCY else None
+            # Money-denominated accounts keep Money.PLACES minor units.
+            if places == Money.PLACES:
+                internal = int
+            else:
+                def internal(units):
+                    return to_minor(from_minor(units, places), Money.PLACES)
+            initial = Money.from_units(internal(initial), currency)
+        else:
+            def internal(units):
+                return from_minor(units, places)
+            initial = internal(initial)
+        account = Account(names[name], initial, logbook if member else None)
+        account._balance = internal(balance)
+        account._recorded_balance = internal(recorded)
+        for attribute, count in (('_history', n_entered), ('_recorded_history', n_recorded)):
+            items = zip(history_dates[offset:offset + count],
+                        map(internal, history_amounts[offset:offset + count]))
+            setattr(account, attribute, DateIndex.from_items(items))
+            offset += count
+        accounts.append(account)
+        if member:
+            logbook.accounts().append(account)
+
+    columns = {}
+    for name, typecode in COLUMNS:
+        if name == '_categories' and version < 3:
+            columns[name] = array(typecode, bytes(n_transactions * array(typecode).itemsize))
+        else:
+            columns[name] = section(typecode, n_transactions if name in TRANSACTION_COLUMNS
+                                    else n_operations)
+    store = logbook.transactions()
+    store.map_columns(accounts, columns, mapped, categories)
+    # Accounts of the Logbook read their pending operations from the store.
+    for account in accounts:
+        if account._logbook is None:
+            account._pending.extend(map(store.operation, list(store.unrecorded_rows(account))))
+    return logbook
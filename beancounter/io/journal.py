@@ -0,0 +1,266 @@
+"""
+Append-only (write-ahead) journal for a Logbook, with compacted snapshots.
+
+Every added account, entered transaction, recorded operation and re-categorised transaction
+is appended to the journal file as a small checksummed record, so saving a change costs O(1) instead of re-writing the
+whole Logbook. Periodically the Logbook is compacted into a snapshot (in the Logbook.save()
+format) and the journal starts over. Recovery loads the snapshot and replays the journal
+tail; a record torn by a crash is discarded.
+
+Files used, next to the journal `path`:
+
+    path               the journal
+    path.snapshot      the latest snapshot
+    path.snapshot.tmp  a snapshot being written
+    path.old           the journal being compacted
+"""
+from beancounter.basics.account import Logbook, LogbookSubscriber
+from beancounter.basics.money import Money
+from beancounter.basics.storage import ColumnarStore, DEPOSIT, BILL, TRANSFER_OUT
+from beancounter.basics.transaction import Deposit, Bill, Transfer
+from beancounter.basics.utils import to_minor, from_minor
+from datetime import date
+import os
+import struct
+import zlib
+
+ACCOUNT, ENTER, RECORD, CATEGORY = b'A', b'T', b'R', b'C'
+
+_FRAME = struct.Struct('<II')
+_ACCOUNT = struct.Struct('<Iq')
+_ENTER = struct.Struct('<QBiiB')
+_OPERATION = struct.Struct('<Iqi')
+_RECORD = struct.Struct('<QBi')
+_CATEGORY = struct.Struct('<Q')
+
+_KINDS = {Deposit: DEPOSIT, Bill: BILL, Transfer: TRANSFER_OUT}
+
+
+class Journal(LogbookSubscriber):
+    """
+    Write-ahead journal of a Logbook's changes (see module documentation).
+
+    Records carry the index of the account or transaction they create, so replaying a record
+    already included in the snapshot is a no-op.
+    """
+
+    def __init__(self, path, compact_every=None, sync=False):
+        """
+        Constructor
+        :param path: journal file path
+        :param compact_every: number of records after which a snapshot is written, never if None
+        :param sync: fsync() every record, surviving power loss and not only process crashes
+        """
+        self._path = os.fspath(path)
+        self._snapshot = self._path + '.snapshot'
+        self._compact_every = compact_every
+        self._sync = sync
+        self._logbook = None
+        self._stream = None
+        self._account_ids = {}
+        self._records = 0
+
+    def records(self):
+        """Number of records in the journal since the last snapshot."""
+        return self._records
+
+    def open(self, logbook=None):
+        """
+        Recovers the Logbook from the latest snapshot and the journal, and starts journaling.
+        :param logbook: initial Logbook contents, only allowed when there is no journal yet
+        :return: the recovered Logbook, backed by a ColumnarStore
+        """
+        if self._logbook is not None:
+            raise ValueError('Journal {path} is already open.'.format(path=self._path))
+        self._finish_checkpoint()
+
+        if logbook is not None:
+            if os.path.exists(self._snapshot) or os.path.exists(self._path):
+                raise ValueError('Journal {path} already exists.'.format(path=self._path))
+            self._write_snapshot(logbook)
+            os.replace(self._snapshot + '.tmp', self._snapshot)
+
+        if os.path.exists(self._snapshot):
+            logbook = Logbook.load(self._snapshot)
+        else:
+            logbook = Logbook(store=ColumnarStore())
+        valid = self._replay(logbook)
+
+        self._stream = open(self._path, 'ab')
+        self._stream.truncate(valid)
+        self._logbook = logbook
+        self._account_ids = {id(account): i for i, account in enumerate(logbook.accounts())}
+        logbook.subscribe(self)
+        return logbook
+
+    def close(self):
+        """
+        Stops journaling. The journal can be opened again to recover the Logbook.
+        """
+        if self._logbook is not None:
+            self._logbook.unsubscribe(self)
+            self._stream.close()
+            self._logbook = None
+            self._stream = None
+
+    def checkpoint(self):
+        """
+        Writes a snapshot of the Logbook and starts an empty journal.
+        """
+        self._write_snapshot(self._logbook)
+        self._stream.close()
+        os.replace(self._path, self._path + '.old')
+        os.replace(self._snapshot + '.tmp', self._snapshot)
+        os.remove(self._path + '.old')
+        self._stream = open(self._path, 'ab')
+        self._records = 0
+
+    def account_added(self, account):
+        self._account_ids[id(account)] = len(self._account_ids)
+        name = account.name().encode('utf-8')
+        if isinstance(account.balance(), Money):
+            # Money-denominated: the name is followed by NUL and the (maybe empty) currency.
+            name += b'\0' + (account.currency() or '').encode('utf-8')
+        self._append(ACCOUNT + _ACCOUNT.pack(len(self._account_ids) - 1,
+                                             to_minor(account.balance(), self._places())) +
+                     name)
+
+    def entered(self, transaction):
+        operations = transaction.operations()
+        places = self._places()
+        # Batches are stored before subscribers hear of them, so the index comes from the store.
+        index, _ = self._logbook.transactions().locate(operations[0])
+        payload = [ENTER, _ENTER.pack(index,
+                                      self._kind(transaction), transaction.date().toordinal(),
+                                      transaction.entered().toordinal(), len(operations))]
+        for operation in operations:
+            try:
+                account_id = self._account_ids[id(operation.account())]
+            except KeyError:
+                raise ValueError('{account} does not belong to the journaled Logbook.'.format(
+                    account=operation.account()))
+            recorded = operation.recorded()
+            payload.append(_OPERATION.pack(account_id,
+                                           to_minor(operation.balance_change(), places),
+                                           recorded.toordinal() if recorded else 0))
+        # The category path, if any, follows the operations.
+        category = getattr(transaction, '_category', None)
+        if category is not None:
+            payload.append(str(category).encode('utf-8'))
+        self._append(b''.join(payload))
+
+    def recorded(self, operation):
+        location = self._logbook.transactions().locate(operation)
+        if location is not None:
+            index, position = location
+            self._append(RECORD + _RECORD.pack(index, position, operation.recorded().toordinal()))
+
+    def categorized(self, transaction):
+        location = self._logbook.transactions().locate(transaction.operations()[0])
+        if location is not None:
+            category = transaction.category()
+            # No path follows for a transaction no longer categorised.
+            self._append(CATEGORY + _CATEGORY.pack(location[0]) +
+                         (str(category).encode('utf-8') if category is not None else b''))
+
+    def _places(self):
+        return self._logbook.transactions().places()
+
+    def _kind(self, transaction):
+        try:
+            return _KINDS[type(transaction)]
+        except KeyError:
+            raise TypeError('Cannot journal a {type}.'.format(type=type(transaction).__name__))
+
+    def _append(self, payload):
+        self._stream.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._stream.flush()
+        if self._sync:
+            os.fsync(self._stream.fileno())
+        self._records += 1
+        if self._compact_every and self._records >= self._compact_every:
+            self.checkpoint()
+
+    def _write_snapshot(self, logbook):
+        temporary = self._snapshot + '.tmp'
+        logbook.save(temporary)
+        with open(temporary, 'rb') as stream:
+            os.fsync(stream.fileno())
+
+    def _finish_checkpoint(self):
+        # A crash during checkpoint() leaves either a temporary snapshot (the old snapshot is
+        # still current: the old journal is put back) or only the old journal (the new
+        # snapshot already includes it).
+        old = self._path + '.old'
+        if os.path.exists(self._snapshot + '.tmp'):
+            os.remove(self._snapshot + '.tmp')
+            if os.path.exists(old):
+                os.replace(old, self._path)
+        elif os.path.exists(old):
+            os.remove(old)
+
+    def _replay(self, logbook):
+        """
+        Applies the journal to a Logbook. Returns the size of its valid part.
+        """
+        if not os.path.exists(self._path):
+            return 0
+        valid = 0
+        with open(self._path, 'rb') as stream:
+            while True:
+                frame = stream.read(_FRAME.size)
+                if len(frame) < _FRAME.size:
+                    break
+                size, checksum = _FRAME.unpack(frame)
+                payload = stream.read(size)
+                if len(payload) < size or zlib.crc32(payload) != checksum:
+                    break
+                self._apply(logbook, payload)
+                valid += _FRAME.size + size
+                self._records += 1
+        return valid
+
+    def _apply(self, logbook, payload):
+        places = logbook.transactions().places()
+        kind, body = payload[:1], payload[1:]
+        if kind == ACCOUNT:
+            index, balance = _ACCOUNT.unpack_from(body)
+            if index == len(logbook.accounts()):
+                name, money, currency = body[_ACCOUNT.size:].partition(b'\0')
+                balance = from_minor(balance, places)
+                if money:
+                    balance = Money(balance, currency.decode('utf-8') or None)
+                logbook.add_account(name.decode('utf-8'), balance=balance)
+        elif kind == ENTER:
+            index, tx_kind, tx_date, entered, count = _ENTER.unpack_from(body)
+            if index != len(logbook.transactions()):
+                return
+            operations = [_OPERATION.unpack_from(body, _ENTER.size + i * _OPERATION.size)
+                          for i in range(count)]
+            category = body[_ENTER.size + count * _OPERATION.size:].decode('utf-8') or None
+            accounts = logbook.accounts()
+            account, change, _ = operations[0]
+            amount = accounts[account].amount_of(change, places)
+            tx_date, entered = date.fromordinal(tx_date), date.fromordinal(entered)
+            if tx_kind == DEPOSIT:
+                transaction = Deposit(accounts[account], amount, tx_date, entered, category)
+            elif tx_kind == BILL:
+                transaction = Bill(accounts[account], -amount, tx_date, entered, category)
+            else:
+                account_to, change_in, _ = operations[1]
+                transaction = Transfer(accounts[account], accounts[account_to], -amount,
+                                       tx_date, entered,
+                                       accounts[account_to].amount_of(change_in, places))
+            logbook.enter(transaction)
+            for operation, (_, _, recorded) in zip(transaction.operations(), operations):
+                if recorded:
+                    operation.record(date.fromordinal(recorded))
+        elif kind == RECORD:
+            index, position, recorded = _RECORD.unpack(body)
+            operation = logbook.transactions()[index].operations()[position]
+            if operation.recorded() is None:
+                operation.record(date.fromordinal(recorded))
+        elif kind == CATEGORY:
+            index, = _CATEGORY.unpack_from(body)
+            category = body[_CATEGORY.size:].decode('utf-8') or None
+            logbook.transactions()[index].categorize(category)
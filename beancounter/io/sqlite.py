@@ -0,0 +1,522 @@
+"""
+Logbook storage in a SQLite database file.
+
+Tables:
+
+    settings      key/value pairs: the number of decimal places of stored amounts
+    accounts      name, currency, initial balance, whether the account belongs to the Logbook
+    history       per-account, per-day totals of entered and of recorded balance changes
+    transactions  one row per transaction: date, entry date and category path; the id is its
+                  Logbook index
+    operations    one row per operation: kind, account, balance change and recorded date
+
+Amounts are integers in minor units. Opening a database reads the accounts and their daily
+history, so its cost does not depend on the number of transactions; transactions are read when
+accessed, and the operations of an account not recorded yet when they are first asked for (see
+PendingOperations).
+
+Changes are written in batches: entered transactions, recorded operations and changed
+categories are buffered
+and written in a single SQLite transaction once `batch_size` of them are pending, before any
+read and on flush() or close(). The database is opened in WAL mode, so reads from the pool of
+reader connections do not block the writer, and the other way around.
+"""
+from beancounter.basics.account import Account, Logbook, LogbookSubscriber
+from beancounter.basics.index import DateIndex, PendingIndex
+from beancounter.basics.money import Money
+from beancounter.basics.storage import build_transaction, _KINDS
+from beancounter.basics.utils import to_minor, from_minor
+from contextlib import contextmanager
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+from urllib.request import pathname2url
+import os
+import queue
+import sqlite3
+import threading
+import weakref
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY, name TEXT NOT NULL, currency TEXT, money INTEGER NOT NULL,
+    member INTEGER NOT NULL, initial INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS history (
+    account INTEGER NOT NULL, recorded INTEGER NOT NULL, day INTEGER NOT NULL,
+    change INTEGER NOT NULL, PRIMARY KEY (account, recorded, day)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY, date INTEGER NOT NULL, entered INTEGER NOT NULL, category TEXT);
+CREATE TABLE IF NOT EXISTS operations (
+    tx INTEGER NOT NULL, position INTEGER NOT NULL, kind INTEGER NOT NULL,
+    account INTEGER NOT NULL, change INTEGER NOT NULL, recorded INTEGER NOT NULL,
+    PRIMARY KEY (tx, position)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date);
+CREATE INDEX IF NOT EXISTS operations_account ON operations (account, tx);
+CREATE INDEX IF NOT EXISTS operations_unrecorded ON operations (tx) WHERE recorded = 0;
+'''
+
+_ADD_HISTORY = '''
+INSERT INTO history VALUES (?, ?, ?, ?)
+ON CONFLICT (account, recorded, day) DO UPDATE SET change = change + excluded.change
+'''
+
+_OPERATIONS = '''
+SELECT t.id, t.date, t.entered, t.category, o.kind, o.account, o.change, o.recorded
+FROM transactions t JOIN operations o ON o.tx = t.id
+WHERE {where} ORDER BY t.id, o.position
+'''
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of read-only connections to a SQLite database, shared between threads.
+    Connections are opened as they are first needed.
+    """
+
+    def __init__(self, path, size=4):
+        """
+        Constructor
+        :param path: database file path
+        :param size: maximum number of connections
+        """
+        self._path = path
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._size = size
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager lending a connection, waiting for one to be returned if all are in use.
+        """
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                connection = None
+                if len(self._opened) < self._size:
+                    connection = sqlite3.connect(
+                        'file:{path}?mode=ro'.format(
+                            path=pathname2url(os.path.abspath(self._path))),
+                        uri=True, check_same_thread=False)
+                    self._opened.append(connection)
+            if connection is None:
+                connection = self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def close(self):
+        """
+        Closes all connections.
+        """
+        with self._lock:
+            for connection in self._opened:
+                connection.close()
+            self._opened = []
+            self._idle = queue.LifoQueue()
+
+
+class SQLiteStore(LogbookSubscriber):
+    """
+    Transaction storage for a Logbook in a SQLite database (see module documentation).
+
+    Like ColumnarStore, the store holds no Transaction objects of its own: transactions are
+    materialised when accessed and shared while referenced, indexed by their id, and recording
+    an operation of the owning Logbook writes it through to the database.
+    """
+
+    # Number of transaction indexes below which the ones of dead transactions are not swept.
+    SWEEP_MIN = 1024
+
+    def __init__(self, path, places=2, batch_size=1000, readers=4):
+        """
+        Constructor
+        :param path: database file path, created if it does not exist
+        :param places: number of decimal places kept for amounts, for a new database
+        :param batch_size: number of buffered changes written at once
+        :param readers: size of the pool of reader connections
+        """
+        self._path = path
+        self._places = places
+        self._batch_size = batch_size
+        self._readers = readers
+        self._connection = None
+        self._pool = None
+        self._lock = threading.RLock()
+        self._logbook = None
+        self._accounts = []
+        self._account_ids = {}
+        self._count = 0
+        # Live transactions by index, and their indexes by id, swept as transactions die.
+        self._views = weakref.WeakValueDictionary()
+        self._indexes = {}
+        self._sweep_at = self.SWEEP_MIN
+        self._new_accounts = []
+        self._transactions = []
+        self._operations = []
+        self._recorded = []
+        self._categorized = []
+        self._history = {}
+
+    def open(self):
+        """
+        Opens (or creates) the database.
+        :return: Logbook backed by this store
+        """
+        if self._logbook is not None:
+            raise ValueError('{path} is already open.'.format(path=self._path))
+        connection = sqlite3.connect(self._path, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(_SCHEMA)
+        # Databases written before transactions had categories lack the column.
+        if 'category' not in [column[1] for column in
+                              connection.execute('PRAGMA table_info(transactions)')]:
+            connection.execute('ALTER TABLE transactions ADD COLUMN category TEXT')
+        connection.execute('INSERT OR IGNORE INTO settings VALUES (?, ?)',
+                           ('places', self._places))
+        connection.commit()
+        self._places, = connection.execute(
+            "SELECT value FROM settings WHERE key = 'places'").fetchone()
+        self._connection = connection
+        self._pool = ConnectionPool(self._path, self._readers)
+
+        logbook = Logbook(store=self)
+        self._load_accounts(logbook)
+        last, = connection.execute('SELECT max(id) FROM transactions').fetchone()
+        self._count = last + 1 if last is not None else 0
+        self._logbook = logbook
+        logbook.subscribe(self)
+        return logbook
+
+    def _load_accounts(self, logbook):
+        places = self._places
+        history = {}
+        for account_id, rows in groupby(self._connection.execute(
+                'SELECT account, recorded, day, change FROM history '
+                'ORDER BY account, recorded, day'), itemgetter(0)):
+            history[account_id] = list(rows)
+
+        for account_id, name, currency, money, member, initial in self._connection.execute(
+                'SELECT id, name, currency, money, member, initial FROM accounts ORDER BY id'):
+            if money:
+                # Money-denominated accounts keep Money.PLACES minor units.
+                if places == Money.PLACES:
+                    internal = int
+                else:
+                    def internal(units):
+                        return to_minor(from_minor(units, places), Money.PLACES)
+                initial = Money.from_units(internal(initial), currency)
+            else:
+                def internal(units):
+                    return from_minor(units, places)
+                initial = internal(initial)
+            account = Account(name, initial, logbook if member else None)
+            account._pending = PendingOperations(self, account)
+            rows = history.get(account_id, ())
+            for recorded, attribute in ((0, '_history'), (1, '_recorded_history')):
+                index = DateIndex.from_items((day, internal(change))
+                                             for _, flag, day, change in rows if flag == recorded)
+                setattr(account, attribute, index)
+            account._balance = account._initial_balance + sum(
+                change for _, change in account._history.items())
+            account._recorded_balance = account._initial_balance + sum(
+                change for _, change in account._recorded_history.items())
+            self._accounts.append(account)
+            self._account_ids[account] = account_id
+            if member:
+                logbook.accounts().append(account)
+
+    def flush(self):
+        """
+        Writes buffered changes to the database.
+        """
+        with self._lock:
+            if not (self._new_accounts or self._transactions or self._recorded or
+                    self._categorized):
+                return
+            with self._connection:
+                self._connection.executemany('INSERT INTO accounts VALUES (?, ?, ?, ?, ?, ?)',
+                                             self._new_accounts)
+                self._connection.executemany('INSERT INTO transactions VALUES (?, ?, ?, ?)',
+                                             self._transactions)
+                self._connection.executemany('INSERT INTO operations VALUES (?, ?, ?, ?, ?, ?)',
+                                             self._operations)
+                self._connection.executemany(
+                    'UPDATE operations SET recorded = ? WHERE tx = ? AND position = ?',
+                    self._recorded)
+                self._connection.executemany('UPDATE transactions SET category = ? WHERE id = ?',
+                                             self._categorized)
+                self._connection.executemany(
+                    _ADD_HISTORY, (key + (change,) for key, change in self._history.items()))
+            self._new_accounts = []
+            self._transactions = []
+            self._operations = []
+            self._recorded = []
+            self._categorized = []
+            self._history = {}
+
+    def close(self):
+        """
+        Writes buffered changes and closes the database. The Logbook must not be used any more.
+        """
+        if self._logbook is None:
+            return
+        self.flush()
+        self._logbook.unsubscribe(self)
+        self._pool.close()
+        self._connection.close()
+        self._logbook = None
+
+    def _pending(self):
+        return len(self._transactions) + len(self._recorded) + len(self._categorized)
+
+    def places(self):
+        """Number of decimal places kept for amounts."""
+        return self._places
+
+    def accounts(self):
+        """Accounts referenced by the stored operations, in account id order."""
+        return self._accounts
+
+    def account_added(self, account):
+        self._account_id(account)
+
+    def _account_id(self, account):
+        account_id = self._account_ids.get(account)
+        if account_id is None:
+            account_id = len(self._accounts)
+            self._accounts.append(account)
+            self._account_ids[account] = account_id
+            money = isinstance(account.balance(), Money)
+            self._new_accounts.append((account_id, account.name(), account.currency(), money,
+                                       account._logbook is not None and
+                                       account._logbook is self._logbook,
+                                       to_minor(account.initial_balance(), self._places)))
+        return account_id
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for start in range(0, len(self), self._batch_size):
+            yield from self._select('t.id >= ? AND t.id < ?',
+                                    (start, min(start + self._batch_size, len(self))))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return list(self._select('t.id >= ? AND t.id < ?', (start, stop)))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('SQLiteStore index out of range')
+
+        transaction = self._views.get(index)
+        if transaction is None:
+            transaction, = self._select('t.id = ?', (index,))
+        return transaction
+
+    def _select(self, where, parameters):
+        """
+        Yields the transactions matching an SQL condition on `t` (transactions), in order.
+        """
+        self.flush()
+        with self._pool.connection() as connection:
+            rows = connection.execute(_OPERATIONS.format(where=where), parameters).fetchall()
+        for index, operations in groupby(rows, itemgetter(0)):
+            transaction = self._views.get(index)
+            if transaction is None:
+                transaction = self._materialise(list(operations))
+            yield transaction
+
+    def _materialise(self, rows):
+        index, tx_date, entered, category, kind = rows[0][:5]
+        transaction = build_transaction(
+            kind, [self._accounts[row[5]] for row in rows], [row[6] for row in rows],
+            [row[7] for row in rows], date.fromordinal(tx_date), date.fromordinal(entered),
+            self._places, category)
+        self._bind(transaction, index)
+        return transaction
+
+    def _bind(self, transaction, index):
+        self._views[index] = transaction
+        self._indexes[id(transaction)] = index
+        if len(self._indexes) > self._sweep_at:
+            self._indexes = {id(transaction): index
+                             for index, transaction in list(self._views.items())}
+            self._sweep_at = max(2 * len(self._indexes), self.SWEEP_MIN)
+
+    def _index_of(self, transaction):
+        """
+        Returns the index of a stored transaction, None if not stored.
+        """
+        index = self._indexes.get(id(transaction))
+        if index is None or self._views.get(index) is not transaction:
+            return None
+        return index
+
+    def append(self, transaction):
+        """
+        Stores a transaction.
+        :param transaction: a Deposit, Bill or Transfer
+        """
+        self.extend((transaction,))
+
+    def extend(self, transactions):
+        """
+        Stores a batch of transactions. Nothing is stored if any of them cannot be.
+        :param transactions: iterable of Deposits, Bills and Transfers
+        """
+        transactions = list(transactions)
+        converted = [self._convert(transaction) for transaction in transactions]
+        with self._lock:
+            for transaction, (kinds, changes) in zip(transactions, converted):
+                index = self._count
+                tx_date = transaction.date().toordinal()
+                category = getattr(transaction, '_category', None)
+                self._transactions.append((index, tx_date, transaction.entered().toordinal(),
+                                           str(category) if category is not None else None))
+                for position, (operation, kind, change) in enumerate(
+                        zip(transaction.operations(), kinds, changes)):
+                    account_id = self._account_id(operation.account())
+                    recorded = operation.recorded()
+                    self._operations.append((index, position, kind, account_id, change,
+                                             recorded.toordinal() if recorded else 0))
+                    self._add_history(account_id, 0, tx_date, change)
+                self._count += 1
+                self._bind(transaction, index)
+            if self._pending() >= self._batch_size:
+                self.flush()
+
+    def _convert(self, transaction):
+        operations = transaction.operations()
+        try:
+            kinds = [_KINDS[type(operation)] for operation in operations]
+        except KeyError:
+            raise TypeError('Cannot store a {type}.'.format(type=type(transaction).__name__))
+        changes = [to_minor(operation.balance_change(), self._places) for operation in operations]
+        return kinds, changes
+
+    def _add_history(self, account_id, recorded, day, change):
+        key = (account_id, recorded, day)
+        self._history[key] = self._history.get(key, 0) + change
+
+    def record(self, operation):
+        """
+        Writes the recorded date of a stored operation through to the database.
+        :param operation: an operation handed out by (or entered into) this store
+        """
+        row = self.locate(operation)
+        if row is None:
+            return
+        with self._lock:
+            recorded = operation.recorded().toordinal()
+            self._recorded.append((recorded,) + row)
+            self._add_history(self._account_ids[operation.account()], 1, recorded,
+                              to_minor(operation.balance_change(), self._places))
+            if self._pending() >= self._batch_size:
+                self.flush()
+
+    def categorize(self, transaction):
+        """
+        Writes the category of a stored transaction through to the database.
+        :param transaction: a Deposit or Bill handed out by (or entered into) this store
+        """
+        index = self._index_of(transaction)
+        if index is None:
+            return
+        with self._lock:
+            category = transaction.category()
+            self._categorized.append((str(category) if category is not None else None, index))
+            if self._pending() >= self._batch_size:
+                self.flush()
+
+    def locate(self, operation):
+        """
+        Finds a stored operation.
+        :param operation: an operation handed out by (or entered into) this store
+        :return: (transaction index, position within the transaction), or None if not stored
+        """
+        transaction = operation._transaction
+        index = self._index_of(transaction)
+        if index is None:
+            return None
+        return index, transaction.operations().index(operation)
+
+    def unrecorded_operations(self, account):
+        """
+        Returns a list of the operations on an account not recorded yet, in the order they were
+        entered.
+        """
+        return [operation for transaction in self._select(
+            't.id IN (SELECT tx FROM operations WHERE account = ? AND recorded = 0)',
+            (self._account_ids[account],))
+            for operation in transaction.operations()
+            if operation.account() is account and operation.recorded() is None]
+
+    def unrecorded(self):
+        """
+        Returns a list of indexes of transactions with any operation not recorded yet.
+        """
+        self.flush()
+        with self._pool.connection() as connection:
+            return [index for index, in connection.execute(
+                'SELECT DISTINCT tx FROM operations WHERE recorded = 0 ORDER BY tx')]
+
+    def summaries(self, start=0):
+        """
+        Returns a generator of (transaction index, date ordinal, accounts of its operations) of
+        the transactions from start on, read without materialising them.
+        """
+        self.flush()
+        with self._pool.connection() as connection:
+            rows = connection.execute(
+                'SELECT t.id, t.date, o.account FROM transactions t '
+                'JOIN operations o ON o.tx = t.id WHERE t.id >= ? ORDER BY t.id, o.position',
+                (start,)).fetchall()
+        accounts = self._accounts
+        for (index, day), operations in groupby(rows, itemgetter(0, 1)):
+            yield index, day, [accounts[operation[2]] for operation in operations]
+
+
+class PendingOperations(PendingIndex):
+    """
+    PendingIndex of an account read from a SQLiteStore: the account's operations not recorded
+    yet are read from the database when first queried. Until then, entering and recording
+    operations of the account cost nothing here, the database keeping track of them.
+    """
+
+    def __init__(self, store, account):
+        """
+        Constructor
+        :param store: the SQLiteStore
+        :param account: the account, whose operations are all stored in store
+        """
+        super().__init__(account.amount_of(0))
+        self._store = store
+        self._account = account
+        self._loaded = False
+
+    def _index(self):
+        if not self._loaded:
+            self._loaded = True
+            self._batch = self._store.unrecorded_operations(self._account)
+        super()._index()
+
+    def add(self, operation):
+        if self._loaded:
+            super().add(operation)
+
+    def extend(self, operations):
+        if self._loaded:
+            super().extend(operations)
+
+    def discard(self, operation):
+        if self._loaded:
+            super().discard(operation)
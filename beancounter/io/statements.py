@@ -0,0 +1,399 @@
+"""
+Streaming import of bank statements.
+
+Statements are read line by line through a generator pipeline:
+
+    parse (rows) -> map to account (StatementRecord) -> build transaction -> Logbook.enter
+
+so memory use does not depend on the file size. Every record carries the byte offset right
+after it, which an interrupted import can be resumed from.
+"""
+from beancounter.basics.account import Account
+from beancounter.basics.transaction import Deposit, Bill
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import csv
+import re
+import time
+
+
+class StatementRecord:
+    """
+    A single entry of a bank statement, mapped to an account.
+    """
+
+    def __init__(self, account, amount, tx_date, description='', offset=None):
+        """
+        Constructor
+        :param account: affected account
+        :param amount: signed amount, negative for money leaving the account
+        :param tx_date: transaction date
+        :param description: free text description from the statement
+        :param offset: byte offset right after this record in the statement file
+        """
+        self._account = account
+        self._amount = amount
+        self._date = tx_date
+        self._description = description
+        self._offset = offset
+
+    def __repr__(self):
+        return 'StatementRecord({account}, {amount}, {date}, {description})'.format(
+            account=self._account, amount=repr(self._amount), date=repr(self._date),
+            description=repr(self._description))
+
+    def account(self):
+        """Account affected by this record."""
+        return self._account
+
+    def amount(self):
+        """Signed amount, negative for money leaving the account."""
+        return self._amount
+
+    def date(self):
+        """Transaction date."""
+        return self._date
+
+    def description(self):
+        """Description from the statement."""
+        return self._description
+
+    def offset(self):
+        """Byte offset right after this record, to resume an import from."""
+        return self._offset
+
+    def transaction(self, entered=None):
+        """
+        Builds a Deposit (or a Bill, for negative amounts) out of this record.
+        :param entered: date it was entered to the system, today() if None
+        """
+        amount = self._account.to_amount(self._amount)
+        if amount < 0:
+            return Bill(self._account, -amount, self._date, entered)
+        return Deposit(self._account, amount, self._date, entered)
+
+
+class ColumnMapping:
+    """
+    Describes where statement fields are found in CSV rows.
+
+    Columns are given by header name (or by position, as ints, for files without a header).
+    Amounts come either from a single signed `amount` column, or from separate `credit` and
+    `debit` columns.
+    """
+
+    def __init__(self, date='date', amount='amount', account=None, description=None,
+                 credit=None, debit=None, date_format='%Y-%m-%d', decimal_point='.',
+                 thousands_separator='', delimiter=',', header=True):
+        """
+        Constructor
+        :param date: transaction date column
+        :param amount: signed amount column, ignored if credit and debit are given
+        :param account: column identifying the account, if the statement covers several
+        :param description: description column
+        :param credit: column with incoming amounts
+        :param debit: column with outgoing amounts
+        :param date_format: strptime() format of dates
+        :param decimal_point: decimal point used in amounts
+        :param thousands_separator: thousands separator used in amounts
+        :param delimiter: CSV field delimiter
+        :param header: whether the first line of the file is a header
+        """
+        self.date = date
+        self.amount = amount
+        self.account = account
+        self.description = description
+        self.credit = credit
+        self.debit = debit
+        self.date_format = date_format
+        self.decimal_point = decimal_point
+        self.thousands_separator = thousands_separator
+        self.delimiter = delimiter
+        self.header = header
+
+    def parse_amount(self, text):
+        """Parses an amount, honoring separators. Empty text is zero."""
+        text = text.strip()
+        if not text:
+            return Decimal('0')
+        if self.thousands_separator:
+            text = text.replace(self.thousands_separator, '')
+        return Decimal(text.replace(self.decimal_point, '.'))
+
+    def parse_date(self, text):
+        """Parses a date."""
+        return datetime.strptime(text.strip(), self.date_format).date()
+
+
+class _LineReader:
+    """
+    Iterates over decoded lines of a binary stream, tracking the byte position.
+
+    csv.reader pulls lines one at a time, so after each row the position is right after it.
+    """
+
+    def __init__(self, stream, encoding):
+        self.position = 0
+        self._stream = stream
+        self._encoding = encoding
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._stream.readline()
+        if not line:
+            raise StopIteration
+        self.position += len(line)
+        return line.decode(self._encoding)
+
+    def seek(self, offset):
+        self._stream.seek(offset)
+        self.position = offset
+
+
+class Statement:
+    """
+    Base class for statement files.
+    """
+
+    def __init__(self, path, accounts, encoding='utf-8'):
+        """
+        Constructor
+        :param path: statement file path
+        :param accounts: Account receiving all records, or a dict of accounts by the account
+                         identifiers used in the statement
+        :param encoding: text encoding of the file
+        """
+        self._path = path
+        self._accounts = accounts
+        self._encoding = encoding
+
+    def _account(self, key):
+        if isinstance(self._accounts, Account):
+            return self._accounts
+        try:
+            return self._accounts[key]
+        except KeyError:
+            raise ValueError('No account mapped for {key!r}.'.format(key=key))
+
+    def records(self, offset=0):
+        """
+        Abstract. When implemented, it should return a generator of StatementRecords, starting
+        after a given byte offset.
+        """
+        raise NotImplementedError()
+
+
+class CsvStatement(Statement):
+    """
+    CSV bank statement export.
+
+    Quoted fields may span lines; the file is still read one line at a time.
+    """
+
+    def __init__(self, path, accounts, mapping=None, encoding='utf-8'):
+        """
+        Constructor
+        :param path: statement file path
+        :param accounts: Account receiving all records, or a dict of accounts by the values
+                         of the mapping's account column
+        :param mapping: ColumnMapping, the defaults if None
+        :param encoding: text encoding of the file
+        """
+        super().__init__(path, accounts, encoding)
+        self._mapping = mapping if mapping else ColumnMapping()
+
+    def records(self, offset=0):
+        mapping = self._mapping
+        with open(self._path, 'rb') as stream:
+            lines = _LineReader(stream, self._encoding)
+            columns = None
+            if mapping.header:
+                header = next(csv.reader(lines, delimiter=mapping.delimiter), [])
+                columns = {name.strip(): i for i, name in enumerate(header)}
+            if offset > lines.position:
+                lines.seek(offset)
+
+            split = mapping.credit is not None and mapping.debit is not None
+            fields = [self._column(columns, name) for name in (
+                mapping.date, None if split else mapping.amount, mapping.account,
+                mapping.description, mapping.credit, mapping.debit)]
+            for row in csv.reader(lines, delimiter=mapping.delimiter):
+                if row:
+                    yield self._record(row, lines.position, *fields)
+
+    def _column(self, columns, name):
+        if name is None or isinstance(name, int):
+            return name
+        if columns is None or name not in columns:
+            raise ValueError('Column {name!r} not found in {path}.'.format(
+                name=name, path=self._path))
+        return columns[name]
+
+    def _record(self, row, position, date, amount, account, description, credit, debit):
+        mapping = self._mapping
+        try:
+            if credit is not None and debit is not None:
+                value = mapping.parse_amount(row[credit]) - mapping.parse_amount(row[debit])
+            else:
+                value = mapping.parse_amount(row[amount])
+            return StatementRecord(
+                self._account(row[account] if account is not None else None),
+                value,
+                mapping.parse_date(row[date]),
+                row[description] if description is not None else '',
+                position)
+        except (IndexError, InvalidOperation) as error:
+            raise ValueError('Invalid row before offset {offset}: {row!r} ({error}).'.format(
+                offset=position, row=row, error=error))
+
+
+class OfxStatement(Statement):
+    """
+    OFX (1.x SGML or 2.x XML) bank statement.
+
+    Records are taken from STMTTRN aggregates; the account from the ACCTID preceding them. The
+    file is read in chunks of CHUNK_SIZE bytes, as OFX 2.x files may be a single line; resuming
+    seeks to the offset and looks for the preceding ACCTID backwards from there.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    _TAG = re.compile(rb'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+    _ACCTID = re.compile(rb'<ACCTID>([^<\r\n]*)', re.IGNORECASE)
+    _END_OF_VALUE = re.compile(rb'[<\r\n]')
+
+    def records(self, offset=0):
+        fields = None
+        with open(self._path, 'rb') as stream:
+            account_id = self._account_before(stream, offset) if offset else None
+            stream.seek(offset)
+            position = offset
+            buffer = b''
+            while True:
+                chunk = stream.read(self.CHUNK_SIZE)
+                buffer += chunk
+                # Tags before the last '<' are complete: values end at '<' or a line break.
+                end = buffer.rfind(b'<') if chunk else len(buffer)
+                for match in self._TAG.finditer(buffer, 0, max(end, 0)):
+                    closing, tag, value = match.group(1), match.group(2).upper(), match.group(3)
+                    if tag == b'ACCTID' and not closing:
+                        account_id = value.strip().decode(self._encoding)
+                    elif tag == b'STMTTRN':
+                        if not closing:
+                            fields = {}
+                        elif fields is not None:
+                            yield self._record(account_id, fields, position + match.end())
+                            fields = None
+                    elif fields is not None and not closing:
+                        fields[tag] = value.strip().decode(self._encoding)
+                if not chunk:
+                    break
+                if end < 0:
+                    # Nothing before a tag matters.
+                    end = len(buffer)
+                position += end
+                buffer = buffer[end:]
+
+    def _account_before(self, stream, offset):
+        """
+        Returns the value of the last ACCTID tag before an offset, None if there is none.
+        """
+        end = offset
+        # Start of the data after the chunk, up to the end of a value running into it.
+        following = b''
+        while end > 0:
+            start = max(end - self.CHUNK_SIZE, 0)
+            stream.seek(start)
+            chunk = stream.read(end - start)
+            match = None
+            for match in self._ACCTID.finditer(chunk + following):
+                pass
+            if match is not None:
+                return match.group(1).strip().decode(self._encoding)
+            value_end = self._END_OF_VALUE.search(chunk)
+            following = chunk[:value_end.start()] if value_end else chunk + following
+            end = start
+        return None
+
+    def _record(self, account_id, fields, offset):
+        try:
+            return StatementRecord(self._account(account_id),
+                                   Decimal(fields[b'TRNAMT'].replace(',', '.')),
+                                   datetime.strptime(fields[b'DTPOSTED'][:8], '%Y%m%d').date(),
+                                   fields.get(b'NAME', fields.get(b'MEMO', '')),
+                                   offset)
+        except (KeyError, InvalidOperation) as error:
+            raise ValueError('Invalid STMTTRN ending at offset {offset}: {error}.'.format(
+                offset=offset, error=error))
+
+
+class Importer:
+    """
+    Imports a statement into a Logbook, keeping track of progress and throughput.
+
+    If an import gets interrupted, calling run() again (or passing offset() to a new Importer)
+    resumes right after the last entered record.
+    """
+
+    def __init__(self, logbook, statement, entered=None):
+        """
+        Constructor
+        :param logbook: target Logbook
+        :param statement: Statement to import
+        :param entered: date the transactions are entered to the system, today() if None
+        """
+        self._logbook = logbook
+        self._statement = statement
+        self._entered = entered
+        self._offset = 0
+        self._rows = 0
+        self._bytes = 0
+        self._seconds = 0.0
+
+    def offset(self):
+        """Byte offset right after the last imported record."""
+        return self._offset
+
+    def rows(self):
+        """Number of records imported so far."""
+        return self._rows
+
+    def seconds(self):
+        """Time spent importing, in seconds."""
+        return self._seconds
+
+    def rows_per_second(self):
+        """Import throughput, in records per second."""
+        return self._rows / self._seconds if self._seconds else 0.0
+
+    def bytes_per_second(self):
+        """Import throughput, in bytes per second."""
+        return self._bytes / self._seconds if self._seconds else 0.0
+
+    def transactions(self, offset):
+        """
+        Returns a generator of transactions built from statement records after an offset.
+        """
+        for record in self._statement.records(offset):
+            yield record, record.transaction(self._entered)
+
+    def run(self, offset=None):
+        """
+        Imports (the rest of) the statement.
+        :param offset: byte offset to start from, where the last run stopped if None
+        :return: self
+        """
+        if offset is not None:
+            self._offset = offset
+        started = time.perf_counter()
+        try:
+            for record, transaction in self.transactions(self._offset):
+                self._logbook.enter(transaction)
+                self._rows += 1
+                self._bytes += record.offset() - self._offset
+                self._offset = record.offset()
+        finally:
+            self._seconds += time.perf_counter() - started
+        return self
@@ -1,4 +1,5 @@
-from beancounter import Account, Deposit, Bill, Transfer, Logbook
+from beancounter import Account, Deposit, Bill, Transfer, Logbook, Money, ColumnarStore, \
+    RateTable
 from .test_utils import objects_equal
 from decimal import Decimal
 from datetime import date
@@ -241,3 +242,258 @@ def test_pickling_logbook():
 
     assert objects_equal(logbook1, logbook2)
     assert logbook1 is not logbook2
+
+
+def test_balance_at():
+    """
+    Balance at a given date includes only operations dated on or before it.
+    """
+    logbook, acc1, acc2 = get_test_accounts(balance1=Decimal('100.00'))
+    logbook.deposit(acc1, Decimal('50.00'), date(2015, 3, 1))
+    logbook.bill(acc1, Decimal('20.00'), date(2015, 4, 1))
+    logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15))
+
+    assert acc1.balance_at(date(2015, 2, 28)) == Decimal('100.00')
+    assert acc1.balance_at(date(2015, 3, 1)) == Decimal('150.00')
+    assert acc1.balance_at(date(2015, 3, 31)) == Decimal('120.00')
+    assert acc1.balance_at(date(2015, 4, 1)) == acc1.balance()
+    assert acc2.balance_at(date(2015, 3, 31)) == Decimal('30.00')
+
+
+def test_balance_at_backdated():
+    """
+    Backdated operations are included in later balances.
+    """
+    logbook, acc = get_test_account(balance=Decimal('10.00'))
+    logbook.deposit(acc, Decimal('50.00'), date(2015, 3, 1))
+    assert acc.balance_at(date(2015, 2, 1)) == Decimal('10.00')
+
+    logbook.bill(acc, Decimal('5.00'), date(2015, 1, 1))
+    assert acc.balance_at(date(2015, 2, 1)) == Decimal('5.00')
+    assert acc.balance_at(date(2015, 3, 1)) == Decimal('55.00')
+
+
+def test_recorded_balance_at():
+    """
+    Recorded balance at a given date includes only operations recorded on or before it.
+    """
+    logbook, acc = get_test_account(balance=Decimal('10.00'))
+    bill = logbook.bill(acc, Decimal('5.00'), date(2015, 1, 1))
+    logbook.deposit(acc, Decimal('50.00'), date(2015, 1, 2))
+    bill.operations()[0].record(date(2015, 1, 4))
+
+    assert acc.recorded_balance_at(date(2015, 1, 3)) == Decimal('10.00')
+    assert acc.recorded_balance_at(date(2015, 1, 4)) == Decimal('5.00')
+    assert acc.balance_at(date(2015, 1, 4)) == Decimal('55.00')
+
+
+def test_logbook_balances_at():
+    """
+    Logbook reports balances of all accounts at a given date.
+    """
+    logbook, acc1, acc2 = get_test_accounts(balance1=Decimal('100.00'))
+    logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15))
+
+    assert logbook.balances_at(date(2015, 3, 14)) == {acc1: Decimal('100.00'),
+                                                      acc2: Decimal('0.00')}
+    assert logbook.balances_at(date(2015, 3, 15)) == {acc1: Decimal('70.00'),
+                                                      acc2: Decimal('30.00')}
+
+
+def test_enter_many():
+    """
+    A batch of transactions updates balances like entering them one by one.
+    """
+    logbook, acc1, acc2 = get_test_accounts(balance1=Decimal('100.00'))
+    transactions = [Deposit(acc1, Decimal('50.00'), date(2015, 3, 1)),
+                    Bill(acc1, Decimal('20.00'), date(2015, 3, 1)),
+                    Transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15))]
+    logbook.enter_many(iter(transactions))
+
+    assert logbook.transactions() == transactions
+    assert acc1.balance() == Decimal('100.00')
+    assert acc2.balance() == Decimal('30.00')
+    assert acc1.balance_at(date(2015, 3, 1)) == Decimal('130.00')
+
+
+def test_enter_rows():
+    """
+    Transactions can be entered in bulk from tuples.
+    """
+    logbook, acc1, acc2 = get_test_accounts()
+    entered = date(2015, 4, 1)
+    deposit, bill, transfer = logbook.enter_rows([
+        ('deposit', acc1, Decimal('50.00'), date(2015, 3, 1), entered),
+        ('bill', acc2, Decimal('20.00'), date(2015, 3, 2), entered),
+        ('transfer', acc1, acc2, Decimal('30.00'), date(2015, 3, 15), entered)])
+
+    assert objects_equal(deposit, Deposit(acc1, Decimal('50.00'), date(2015, 3, 1), entered))
+    assert objects_equal(bill, Bill(acc2, Decimal('20.00'), date(2015, 3, 2), entered))
+    assert objects_equal(transfer, Transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15),
+                                            entered))
+    assert acc1.balance() == Decimal('20.00')
+    assert acc2.balance() == Decimal('10.00')
+
+
+@pytest.mark.parametrize('bad_row', [('refund', None, Decimal('1.00'), date(2015, 3, 1)),
+                                     ('bill', None),
+                                     ('bill', Account('foreign'), Decimal('1.00'),
+                                      date(2015, 3, 1)),
+                                     ('bill', 'acc', Decimal('1.00'), '2015-03-01')])
+def test_enter_rows_all_or_nothing(bad_row):
+    """
+    Nothing is entered if any row of a batch is invalid.
+    """
+    logbook, acc = get_test_account(balance=Decimal('100.00'))
+    if bad_row[1] == 'acc':
+        bad_row = (bad_row[0], acc) + bad_row[2:]
+
+    with pytest.raises(ValueError):
+        logbook.enter_rows([('deposit', acc, Decimal('50.00'), date(2015, 3, 1)), bad_row])
+    assert len(logbook.transactions()) == 0
+    assert acc.balance() == Decimal('100.00')
+    assert acc.balance_at(date(2015, 3, 1)) == Decimal('100.00')
+
+
+def test_record_many():
+    """
+    A batch of recorded operations updates recorded balances like recording them one by one.
+    """
+    logbook, acc1, acc2 = get_test_accounts(balance1=Decimal('100.00'))
+    deposit = logbook.deposit(acc1, Decimal('50.00'), date(2015, 3, 1))
+    transfer = logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15))
+    logbook.record_many([(deposit.operations()[0], date(2015, 3, 2)),
+                         (transfer.outgoing(), date(2015, 3, 16))])
+
+    assert deposit.operations()[0].recorded() == date(2015, 3, 2)
+    assert transfer.recorded() is None
+    assert acc1.recorded_balance() == Decimal('120.00')
+    assert acc1.recorded_balance_at(date(2015, 3, 2)) == Decimal('150.00')
+    assert acc2.recorded_balance() == Decimal('0.00')
+
+    with pytest.raises(ValueError):
+        logbook.record_many([(transfer.incoming(), date(2015, 3, 17)),
+                             (transfer.outgoing(), date(2015, 3, 17))])
+    assert transfer.incoming().recorded() is None
+    assert acc2.recorded_balance() == Decimal('0.00')
+
+
+def test_pending():
+    """
+    Logbook keeps track of operations entered, but not yet recorded.
+    """
+    logbook, acc1, acc2 = get_test_accounts()
+    deposit = logbook.deposit(acc1, Decimal('50.00'), date(2015, 1, 1))
+    bill = logbook.bill(acc1, Decimal('20.00'), date(2015, 3, 1))
+    transfer = Transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15))
+    transfer.incoming().record(date(2015, 3, 16))
+    logbook.enter_many([transfer])
+
+    assert logbook.pending(acc1) == [deposit.operations()[0], bill.operations()[0],
+                                     transfer.outgoing()]
+    assert logbook.pending(acc2) == []
+    assert logbook.pending_total(acc1) == Decimal('0.00')
+    assert logbook.pending_aging(acc1, date(2015, 3, 20)) == [
+        Decimal('-50.00'), Decimal('0.00'), Decimal('50.00'), Decimal('0.00')]
+
+    bill.operations()[0].record(date(2015, 3, 2))
+    logbook.record_many([(transfer.outgoing(), date(2015, 3, 17))])
+    assert logbook.pending(acc1) == [deposit.operations()[0]]
+    assert logbook.pending_total(acc1) == Decimal('50.00')
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_pending_amounts(store):
+    """
+    Pending totals are amounts of the account, also without pending operations
+    """
+    logbook = Logbook(store=store)
+    acc1 = logbook.add_account('acc 1')
+    acc2 = logbook.add_account('acc 2', currency='EUR')
+    logbook.bill(acc1, Decimal('5.00'), date(2015, 3, 1))
+    logbook.bill(acc2, Money('5.00', 'EUR'), date(2015, 3, 1))
+    on = date(2015, 3, 10)
+    assert [repr(logbook.pending_total(acc1))] + list(map(repr, logbook.pending_aging(
+        acc1, on))) == ["Decimal('-5.00')"] + ["Decimal('-5.00')"] + ["Decimal('0.00')"] * 3
+    assert logbook.pending_aging(acc2, on) == [Money('-5.00', 'EUR')] + [Money(0, 'EUR')] * 3
+
+    logbook.transactions()[0].operations()[0].record(on)
+    logbook.transactions()[1].operations()[0].record(on)
+    assert repr(logbook.pending_total(acc1)) == "Decimal('0.00')"
+    assert logbook.pending_total(acc2) == Money(0, 'EUR')
+    assert all(type(total) is Money for total in logbook.pending_aging(acc2, on))
+
+
+def test_money_account():
+    """
+    An account opened with Money keeps minor units and returns Money.
+    """
+    logbook = Logbook()
+    acc1 = logbook.add_account('acc 1', balance=Decimal('100.00'), currency='EUR')
+    acc2 = logbook.add_account('acc 2', balance=Money('0', 'EUR'))
+    assert acc1.currency() == 'EUR'
+    assert acc1._balance == 10000
+
+    logbook.deposit(acc1, Money('50.00', 'EUR'), date(2015, 3, 1))
+    logbook.enter_many([Bill(acc1, Money('20.25', 'EUR'), date(2015, 3, 2)),
+                        Transfer(acc1, acc2, Money('30.00', 'EUR'), date(2015, 3, 15))])
+    bill = logbook.bill(acc2, Money('1.00', 'EUR'), date(2015, 3, 16))
+    bill.operations()[0].record(date(2015, 3, 17))
+
+    assert acc1.balance() == Money('99.75', 'EUR')
+    assert acc2.balance() == Money('29.00', 'EUR')
+    assert acc2.recorded_balance() == Money('-1.00', 'EUR')
+    assert acc1.balance_at(date(2015, 3, 1)) == Money('150.00', 'EUR')
+    assert acc1.changes_between(date(2015, 3, 2), None) == [
+        (date(2015, 3, 2).toordinal(), Money('-20.25', 'EUR')),
+        (date(2015, 3, 15).toordinal(), Money('-30.00', 'EUR'))]
+    assert logbook.pending_total(acc1) == Money('-0.25', 'EUR')
+
+    with pytest.raises(ValueError):
+        Bill(acc1, Decimal('1.00'), date(2015, 3, 1))
+    with pytest.raises(ValueError):
+        Bill(acc1, Money('1.00', 'USD'), date(2015, 3, 1))
+    with pytest.raises(ValueError):
+        Bill(get_test_accounts()[1], Money('1.00', 'EUR'), date(2015, 3, 1))
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_cross_currency_transfer(store):
+    """
+    A transfer between currencies takes amount from one account and gives amount_in to the other
+    """
+    logbook = Logbook(store=store)
+    eur = logbook.add_account('eur', balance=Decimal('100.00'), currency='EUR')
+    usd = logbook.add_account('usd', currency='USD')
+    logbook.transfer(eur, usd, Money('90.00', 'EUR'), date(2015, 3, 1),
+                     amount_in=Money('100.00', 'USD'))
+
+    assert eur.balance() == Money('10.00', 'EUR')
+    assert usd.balance() == Money('100.00', 'USD')
+    transfer = logbook.transactions()[0]
+    assert transfer.amount_in() == Money('100.00', 'USD')
+    assert transfer.incoming().balance_change() == Money('100.00', 'USD')
+
+    with pytest.raises(ValueError):
+        Transfer(eur, usd, Money('90.00', 'EUR'), date(2015, 3, 1))
+
+
+def test_net_worth():
+    """
+    Net worth sums balances per currency and converts each currency once
+    """
+    rates = RateTable('EUR')
+    rates.add('USD', date(2015, 1, 1), Decimal('0.90'))
+    rates.add('USD', date(2015, 3, 1), Decimal('0.80'))
+    logbook = Logbook()
+    logbook.add_account('eur', balance=Decimal('100.00'), currency='EUR')
+    logbook.add_account('plain', balance=Decimal('10.00'))
+    for i in range(3):
+        usd = logbook.add_account('usd {i}'.format(i=i), balance=Decimal('0.01'),
+                                  currency='USD')
+    logbook.deposit(usd, Money('99.97', 'USD'), date(2015, 2, 1))
+
+    assert logbook.net_worth(rates, date(2015, 1, 15)) == Money('110.03', 'EUR')
+    assert logbook.net_worth(rates, date(2015, 3, 1)) == Money('190.00', 'EUR')
+    assert logbook.net_worth(rates) == Money('190.00', 'EUR')
+    assert rates._rate.cache_info().misses == 3  # one USD lookup per date
@@ -0,0 +1,193 @@
+from beancounter import ConcurrentLogbook, ColumnarStore, LogbookSubscriber, Transfer, Deposit
+from decimal import Decimal
+from datetime import date, timedelta
+import pickle
+import random
+import sys
+import threading
+import time
+import pytest
+
+
+def stress(logbook, writers=8, transfers=300, seed=18):
+    """
+    Helper method, runs writer threads entering transfers between overlapping accounts (in
+    both directions), a thread recording operations and a thread reading balance snapshots.
+    :return: list of errors seen by the threads
+    """
+    accounts = logbook.accounts()
+    total = sum(account.balance() for account in accounts)
+    errors = []
+    done = threading.Event()
+
+    def write(seed):
+        rnd = random.Random(seed)
+        for i in range(transfers):
+            account_from, account_to = rnd.sample(accounts, 2)
+            transfer = Transfer(account_from, account_to, Decimal(rnd.randint(1, 999)).scaleb(-2),
+                                date(2015, 1, 1) + timedelta(days=i % 60))
+            if i % 10:
+                logbook.enter(transfer)
+            else:
+                logbook.enter_many([transfer, Deposit(account_to, Decimal('0.00'),
+                                                      transfer.date())])
+
+    def record():
+        rnd = random.Random(seed)
+        while not done.is_set():
+            account = rnd.choice(accounts)
+            pending = logbook.pending(account)[:5]
+            try:
+                if rnd.random() < 0.5:
+                    logbook.record_many((operation, operation.date()) for operation in pending)
+                else:
+                    for operation in pending:
+                        operation.record(operation.date())
+            except ValueError:
+                pass  # recorded by the writer of the other side meanwhile
+
+    def read():
+        while not done.is_set():
+            balances = logbook.balances()
+            if sum(balances.values()) != total:
+                errors.append(balances)
+
+    def run(target, *args):
+        try:
+            target(*args)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run, args=(write, seed + i)) for i in range(writers)]
+    helpers = [threading.Thread(target=run, args=(target,)) for target in (record, read)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for thread in threads + helpers:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        done.set()
+        for thread in helpers:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_stress(store):
+    """
+    Concurrent writers, recorders and readers keep balances, history and pending operations
+    consistent, and readers only see snapshots with the total balance unchanged
+    """
+    logbook = ConcurrentLogbook(store=store)
+    for i in range(6):
+        logbook.add_account('account {i}'.format(i=i), balance=Decimal('1000.00'))
+    assert stress(logbook) == []
+
+    transactions = list(logbook.transactions())
+    assert len(transactions) == 8 * (300 + 30)
+    for account in logbook.accounts():
+        operations = [operation for transaction in transactions
+                      for operation in transaction.operations() if operation.account() is account]
+        unrecorded = [operation for operation in operations if operation.recorded() is None]
+        assert account.balance() == Decimal('1000.00') + sum(
+            operation.balance_change() for operation in operations)
+        assert account.recorded_balance() == Decimal('1000.00') + sum(
+            operation.balance_change() for operation in operations if operation.recorded())
+        assert account.balance_at(date(2015, 3, 1)) == account.balance()
+        assert sorted(map(id, logbook.pending(account))) == sorted(map(id, unrecorded))
+    assert sum(logbook.balances().values()) == Decimal('6000.00')
+
+
+def test_pickling():
+    """
+    A ConcurrentLogbook pickles without its locks, which are created again
+    """
+    logbook = ConcurrentLogbook()
+    acc1 = logbook.add_account('acc 1', balance=Decimal('10.00'))
+    acc2 = logbook.add_account('acc 2')
+    logbook.transfer(acc1, acc2, Decimal('5.00'), date(2015, 1, 1))
+
+    loaded = pickle.loads(pickle.dumps(logbook))
+    acc1, acc2 = loaded.accounts()
+    loaded.transactions()[0].incoming().record(date(2015, 1, 2))
+    assert loaded.balances() == {acc1: Decimal('5.00'), acc2: Decimal('5.00')}
+    assert acc2.recorded_balance() == Decimal('5.00')
+    assert loaded.pending(acc2) == []
+
+
+def test_rejected_transaction():
+    """
+    A transaction the store rejects leaves balances, history and pending operations unchanged
+    """
+    logbook = ConcurrentLogbook(store=ColumnarStore())
+    acc1 = logbook.add_account('acc 1', balance=Decimal('10.00'))
+    acc2 = logbook.add_account('acc 2')
+    with pytest.raises(ValueError):
+        logbook.deposit(acc1, Decimal('1.005'), date(2015, 1, 1))
+    with pytest.raises(ValueError):
+        logbook.transfer(acc1, acc2, Decimal('0.001'), date(2015, 1, 1))
+    assert logbook.balances() == {acc1: Decimal('10.00'), acc2: Decimal('0.00')}
+    assert acc1.balance_at(date(2015, 1, 1)) == Decimal('10.00')
+    assert logbook.pending(acc1) == [] and logbook.pending(acc2) == []
+    assert len(logbook.transactions()) == 0
+    assert logbook.verify(processes=1) == {}
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_fork(store):
+    """
+    A fork of a ConcurrentLogbook is itself written and read from several threads safely
+    """
+    logbook = ConcurrentLogbook(store=store, retries=4)
+    for i in range(6):
+        logbook.add_account('account {i}'.format(i=i), balance=Decimal('1000.00'))
+    logbook.transfer(logbook.accounts()[0], logbook.accounts()[1], Decimal('5.00'),
+                     date(2015, 1, 1))
+    fork = logbook.fork()
+    assert type(fork) is ConcurrentLogbook and fork._retries == 4
+    assert all(type(account) is type(logbook.accounts()[0]) for account in fork.accounts())
+    assert stress(fork, writers=4, transfers=100) == []
+
+    assert sum(fork.balances().values()) == Decimal('6000.00')
+    assert len(fork.transactions()) == 1 + 4 * (100 + 10)
+    assert logbook.balances() == {account: balance for account, balance in zip(
+        logbook.accounts(), [Decimal('995.00'), Decimal('1005.00')] + [Decimal('1000.00')] * 4)}
+    assert len(logbook.transactions()) == 1
+
+
+class Slow(LogbookSubscriber):
+    """
+    Helper class, takes its time before an operation gets recorded.
+    """
+
+    def recording(self, operation):
+        time.sleep(0.05)
+
+
+def test_record_twice():
+    """
+    Of two threads recording the same operation at once, one fails
+    """
+    logbook = ConcurrentLogbook()
+    account = logbook.add_account('checking')
+    operation = logbook.deposit(account, Decimal('5.00'), date(2015, 1, 1)).operations()[0]
+    logbook.subscribe(Slow())
+    errors = []
+
+    def record():
+        try:
+            operation.record(date(2015, 1, 2))
+        except ValueError as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=record) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 1
+    assert account.recorded_balance() == Decimal('5.00')
+    assert account.recorded_balance_at(date(2015, 1, 2)) == Decimal('5.00')
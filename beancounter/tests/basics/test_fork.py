@@ -0,0 +1,159 @@
+from beancounter import Logbook, ColumnarStore, ConcurrentLogbook, Forecast, PlannedBill, Bill
+from beancounter.basics.frequency import Monthly
+from beancounter.basics.index import LayeredIndex
+from decimal import Decimal
+from datetime import date
+import pickle
+import pytest
+
+
+def get_forked_logbook(logbook):
+    """
+    Helper method, fills a Logbook and forks it.
+    """
+    acc1 = logbook.add_account('checking', balance=Decimal('100.00'))
+    acc2 = logbook.add_account('savings')
+    logbook.bill(acc1, Decimal('20.00'), date(2015, 2, 1)).operations()[0].record(
+        date(2015, 2, 2))
+    logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 1))
+    return logbook.fork()
+
+
+@pytest.mark.parametrize('logbook', [Logbook(), Logbook(ColumnarStore()), ConcurrentLogbook()])
+def test_fork(logbook):
+    """
+    A fork starts with the Logbook's balances and transactions, and the two change separately
+    """
+    fork = get_forked_logbook(logbook)
+    acc1, acc2 = logbook.accounts()
+    fork1, fork2 = fork.accounts()
+    assert fork1 is not acc1 and fork1.name() == 'checking'
+    assert (fork1.balance(), fork1.recorded_balance(), fork2.balance()) == (
+        Decimal('50.00'), Decimal('80.00'), Decimal('30.00'))
+    assert [(type(transaction), transaction.date(), transaction.amount())
+            for transaction in fork.transactions()] == [
+        (type(transaction), transaction.date(), transaction.amount())
+        for transaction in logbook.transactions()]
+    assert [operation.account() for transaction in fork.transactions()
+            for operation in transaction.operations()] == [fork1, fork1, fork2]
+    assert [operation.balance_change() for operation in fork.pending(fork2)] == [
+        Decimal('30.00')]
+    assert fork.pending(fork2)[0] is not logbook.pending(acc2)[0]
+
+    logbook.deposit(acc1, Decimal('5.00'), date(2015, 1, 1))
+    logbook.pending(acc2)[0].record(date(2015, 3, 2))
+    fork.bill(fork1, Decimal('7.00'), date(2015, 2, 15))
+    fork.enter_many([Bill(fork2, Decimal('1.00'), date(2015, 3, 1))])
+
+    assert acc1.balance() == Decimal('55.00')
+    assert acc1.balance_at(date(2015, 2, 20)) == Decimal('85.00')
+    assert acc2.recorded_balance() == Decimal('30.00')
+    assert len(logbook.transactions()) == 3
+    assert fork1.balance() == Decimal('43.00')
+    assert fork1.balance_at(date(2015, 2, 20)) == Decimal('73.00')
+    assert fork2.balance() == Decimal('29.00')
+    assert fork2.recorded_balance() == Decimal('0.00')
+    assert len(fork.transactions()) == 4
+    assert fork.transactions()[3].operations()[0].account() is fork2
+    assert list(fork.query().account(fork1)) == [fork.transactions()[i] for i in (0, 2, 1)]
+
+
+@pytest.mark.parametrize('logbook', [Logbook(), Logbook(ColumnarStore()), ConcurrentLogbook()])
+def test_fork_shared_transactions(logbook):
+    """
+    Shared transactions are on the fork's accounts: they are verified, queried and recorded
+    there, separately from the Logbook
+    """
+    fork = get_forked_logbook(logbook)
+    acc1, acc2 = logbook.accounts()
+    fork1, fork2 = fork.accounts()
+    assert fork.verify(processes=1) == {}
+    assert [transaction.date() for transaction in fork.query().account(fork1)] == [
+        date(2015, 2, 1), date(2015, 3, 1)]
+    assert list(fork.query().account(acc1)) == []
+    assert fork.transactions()[1] is fork.transactions()[1]
+
+    fork.pending(fork2)[0].record(date(2015, 3, 3))
+    assert (fork2.recorded_balance(), acc2.recorded_balance()) == (Decimal('30.00'),
+                                                                   Decimal('0.00'))
+    assert fork.pending(fork2) == [] and len(logbook.pending(acc2)) == 1
+    assert fork.transactions()[1].incoming().recorded() == date(2015, 3, 3)
+    assert logbook.transactions()[1].incoming().recorded() is None
+
+    logbook.pending(acc1)[0].record(date(2015, 3, 4))
+    assert fork.transactions()[1].outgoing().recorded() is None
+    assert fork.verify(processes=1) == {} and logbook.verify(processes=1) == {}
+
+    again = fork.fork()
+    again1, again2 = again.accounts()
+    assert again.transactions()._base is logbook.transactions()
+    assert again.transactions()[1].incoming().recorded() == date(2015, 3, 3)
+    assert again.transactions()[1].incoming().account() is again2
+    assert [operation.account() for operation in again.pending(again1)] == [again1]
+    again.pending(again1)[0].record(date(2015, 3, 5))
+    assert fork.transactions()[1].outgoing().recorded() is None
+    assert again.verify(processes=1) == {} and fork.verify(processes=1) == {}
+
+    loaded = pickle.loads(pickle.dumps(fork))
+    loaded1, loaded2 = loaded.accounts()
+    assert loaded.transactions()[1].outgoing() is loaded.pending(loaded1)[0]
+    assert loaded.transactions()[1].incoming().account() is loaded2
+    assert loaded.verify(processes=1) == {}
+
+
+def test_fork_shares_history():
+    """
+    Forks share the history instead of copying it, also when forked again
+    """
+    logbook = Logbook()
+    fork = get_forked_logbook(logbook)
+    account = logbook.accounts()[0]
+    assert isinstance(account._history, LayeredIndex)
+    shared = account._history._base
+    assert fork.accounts()[0]._history._base is shared
+
+    forks = [logbook.fork() for _ in range(20)] + [fork.fork() for _ in range(20)]
+    for other in forks:
+        assert other.accounts()[0]._history._base is shared
+    assert fork.fork().transactions()._base is logbook.transactions()
+
+    for _ in range(LayeredIndex.MAX_DEPTH + 2):
+        fork.deposit(fork.accounts()[0], Decimal('1.00'), date(2015, 1, 1))
+        fork = fork.fork()
+    assert fork.accounts()[0]._history._depth <= LayeredIndex.MAX_DEPTH
+    assert fork.accounts()[0].balance_at(date(2015, 1, 31)) == Decimal('110.00')
+
+
+def test_snapshot():
+    """
+    A snapshot keeps the balances of the moment, and cannot be changed
+    """
+    logbook = Logbook()
+    get_forked_logbook(logbook)
+    snapshot = logbook.snapshot()
+    logbook.deposit(logbook.accounts()[0], Decimal('5.00'), date(2015, 1, 1))
+    assert snapshot.accounts()[0].balance() == Decimal('50.00')
+    with pytest.raises(ValueError):
+        snapshot.bill(snapshot.accounts()[0], Decimal('1.00'), date(2015, 1, 1))
+    with pytest.raises(ValueError):
+        snapshot.enter_many([Bill(snapshot.accounts()[0], Decimal('1.00'), date(2015, 1, 1))])
+    assert snapshot.accounts()[0].balance() == Decimal('50.00')
+    assert len(snapshot.transactions()) == 2
+
+
+def test_what_if_scenarios():
+    """
+    Scenarios forecast on forks do not affect each other
+    """
+    logbook = Logbook()
+    get_forked_logbook(logbook)
+    results = []
+    for rent in (Decimal('10.00'), Decimal('40.00')):
+        scenario = logbook.fork()
+        checking = scenario.accounts()[0]
+        plan = PlannedBill(checking, rent, Monthly(date(2015, 4, 1)))
+        scenario.enter_many(plan.occurrences(date(2015, 4, 1), date(2015, 5, 31)))
+        forecast = Forecast(scenario, [], date(2015, 4, 1), date(2015, 6, 30))
+        results.append(forecast.first_below(checking, Decimal('0.00')))
+    assert results == [None, date(2015, 5, 1)]
+    assert logbook.accounts()[0].balance() == Decimal('50.00')
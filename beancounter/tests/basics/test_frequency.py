@@ -1,5 +1,7 @@
-from beancounter.basics.frequency import Daily
-from datetime import date
+from beancounter.basics.frequency import Daily, Weekly, Monthly, Yearly, Once
+from itertools import islice, takewhile
+from datetime import date, timedelta
+import pytest
 
 
 def test_daily_constructor():
@@ -36,3 +38,89 @@ def test_daily():
 
     assert next(daily_itr) == date(2015, 1, 1)
     assert next(daily_itr) == date(2015, 1, 4)
+
+
+def test_invalid_step():
+    """
+    Frequencies need a positive step
+    """
+    with pytest.raises(ValueError):
+        Daily(date(2015, 1, 1), 0)
+
+
+def test_other_strings():
+    """
+    str() and repr() for other frequencies follow Daily
+    """
+    monthly = Monthly(date(2015, 1, 31), 3)
+    assert str(monthly) == "Monthly(step 3 from 2015-01-31)"
+    assert repr(Weekly(date(2015, 2, 2))) == "Weekly(start=datetime.date(2015, 2, 2), step=1)"
+
+
+def test_weekly():
+    """
+    Weekly happens every n weeks
+    """
+    weekly = Weekly(date(2015, 1, 1), 2)
+    assert list(islice(weekly, 3)) == [date(2015, 1, 1), date(2015, 1, 15), date(2015, 1, 29)]
+
+
+def test_monthly_clamping():
+    """
+    Monthly falls on the last day of shorter months, without drifting
+    """
+    monthly = Monthly(date(2015, 12, 31))
+    assert list(islice(monthly, 4)) == [date(2015, 12, 31), date(2016, 1, 31),
+                                        date(2016, 2, 29), date(2016, 3, 31)]
+
+
+def test_yearly_leap_day():
+    """
+    Yearly from February 29 falls on February 28 in common years
+    """
+    yearly = Yearly(date(2016, 2, 29))
+    assert list(islice(yearly, 5)) == [date(2016, 2, 29), date(2017, 2, 28), date(2018, 2, 28),
+                                       date(2019, 2, 28), date(2020, 2, 29)]
+
+
+@pytest.mark.parametrize('frequency', [Daily(date(2015, 1, 1), 3),
+                                       Weekly(date(2015, 1, 7)),
+                                       Monthly(date(2015, 1, 31), 2),
+                                       Yearly(date(2016, 2, 29))])
+def test_between_matches_iteration(frequency):
+    """
+    Occurrences in a range match iterating the frequency
+    """
+    occurrences = list(takewhile(lambda d: d < date(2018, 1, 1), frequency))
+    start = date(2014, 12, 1)
+    for offset in range(0, 600, 17):
+        for length in (0, 1, 30, 400):
+            first = start + timedelta(days=offset)
+            last = first + timedelta(days=length)
+            expected = [d for d in occurrences if first <= d <= last]
+            assert frequency.between(first, last) == expected
+            assert frequency.count_between(first, last) == len(expected)
+    assert frequency.between(date(2015, 6, 1), date(2015, 5, 1)) == []
+    assert frequency.count_between(date(2015, 6, 1), date(2015, 5, 1)) == 0
+
+
+def test_daily_ordinals_range():
+    """
+    Daily expands a range into a range of ordinals, without iterating
+    """
+    daily = Daily(date(2000, 1, 1))
+    ordinals = daily.ordinals_between(date(2000, 1, 1), date(2029, 12, 31))
+    assert isinstance(ordinals, range)
+    assert len(ordinals) == daily.count_between(date(2000, 1, 1), date(2029, 12, 31)) == 10958
+    assert ordinals[-1] == date(2029, 12, 31).toordinal()
+
+
+def test_once():
+    """
+    Once happens only on its start date
+    """
+    once = Once(date(2015, 3, 1))
+    assert list(once) == [date(2015, 3, 1)]
+    assert str(once) == "Once(2015-03-01)"
+    assert once.between(date(2015, 1, 1), date(2015, 12, 31)) == [date(2015, 3, 1)]
+    assert once.count_between(date(2015, 3, 2), date(2015, 12, 31)) == 0
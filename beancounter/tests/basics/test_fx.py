@@ -0,0 +1,61 @@
+from beancounter import RateTable, Money
+from decimal import Decimal
+from datetime import date
+import pytest
+
+
+def get_rate_table(tmp_path):
+    """
+    Helper method, loads a RateTable with EUR as base currency from a CSV file.
+    """
+    path = tmp_path / 'rates.csv'
+    path.write_text('date,currency,rate\n'
+                    '2015-01-01,USD,0.90\n'
+                    '2015-02-01,USD,0.95\n'
+                    '2015-01-01,CZK,0.037\n')
+    return RateTable.load(str(path), 'EUR')
+
+
+def test_rate_lookup(tmp_path):
+    """
+    The rate on a day is the latest one on or before it
+    """
+    rates = get_rate_table(tmp_path)
+    assert rates.base() == 'EUR'
+    assert sorted(rates.currencies()) == ['CZK', 'USD']
+    assert rates.rate('EUR', date(2000, 1, 1)) == Decimal(1)
+    assert rates.rate('USD', date(2015, 1, 1)) == Decimal('0.90')
+    assert rates.rate('USD', date(2015, 1, 31)) == Decimal('0.90')
+    assert rates.rate('USD', date(2016, 1, 1)) == Decimal('0.95')
+
+    with pytest.raises(ValueError):
+        rates.rate('USD', date(2014, 12, 31))
+    with pytest.raises(ValueError):
+        rates.rate('GBP', date(2015, 1, 1))
+
+
+def test_rate_cache(tmp_path):
+    """
+    Lookups are cached, and adding a rate invalidates the cache
+    """
+    rates = get_rate_table(tmp_path)
+    for _ in range(3):
+        rates.rate('USD', date(2015, 1, 15))
+    assert rates._rate.cache_info().hits == 2
+
+    rates.add('USD', date(2015, 1, 10), Decimal('0.92'))
+    assert rates.rate('USD', date(2015, 1, 15)) == Decimal('0.92')
+    rates.add('USD', date(2015, 1, 10), Decimal('0.93'))
+    assert rates.rate('USD', date(2015, 1, 15)) == Decimal('0.93')
+
+
+def test_convert(tmp_path):
+    """
+    Money converts through the base currency, rounded to cents
+    """
+    rates = get_rate_table(tmp_path)
+    day = date(2015, 1, 15)
+    assert rates.convert(Money('10.00', 'USD'), day) == Money('9.00', 'EUR')
+    assert rates.convert(Money('10.00', 'EUR'), day, 'USD') == Money('11.11', 'USD')
+    assert rates.convert(Money('100.00', 'USD'), day, 'CZK') == Money('2432.43', 'CZK')
+    assert rates.convert(Money('1.00'), day) == Money('1.00', 'EUR')
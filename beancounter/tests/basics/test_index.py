@@ -0,0 +1,168 @@
+from beancounter.basics.index import DateIndex, PendingIndex, LayeredIndex, FenwickTree, \
+    fork_index
+from beancounter import Account, Bill
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+
+def test_empty_index():
+    """
+    Empty DateIndex totals to zero
+    """
+    index = DateIndex()
+    assert len(index) == 0
+    assert index.total_until(date(2015, 1, 1)) == 0
+
+
+def test_same_date_aggregated():
+    """
+    Amounts added on the same date are aggregated
+    """
+    index = DateIndex()
+    index.add(date(2015, 1, 1), Decimal('10.00'))
+    index.add(date(2015, 1, 1), Decimal('2.50'))
+    assert len(index) == 1
+    assert index.total_until(date(2014, 12, 31)) == 0
+    assert index.total_until(date(2015, 1, 1)) == Decimal('12.50')
+
+
+def test_matches_full_scan():
+    """
+    Totals match a full scan, with dates added in random (backdated) order
+    """
+    rnd = random.Random(7)
+    start = date(2010, 1, 1)
+    index = DateIndex(step=4)
+    entries = []
+    for _ in range(300):
+        day = start + timedelta(days=rnd.randrange(200))
+        amount = Decimal(rnd.randrange(-5000, 5000)).scaleb(-2)
+        index.add(day, amount)
+        entries.append((day, amount))
+
+        probe = start + timedelta(days=rnd.randrange(-5, 205))
+        assert index.total_until(probe) == sum(amt for d, amt in entries if d <= probe)
+
+    for offset in range(-1, 201):
+        probe = start + timedelta(days=offset)
+        assert index.total_until(probe) == sum(amt for d, amt in entries if d <= probe)
+
+
+def test_equality():
+    """
+    Indexes with the same entries are equal, regardless of insertion order
+    """
+    index1 = DateIndex()
+    index2 = DateIndex()
+    index1.add(date(2015, 1, 1), 1)
+    index1.add(date(2015, 1, 2), 2)
+    index2.add(date(2015, 1, 2), 2)
+    index2.add(date(2015, 1, 1), 1)
+    assert index1 == index2
+
+
+def test_from_items():
+    """
+    An index built from items answers the same as one built by adding them
+    """
+    rnd = random.Random(11)
+    index = DateIndex(step=3)
+    start = date(2012, 1, 1)
+    for _ in range(50):
+        index.add(start + timedelta(days=rnd.randrange(60)), rnd.randrange(-100, 100))
+
+    rebuilt = DateIndex.from_items(index.items(), step=3)
+    assert rebuilt == index
+    assert rebuilt._checkpoints == index._checkpoints
+    rebuilt.add(start, 5)
+    index.add(start, 5)
+    for offset in range(-1, 61):
+        probe = start + timedelta(days=offset)
+        assert rebuilt.total_until(probe) == index.total_until(probe)
+
+
+def test_items_between():
+    """
+    items() can be limited to a date range
+    """
+    index = DateIndex()
+    for day in (3, 1, 7, 5):
+        index.add(date(2015, 1, day), Decimal(day))
+    assert index.items(date(2015, 1, 2), date(2015, 1, 5)) == [
+        (date(2015, 1, 3).toordinal(), Decimal(3)), (date(2015, 1, 5).toordinal(), Decimal(5))]
+    assert len(index.items(end=date(2015, 1, 6))) == 3
+    assert len(index.items(start=date(2015, 1, 6))) == 1
+
+
+def test_pending_index():
+    """
+    PendingIndex keeps pending operations in entry order, with their total and ages
+    """
+    account = Account('test account')
+    bills = [Bill(account, Decimal(day), date(2015, 1, day)) for day in (20, 1, 10)]
+    index = PendingIndex()
+    for bill in bills:
+        index.add(bill.operations()[0])
+    index.discard(bills[2].operations()[0])
+    index.discard(bills[2].operations()[0])
+
+    assert list(index) == [bills[0].operations()[0], bills[1].operations()[0]]
+    assert index.total() == Decimal(-21)
+    assert index.aging(date(2015, 2, 5), limits=(30,)) == [Decimal(-20), Decimal(-1)]
+    assert index.aging(date(2015, 1, 1), limits=(30,)) == [Decimal(-21), 0]
+
+    copy = index.copy()
+    copy.discard(bills[0].operations()[0])
+    assert list(copy) == [bills[1].operations()[0]]
+    assert copy.total() == Decimal(-1)
+    assert index.total() == Decimal(-21)
+
+
+def test_layered_index():
+    """
+    Forked indexes share their base, and each layer only sees its own additions
+    """
+    random.seed(20)
+    index = DateIndex(step=4)
+    expected = {}
+    for _ in range(50):
+        day = date(2015, 1, 1) + timedelta(days=random.randrange(60))
+        amount = Decimal(random.randint(-1000, 1000))
+        index.add(day, amount)
+        expected[day] = expected.get(day, 0) + amount
+
+    original = DateIndex.from_items(index.items())
+    first, second = fork_index(index)
+    assert first._base is second._base is index
+    first.add(date(2015, 1, 5), Decimal(7))
+    first.add(date(2014, 12, 1), Decimal(1))
+    second.add(date(2015, 3, 31), Decimal(3))
+
+    assert index == original
+    assert LayeredIndex(original) == original
+    assert first != second
+    for day in (date(2014, 12, 31), date(2015, 1, 5), date(2015, 2, 1), date(2015, 3, 31)):
+        total = original.total_until(day)
+        assert first.total_until(day) == total + (7 if day >= date(2015, 1, 5) else 0) + 1
+        assert second.total_until(day) == total + (3 if day >= date(2015, 3, 31) else 0)
+    assert first.items(end=date(2014, 12, 31)) == [(date(2014, 12, 1).toordinal(), Decimal(1))]
+    assert len(first) == len(original) + (date(2015, 1, 5) not in expected) + 1
+
+
+def test_fenwick_tree():
+    """
+    FenwickTree prefix totals match a full scan, as it grows
+    """
+    rnd = random.Random(5)
+    tree = FenwickTree()
+    amounts = {}
+    for _ in range(500):
+        position = rnd.randrange(300)
+        amount = rnd.randrange(-100, 100)
+        tree.add(position, amount)
+        amounts[position] = amounts.get(position, 0) + amount
+        probe = rnd.randrange(-2, 310)
+        assert tree.total_until(probe) == sum(a for p, a in amounts.items() if p <= probe)
+    assert tree.total_between(10, 20) == sum(a for p, a in amounts.items() if 10 <= p <= 20)
+    assert tree.total_between(20, 10) == 0
@@ -0,0 +1,186 @@
+from beancounter import Logbook, ConcurrentLogbook, ColumnarStore, LogbookSubscriber, \
+    Instrumentation, Bill, Deposit, Transfer
+from beancounter.basics.instrumentation import Histogram
+from beancounter.basics.transaction import DepositOperation, TransferIn
+from decimal import Decimal
+from datetime import date
+import pytest
+
+
+class Clock:
+    """
+    Helper class, a clock advancing by a second every time it is read.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+class Events(LogbookSubscriber):
+    """
+    Helper class, logs notifications along with the account balance at the time.
+    """
+
+    def __init__(self, account):
+        self.account = account
+        self.events = []
+
+    def entering(self, transaction):
+        self.events.append(('entering', self.account.balance()))
+
+    def entered(self, transaction):
+        self.events.append(('entered', self.account.balance()))
+
+    def recording(self, operation):
+        assert operation.recorded() is None
+        self.events.append(('recording', self.account.recorded_balance()))
+
+    def recorded(self, operation):
+        self.events.append(('recorded', self.account.recorded_balance()))
+
+
+@pytest.mark.parametrize('logbook', [Logbook(), ConcurrentLogbook()])
+def test_hooks(logbook):
+    """
+    Subscribers are notified before and after changes, one by one or in batches
+    """
+    acc = logbook.add_account('checking')
+    events = Events(acc)
+    logbook.subscribe(events)
+    logbook.deposit(acc, Decimal('10.00'), date(2015, 1, 1)).operations()[0].record(
+        date(2015, 1, 2))
+    assert events.events == [('entering', Decimal('0.00')), ('entered', Decimal('10.00')),
+                             ('recording', Decimal('0.00')), ('recorded', Decimal('10.00'))]
+
+    events.events = []
+    bills = [Bill(acc, Decimal('1.00'), date(2015, 1, 3)) for _ in range(2)]
+    logbook.enter_many(bills)
+    logbook.record_many((bill.operations()[0], date(2015, 1, 4)) for bill in bills)
+    assert events.events == [('entering', Decimal('10.00'))] * 2 + \
+        [('entered', Decimal('8.00'))] * 2 + [('recording', Decimal('10.00'))] * 2 + \
+        [('recorded', Decimal('8.00'))] * 2
+
+
+class Refusing(LogbookSubscriber):
+    """
+    Helper class, refuses to let operations be recorded.
+    """
+
+    def recording(self, operation):
+        raise ValueError('Refused.')
+
+
+@pytest.mark.parametrize('logbook', [Logbook(), ConcurrentLogbook()])
+def test_refused_recording(logbook):
+    """
+    A subscriber raising before an operation gets recorded leaves it unrecorded
+    """
+    acc = logbook.add_account('checking')
+    operation = logbook.deposit(acc, Decimal('10.00'), date(2015, 1, 1)).operations()[0]
+    logbook.subscribe(Refusing())
+    for record in (lambda: operation.record(date(2015, 1, 2)),
+                   lambda: logbook.record_many([(operation, date(2015, 1, 2))])):
+        with pytest.raises(ValueError):
+            record()
+        assert operation.recorded() is None
+        assert acc.recorded_balance() == Decimal('0.00')
+        assert logbook.pending(acc) == [operation]
+
+
+def test_invalid_batch():
+    """
+    Subscribers are not notified of batches that are rejected
+    """
+    logbook = Logbook()
+    acc = logbook.add_account('checking')
+    events = Events(acc)
+    logbook.subscribe(events)
+    with pytest.raises(ValueError):
+        logbook.enter_many([Bill(acc, Decimal('1.00'), date(2015, 1, 3)), Bill(acc, 1, None)])
+    assert events.events == []
+
+
+@pytest.mark.parametrize('logbook_class', [Logbook, ConcurrentLogbook])
+def test_rejected_by_store(logbook_class):
+    """
+    Transactions the store rejects after subscribers heard of them leave nothing behind
+    """
+    logbook = logbook_class(store=ColumnarStore())
+    acc1 = logbook.add_account('checking')
+    acc2 = logbook.add_account('savings')
+    instrumentation = Instrumentation(clock=Clock())
+    logbook.subscribe(instrumentation)
+    transfer = Transfer(acc1, acc2, Decimal('1.00'), date(2015, 1, 3),
+                        amount_in=Decimal('0.001'))
+    for enter in (logbook.enter, lambda transaction: logbook.enter_many([transaction])):
+        with pytest.raises(ValueError):
+            enter(transfer)
+    assert instrumentation._started == {}
+    assert instrumentation.entered_count() == 0
+
+
+def test_histogram():
+    """
+    Values are counted in the first bucket they fit in, or the last one
+    """
+    histogram = Histogram((1, 10))
+    for value in (0.5, 1, 2, 10, 11):
+        histogram.add(value)
+    assert histogram.as_dict() == {'count': 5, 'seconds': 24.5, 'buckets': [2, 2, 1]}
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore])
+def test_instrumentation(store):
+    """
+    Counters and latencies are kept by transaction and operation type
+    """
+    logbook = Logbook(store() if store else None)
+    instrumentation = Instrumentation(clock=Clock(), bounds=(1.5, 10))
+    logbook.subscribe(instrumentation)
+    acc1 = logbook.add_account('checking')
+    acc2 = logbook.add_account('savings')
+    logbook.deposit(acc1, Decimal('10.00'), date(2015, 1, 1))
+    logbook.transfer(acc1, acc2, Decimal('5.00'), date(2015, 1, 2))
+    logbook.enter_many([Deposit(acc2, Decimal('1.00'), date(2015, 1, 3)) for _ in range(3)])
+    logbook.transactions()[1].incoming().record(date(2015, 1, 3))
+
+    assert instrumentation.entered_count() == 5
+    assert instrumentation.entered_count(Deposit) == 4
+    assert instrumentation.entered_count(Bill) == 0
+    assert instrumentation.recorded_count(TransferIn) == 1
+    assert instrumentation.recorded_count(DepositOperation) == 0
+
+    metrics = instrumentation.as_dict()
+    assert metrics['accounts_added'] == 2
+    assert metrics['latency_bounds'] == [1.5, 10]
+    # Each entered transaction reads the clock twice; the batch reads it 3 times before and
+    # 3 times after, so its deposits take 3 seconds each.
+    assert metrics['entered'] == {
+        'Deposit': {'count': 4, 'seconds': 10.0, 'buckets': [1, 3, 0]},
+        'Transfer': {'count': 1, 'seconds': 1.0, 'buckets': [1, 0, 0]},
+    }
+    assert metrics['recorded'] == {'TransferIn': {'count': 1, 'seconds': 1.0,
+                                                  'buckets': [1, 0, 0]}}
+
+    instrumentation.reset()
+    assert instrumentation.as_dict()['entered'] == {}
+
+
+def test_unsubscribed():
+    """
+    An unsubscribed Instrumentation stops counting
+    """
+    logbook = Logbook()
+    instrumentation = Instrumentation()
+    logbook.subscribe(instrumentation)
+    acc = logbook.add_account('checking')
+    logbook.enter(Transfer(acc, logbook.add_account('savings'), Decimal('1.00'),
+                           date(2015, 1, 1)))
+    logbook.unsubscribe(instrumentation)
+    logbook.bill(acc, Decimal('1.00'), date(2015, 1, 1))
+    assert instrumentation.entered_count() == 1
+    assert instrumentation.as_dict()['entered']['Transfer']['seconds'] >= 0
@@ -0,0 +1,63 @@
+from beancounter import Money
+from decimal import Decimal
+import pytest
+import pickle
+
+
+def test_creation():
+    """
+    Money keeps an integer number of minor units and a currency.
+    """
+    money = Money(Decimal('12.34'), 'EUR')
+    assert money.units() == 1234
+    assert money.currency() == 'EUR'
+    assert money.decimal() == Decimal('12.34')
+    assert Money('5', 'EUR') == Money.from_units(500, 'EUR')
+    assert str(money) == '12.34 EUR'
+    assert repr(money) == "Money('12.34', 'EUR')"
+
+    with pytest.raises(ValueError):
+        Money(Decimal('0.001'))
+
+
+def test_arithmetic():
+    a = Money('10.50', 'EUR')
+    b = Money('0.25', 'EUR')
+    assert a + b == Money('10.75', 'EUR')
+    assert a - b == Money('10.25', 'EUR')
+    assert -a == Money('-10.50', 'EUR')
+    assert abs(-a) == a
+    assert a * 3 == 3 * a == Money('31.50', 'EUR')
+    assert sum([a, b]) == Money('10.75', 'EUR')
+    assert not Money(0, 'EUR')
+
+    with pytest.raises(ValueError):
+        a + Money('1.00', 'USD')
+    with pytest.raises(TypeError):
+        a * Decimal('1.5')
+
+
+def test_decimal_interop():
+    """
+    Money combines and compares with Decimals of the same value, losslessly.
+    """
+    money = Money('10.50', 'EUR')
+    assert money == Decimal('10.50')
+    assert hash(money) == hash(Decimal('10.5'))
+    assert money + Decimal('1.25') == Money('11.75', 'EUR')
+    assert Decimal('1.25') + money == Money('11.75', 'EUR')
+    assert Decimal('20.00') - money == Money('9.50', 'EUR')
+    assert Decimal('1.00') < money < 11
+    assert Money('1.00', 'EUR') < money
+    assert money != Money('10.50', 'USD')
+
+    with pytest.raises(ValueError):
+        money + Decimal('0.001')
+    with pytest.raises(ValueError):
+        Money('1.00', 'EUR') < Money('2.00', 'USD')
+
+
+def test_pickling():
+    money = Money('10.50', 'EUR')
+    assert pickle.loads(pickle.dumps(money)) == money
+    assert not hasattr(money, '__dict__')
@@ -0,0 +1,107 @@
+from beancounter import Logbook, ColumnarStore, Deposit, Bill, Transfer
+from beancounter.basics.query import _merge
+from array import array
+from decimal import Decimal
+from datetime import date, timedelta
+import random
+import pytest
+
+
+def get_query_logbook(store=None, count=300):
+    """
+    Helper method, creates a Logbook with transactions entered out of date order.
+    """
+    random.seed(16)
+    logbook = Logbook(store=store)
+    accounts = [logbook.add_account('account {i}'.format(i=i)) for i in range(4)]
+    rows = []
+    for _ in range(count):
+        day = date(2015, 1, 1) + timedelta(days=random.randrange(90))
+        amount = Decimal(random.randint(1, 100000)).scaleb(-2)
+        kind = random.choice(('deposit', 'bill', 'transfer'))
+        if kind == 'transfer':
+            rows.append((kind, random.choice(accounts), random.choice(accounts), amount, day))
+        else:
+            rows.append((kind, random.choice(accounts), amount, day))
+    logbook.enter_rows(rows[:count // 2])
+    for row in rows[count // 2:]:
+        logbook.enter_rows([row])
+    for transaction in list(logbook.transactions())[::3]:
+        transaction.operations()[0].record(transaction.date())
+    return logbook, accounts
+
+
+def scan(logbook, predicate):
+    """
+    Helper method, the expected result of a query: a filtered scan in date order.
+    """
+    transactions = [t for t in logbook.transactions() if predicate(t)]
+    return sorted(transactions, key=lambda t: t.date())
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_query(store):
+    """
+    Queries return the same transactions as a full scan, in date order
+    """
+    logbook, accounts = get_query_logbook(store)
+    start, end = date(2015, 2, 1), date(2015, 2, 28)
+    account = accounts[1]
+
+    def on_account(t):
+        return any(operation.account() is account for operation in t.operations())
+
+    def recorded(t):
+        return all(operation.recorded() for operation in t.operations())
+
+    assert list(logbook.query()) == scan(logbook, lambda t: True)
+    assert list(logbook.query().between(start, end)) == scan(
+        logbook, lambda t: start <= t.date() <= end)
+    assert list(logbook.query().between(start)) == scan(logbook, lambda t: start <= t.date())
+    assert list(logbook.query().account(account)) == scan(logbook, on_account)
+    assert list(logbook.query().account(account).between(end=end).kind(Bill, Transfer)
+                .amount(minimum=Decimal('500.00'))) == scan(
+        logbook, lambda t: (on_account(t) and t.date() <= end and type(t) is not Deposit and
+                            t.amount() >= Decimal('500.00')))
+    assert list(logbook.query().amount(Decimal('100.00'), Decimal('200.00'))) == scan(
+        logbook, lambda t: Decimal('100.00') <= t.amount() <= Decimal('200.00'))
+    assert list(logbook.query().recorded()) == scan(logbook, recorded)
+    assert list(logbook.query().recorded(False)) == scan(logbook, lambda t: not recorded(t))
+
+
+def test_query_follows_logbook():
+    """
+    Transactions entered after a query was built are found, queries are independent
+    """
+    logbook, accounts = get_query_logbook(count=10)
+    bills = logbook.query().kind(Bill)
+    march = bills.between(date(2015, 3, 1), date(2015, 3, 31))
+    before = len(list(march))
+    bill = logbook.bill(accounts[0], Decimal('1.00'), date(2015, 3, 2))
+    new_account = logbook.add_account('new')
+    deposit = logbook.deposit(new_account, Decimal('1.00'), date(2014, 1, 1))
+
+    assert len(list(march)) == before + 1
+    assert bill in list(march)
+    assert deposit not in list(bills)
+    assert list(logbook.query().account(new_account)) == [deposit]
+    assert list(logbook.query())[0] is deposit
+    assert list(logbook.query().account(logbook.add_account('empty'))) == []
+
+    with pytest.raises(ValueError):
+        logbook.query().between(date(2015, 3, 2), date(2015, 3, 1))
+
+
+def test_merge_keys():
+    """
+    Backdated keys are merged into the sorted keys in place
+    """
+    rnd = random.Random(16)
+    keys = array('q')
+    expected = []
+    for size in (5, 1, 20, 3, 0, 50):
+        added = [rnd.randrange(200) for _ in range(size)]
+        expected = sorted(expected + added)
+        merged = _merge(keys, added)
+        assert merged is keys
+        assert list(keys) == expected
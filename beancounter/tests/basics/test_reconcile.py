@@ -0,0 +1,72 @@
+from beancounter import Logbook, Reconciler
+from beancounter.io import StatementRecord
+from datetime import date
+from decimal import Decimal
+
+
+def get_test_logbook():
+    logbook = Logbook()
+    acc1 = logbook.add_account('test account 1', balance=Decimal('100.00'))
+    acc2 = logbook.add_account('test account 2')
+    return logbook, acc1, acc2
+
+
+def test_reconcile():
+    logbook, acc1, acc2 = get_test_logbook()
+    bill = logbook.bill(acc1, Decimal('10.00'), date(2015, 3, 1))
+    deposit = logbook.deposit(acc1, Decimal('10.00'), date(2015, 3, 1))
+    transfer = logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 5))
+    reconciler = Reconciler(logbook)
+
+    records = [StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 3)),
+               StatementRecord(acc1, Decimal('10.0'), date(2015, 3, 2)),
+               StatementRecord(acc2, Decimal('30.00'), date(2015, 3, 6)),
+               StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 3)),
+               StatementRecord(acc1, Decimal('-30.00'), date(2015, 3, 9))]
+    pairs = reconciler.reconcile(records)
+
+    assert [operation for _, operation in pairs] == [
+        bill.operations()[0], deposit.operations()[0], transfer.incoming(), None, None]
+    assert bill.operations()[0].recorded() == date(2015, 3, 3)
+    assert transfer.incoming().recorded() == date(2015, 3, 6)
+    assert transfer.recorded() is None
+    assert acc1.recorded_balance() == Decimal('100.00')
+    assert acc2.recorded_balance() == Decimal('30.00')
+
+    pairs = reconciler.reconcile([StatementRecord(acc1, Decimal('-30.00'), date(2015, 3, 8))])
+    assert pairs[0][1] is transfer.outgoing()
+    assert transfer.recorded() == date(2015, 3, 8)
+
+
+def test_closest_date():
+    """
+    The operation dated closest to the record wins, the earlier one on a tie.
+    """
+    logbook, acc1, acc2 = get_test_logbook()
+    bills = [logbook.bill(acc1, Decimal('10.00'), date(2015, 3, day)) for day in (1, 2, 4, 6)]
+    reconciler = Reconciler(logbook, window=2)
+
+    assert reconciler.match(StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 5))) is \
+        bills[2].operations()[0]
+    assert reconciler.match(StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 4))) is \
+        bills[1].operations()[0]
+    assert reconciler.match(StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 9))) is None
+
+
+def test_indexes_new_operations():
+    """
+    Operations entered after the reconciler was created are matched; recorded ones are not.
+    """
+    logbook, acc1, acc2 = get_test_logbook()
+    reconciler = Reconciler(logbook)
+    bill = logbook.bill(acc1, Decimal('10.00'), date(2015, 3, 1))
+    recorded = logbook.bill(acc1, Decimal('20.00'), date(2015, 3, 1))
+    recorded.operations()[0].record(date(2015, 3, 2))
+
+    assert reconciler.match(StatementRecord(acc1, Decimal('-20.00'), date(2015, 3, 2))) is None
+    assert reconciler.match(StatementRecord(acc1, Decimal('-10.00'), date(2015, 3, 2))) is \
+        bill.operations()[0]
+
+    reconciler.close()
+    logbook.bill(acc1, Decimal('5.00'), date(2015, 3, 1))
+    assert reconciler.match(StatementRecord(acc1, Decimal('-5.00'), date(2015, 3, 1))) is None
@@ -0,0 +1,80 @@
+from beancounter import Logbook, ColumnarStore, Money, Deposit
+from beancounter.basics import replay
+from beancounter.io.sqlite import SQLiteStore
+from .test_query import get_query_logbook
+from decimal import Decimal
+from datetime import date
+import pytest
+
+
+@pytest.mark.parametrize('processes', [1, 3])
+@pytest.mark.parametrize('columnar', [False, True])
+def test_replay(columnar, processes):
+    """
+    A replay, in one or several processes, gives the accounts' balances
+    """
+    logbook, accounts = get_query_logbook(ColumnarStore() if columnar else None)
+    balances = logbook.replay(processes)
+    assert balances == {account: (account.balance(), account.recorded_balance())
+                        for account in accounts}
+    assert logbook.verify(processes) == {}
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_verify(processes):
+    """
+    Accounts whose balances do not match the replay are reported, with the replayed ones
+    """
+    logbook = Logbook()
+    acc1 = logbook.add_account('eur', balance=Decimal('10.00'), currency='EUR')
+    acc2 = logbook.add_account('plain', balance=Decimal('5.00'))
+    for _ in range(3):
+        logbook.transfer(acc1, acc2, Money('1.00', 'EUR'), date(2015, 1, 1),
+                         amount_in=Decimal('1.00')).incoming() \
+            .record(date(2015, 1, 2))
+    logbook.enter(Deposit(logbook.add_account('other'), Decimal('1.00'), date(2015, 1, 1)))
+    assert logbook.verify(processes) == {}
+
+    acc2._balance += Decimal('0.01')
+    acc1._recorded_balance -= 1
+    assert logbook.verify(processes) == {
+        acc1: (Money('7.00', 'EUR'), Money('10.00', 'EUR')),
+        acc2: (Decimal('8.00'), Decimal('8.00'))}
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+@pytest.mark.parametrize('columnar', [False, True])
+def test_replay_empty(columnar, processes):
+    """
+    A Logbook without transactions replays to the initial balances
+    """
+    logbook = Logbook(ColumnarStore() if columnar else None)
+    acc = logbook.add_account('checking', balance=Decimal('10.00'))
+    assert logbook.replay(processes) == {acc: (Decimal('10.00'), Decimal('10.00'))}
+
+
+def test_replay_batches(tmp_path, monkeypatch):
+    """
+    Transactions kept in a database are read in batches
+    """
+    monkeypatch.setattr(replay, 'BATCH_SIZE', 2)
+    store = SQLiteStore(str(tmp_path / 'ledger.db'))
+    logbook = store.open()
+    slices = []
+    getitem = SQLiteStore.__getitem__
+
+    def logged(self, index):
+        if isinstance(index, slice):
+            slices.append((index.start, index.stop))
+        return getitem(self, index)
+    monkeypatch.setattr(SQLiteStore, '__getitem__', logged)
+
+    acc = logbook.add_account('checking')
+    for day in range(1, 6):
+        logbook.deposit(acc, Decimal('1.00'), date(2015, 1, day)).operations()[0].record(
+            date(2015, 1, day))
+    logbook.bill(acc, Decimal('0.50'), date(2015, 1, 6))
+    assert logbook.verify(processes=4) == {}
+    assert logbook.replay()[acc] == (Decimal('4.50'), Decimal('5.00'))
+    assert slices[:3] == [(0, 2), (2, 4), (4, 6)]
+    store.close()
@@ -0,0 +1,239 @@
+from beancounter import Logbook, ColumnarStore, Deposit, Bill, Transfer, CategoryTree
+from beancounter.basics.utils import to_minor, from_minor
+from .test_utils import objects_equal
+from decimal import Decimal
+from datetime import date
+import gc
+import pytest
+import pickle
+import weakref
+
+
+def get_columnar_logbook():
+    """
+    Helper method, creates a Logbook backed by a ColumnarStore with two accounts.
+    """
+    logbook = Logbook(store=ColumnarStore())
+    acc1 = logbook.add_account('acc 1', balance=Decimal('500.00'))
+    acc2 = logbook.add_account('acc 2')
+    return logbook, acc1, acc2
+
+
+@pytest.mark.parametrize('amount,units', [(Decimal('12.21'), 1221),
+                                          (Decimal('-0.05'), -5),
+                                          (Decimal(150.00), 15000),
+                                          (Decimal('0.00'), 0)])
+def test_minor_units(amount, units):
+    """
+    Amounts convert to minor units and back without loss
+    """
+    assert to_minor(amount) == units
+    assert from_minor(units) == amount
+
+
+def test_minor_units_precision():
+    """
+    Amounts with too many decimal places are rejected
+    """
+    with pytest.raises(ValueError):
+        to_minor(Decimal('1.005'))
+
+
+def test_columnar_balances():
+    """
+    Balances are updated the same way as with the default storage
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    logbook.bill(acc1, Decimal('100.00'), date(2015, 1, 2))
+    logbook.deposit(acc2, Decimal('20.50'), date(2015, 1, 3))
+    logbook.transfer(acc1, acc2, Decimal('50.00'), date(2015, 1, 4))
+
+    assert acc1.balance() == Decimal('350.00')
+    assert acc2.balance() == Decimal('70.50')
+    assert len(logbook.transactions()) == 3
+    assert logbook.transactions().operation_count() == 4
+
+
+def test_columnar_views():
+    """
+    Stored transactions are handed out equal to the entered ones
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    entered = date(2015, 2, 1)
+    logbook.bill(acc1, Decimal('100.00'), date(2015, 1, 2), entered)
+    logbook.deposit(acc2, Decimal('20.50'), date(2015, 1, 3), entered)
+    logbook.transfer(acc1, acc2, Decimal('50.00'), date(2015, 1, 4), entered)
+
+    bill, deposit, transfer = logbook.transactions()
+    assert objects_equal(bill, Bill(acc1, Decimal('100.00'), date(2015, 1, 2), entered))
+    assert objects_equal(deposit, Deposit(acc2, Decimal('20.50'), date(2015, 1, 3), entered))
+    assert objects_equal(transfer, Transfer(acc1, acc2, Decimal('50.00'), date(2015, 1, 4),
+                                            entered))
+    assert transfer.outgoing().account() is acc1
+    assert transfer.incoming().account() is acc2
+    assert logbook.transactions()[-1] is transfer
+    assert len(logbook.transactions()[1:]) == 2
+
+
+def test_columnar_recording():
+    """
+    Recording a view writes through to the store
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    transfer = logbook.transfer(acc1, acc2, Decimal('50.00'), date(2015, 1, 4))
+    transfer.outgoing().record(date(2015, 1, 5))
+    del transfer
+
+    transfer = logbook.transactions()[0]
+    assert transfer.outgoing().recorded() == date(2015, 1, 5)
+    assert transfer.incoming().recorded() is None
+    assert acc1.recorded_balance() == Decimal('450.00')
+    with pytest.raises(ValueError):
+        transfer.outgoing().record(date(2015, 1, 6))
+
+
+def test_columnar_rejects_precision():
+    """
+    Amounts that cannot be stored exactly do not leave partial rows behind
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    with pytest.raises(ValueError):
+        logbook.transactions().append(Bill(acc1, Decimal('0.001'), date(2015, 1, 2)))
+    assert len(logbook.transactions()) == 0
+    assert logbook.transactions().operation_count() == 0
+
+
+def test_columnar_pickling():
+    """
+    Logbook with a ColumnarStore can be pickled and unpickled.
+    """
+    logbook1, acc1, acc2 = get_columnar_logbook()
+    logbook1.bill(acc1, Decimal('100.00'), date(2015, 1, 2)).operations()[0].record(
+        date(2015, 1, 3))
+
+    logbook2 = pickle.loads(pickle.dumps(logbook1))
+    bill = logbook2.transactions()[0]
+    assert bill.operations()[0].recorded() == date(2015, 1, 3)
+    assert bill.operations()[0].account() is logbook2.accounts()[0]
+    assert logbook2.accounts()[0].recorded_balance() == Decimal('400.00')
+
+
+def test_pickled_pending_write_through():
+    """
+    Pending operations of an unpickled Logbook are still bound to their store rows.
+    """
+    logbook1, acc1, acc2 = get_columnar_logbook()
+    logbook1.bill(acc1, Decimal('100.00'), date(2015, 1, 2))
+
+    logbook2 = pickle.loads(pickle.dumps(logbook1))
+    operation, = logbook2.pending(logbook2.accounts()[0])
+    assert operation is logbook2.transactions()[0].operations()[0]
+    operation.record(date(2015, 1, 3))
+    assert logbook2.transactions().columns()['_recorded'][0] == date(2015, 1, 3).toordinal()
+
+
+def test_columnar_enter_many():
+    """
+    A batch that cannot be stored exactly leaves the store and balances untouched
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    logbook.enter_rows([('bill', acc1, Decimal('10.00'), date(2015, 1, 2)),
+                        ('transfer', acc1, acc2, Decimal('5.00'), date(2015, 1, 3))])
+    assert len(logbook.transactions()) == 2
+    assert acc1.balance() == Decimal('485.00')
+
+    with pytest.raises(ValueError):
+        logbook.enter_rows([('bill', acc1, Decimal('10.00'), date(2015, 1, 2)),
+                            ('bill', acc1, Decimal('0.001'), date(2015, 1, 2))])
+    assert len(logbook.transactions()) == 2
+    assert acc1.balance() == Decimal('485.00')
+
+
+def test_columnar_rows():
+    """
+    Operations are located by the store that stored them, without it holding them
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    store = logbook.transactions()
+    bill = logbook.bill(acc1, Decimal('10.00'), date(2015, 1, 2))
+    transfer = logbook.transfer(acc1, acc2, Decimal('5.00'), date(2015, 1, 3))
+    assert store[1] is transfer
+    assert store.locate(transfer.incoming()) == (1, 1)
+    assert store.locate(Bill(acc1, Decimal('10.00'), date(2015, 1, 2)).operations()[0]) is None
+    assert ColumnarStore().locate(bill.operations()[0]) is None
+
+    bill.operations()[0].record(date(2015, 1, 4))
+    reference = weakref.ref(bill)
+    del bill
+    gc.collect()
+    assert reference() is None
+    assert store.locate(store[0].operations()[0]) == (0, 0)
+
+
+def test_columnar_rejects_transfer():
+    """
+    A transfer rejected by its second operation leaves neither rows nor accounts behind
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    store = logbook.transactions()
+    logbook.bill(acc1, Decimal('10.00'), date(2015, 1, 2))
+    other = Logbook().add_account('other')
+    with pytest.raises(ValueError):
+        store.append(Transfer(acc2, other, Decimal('1.00'), date(2015, 1, 3),
+                              amount_in=Decimal('0.001')))
+    assert (len(store), store.operation_count()) == (1, 1)
+    assert store.accounts() == [acc1]
+    assert store.locate(logbook.bill(acc1, Decimal('1.00'), date(2015, 1, 4)).operations()[0]) \
+        == (1, 0)
+
+
+def test_columnar_pending():
+    """
+    Pending operations are read from the store rows, without the store holding them
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    logbook.bill(acc1, Decimal('10.00'), date(2015, 1, 2))
+    transfer = logbook.transfer(acc1, acc2, Decimal('5.00'), date(2015, 3, 1))
+    recorded = Deposit(acc1, Decimal('1.00'), date(2015, 3, 2))
+    recorded.operations()[0]._recorded = date(2015, 3, 2)
+    logbook.enter(recorded)
+    logbook.enter_many([Deposit(acc2, Decimal('2.00'), date(2015, 3, 3))])
+    transfer.incoming().record(date(2015, 3, 4))
+    references = [weakref.ref(transaction) for transaction in logbook.transactions()]
+    del transfer, recorded
+    gc.collect()
+    assert [reference() for reference in references] == [None] * 4
+
+    bill, transfer = [operation.transaction() for operation in logbook.pending(acc1)]
+    assert (bill.amount(), transfer.amount()) == (Decimal('10.00'), Decimal('5.00'))
+    assert [operation.date() for operation in logbook.pending(acc2)] == [date(2015, 3, 3)]
+    assert logbook.pending_total(acc1) == Decimal('-15.00')
+    assert logbook.pending_aging(acc1, date(2015, 3, 10)) == [
+        Decimal('-5.00'), Decimal('0.00'), Decimal('-10.00'), Decimal('0.00')]
+
+    transfer.outgoing().record(date(2015, 3, 5))
+    assert logbook.pending(acc1) == [bill.operations()[0]]
+    assert logbook.pending_total(acc1) == Decimal('-10.00')
+    assert logbook.pending_total(logbook.add_account('empty')) == Decimal('0.00')
+
+
+def test_columnar_categories():
+    """
+    Categories are stored as paths, and re-categorising a stored transaction writes through
+    """
+    logbook, acc1, acc2 = get_columnar_logbook()
+    tree = CategoryTree()
+    logbook.bill(acc1, Decimal('10.00'), date(2015, 1, 2), category=tree.category('Food'))
+    logbook.enter_many([Deposit(acc1, Decimal('1.00'), date(2015, 1, 3)),
+                        Bill(acc2, Decimal('2.00'), date(2015, 1, 4), category='Food')])
+    gc.collect()
+    store = logbook.transactions()
+    assert [transaction.category() for transaction in store] == ['Food', None, 'Food']
+    assert store.categories() == ['Food']
+
+    store[1].categorize('Housing > Rent')
+    store[0].categorize(None)
+    gc.collect()
+    assert [transaction.category() for transaction in store] == [None, 'Housing > Rent', 'Food']
+    Deposit(acc1, Decimal('1.00'), date(2015, 1, 3)).categorize('Travel')
+    assert store.categories() == ['Food', 'Housing > Rent']
@@ -4,6 +4,7 @@ from beancounter import Bill, Deposit, Transfer
 from decimal import Decimal
 from datetime import date
 import pytest
+import pickle
 
 #
 # # TODO: Test equality of operations from different accounts (after step 2 of refactoring should NOT be equal)
@@ -139,3 +140,32 @@ def test_transfer_side_recording(out_recorded, in_recorded):
 
     assert (tx.recorded() is not None) == (out_recorded is not None and
                                            in_recorded is not None)
+
+
+@pytest.mark.parametrize("cls", [(Bill), (Deposit)])
+def test_transaction_compact(cls):
+    """
+    Transactions and operations are slotted, and pickle with their operations
+    """
+    logbook, acc = get_test_account()
+    tx = cls(acc, Decimal('12.34'), date(2015, 3, 5), date(2015, 3, 2))
+    tx.operations()[0].record(date(2015, 3, 6))
+    assert not hasattr(tx, '__dict__')
+    assert not hasattr(tx.operations()[0], '__dict__')
+    assert tx.operations() == (tx.operations()[0],)
+
+    copy = pickle.loads(pickle.dumps(tx))
+    assert objects_equal(copy, tx)
+    assert objects_equal(copy.operations()[0], tx.operations()[0])
+    assert copy.operations()[0].transaction() is copy
+
+
+def test_transfer_compact():
+    logbook, acc1, acc2 = get_test_accounts()
+    tx = Transfer(acc1, acc2, Decimal('42.21'), date(2015, 3, 5), date(2015, 3, 2))
+    assert not hasattr(tx, '__dict__')
+    assert tx.operations() == (tx.outgoing(), tx.incoming())
+
+    copy = pickle.loads(pickle.dumps(tx))
+    assert objects_equal(copy, tx)
+    assert copy.incoming().balance_change() == Decimal('42.21')
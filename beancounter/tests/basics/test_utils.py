@@ -1,5 +1,7 @@
 from beancounter import Account, Deposit, Bill, Transfer, Logbook
 from beancounter.basics.transaction import DepositOperation, BillOperation, TransferOut, TransferIn
+from decimal import Decimal
+from datetime import date
 
 comp_exclusions = {Logbook: [],
                    Account: [],
@@ -20,14 +22,27 @@ def objects_equal(obj1, obj2):
         return True
 
     if type(obj1) in comp_exclusions:
-        return dicts_equal(obj1.__dict__, obj2.__dict__, exclude=comp_exclusions[type(obj1)])
+        return dicts_equal(attributes(obj1), attributes(obj2),
+                           exclude=comp_exclusions[type(obj1)])
 
-    if type(obj1) is list:
+    if type(obj1) in (list, tuple):
         return lists_equal(obj1, obj2)
 
     return obj1 == obj2
 
 
+def attributes(obj):
+    """
+    Returns a dict of the attributes of an object, both in its __dict__ and in its slots.
+    """
+    values = dict(getattr(obj, '__dict__', {}))
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if name != '__weakref__' and hasattr(obj, name):
+                values[name] = getattr(obj, name)
+    return values
+
+
 def lists_equal(list1, list2):
     """
     Compares two lists, by comparing all their values.
@@ -108,3 +123,20 @@ def test_objs_equal_with_exclusions():
 
     assert objects_equal(EqTestObject(**dict1), EqTestObject(**dict2))
 
+
+
+def test_objs_equal_operations():
+    """
+    Transactions compare the account and recorded date of their operations
+    """
+    logbook = Logbook()
+    acc1 = logbook.add_account('acc 1')
+    acc2 = logbook.add_account('acc 2', balance=Decimal('1.00'))
+    deposit = Deposit(acc1, Decimal('10.00'), date(2015, 1, 1), date(2015, 1, 1))
+    assert objects_equal(deposit, Deposit(acc1, Decimal('10.00'), date(2015, 1, 1),
+                                          date(2015, 1, 1)))
+    assert not objects_equal(deposit, Deposit(acc2, Decimal('10.00'), date(2015, 1, 1),
+                                              date(2015, 1, 1)))
+    recorded = Deposit(acc1, Decimal('10.00'), date(2015, 1, 1), date(2015, 1, 1))
+    recorded.operations()[0]._recorded = date(2015, 1, 2)
+    assert not objects_equal(deposit, recorded)
@@ -0,0 +1,211 @@
+from beancounter import Logbook, ColumnarStore, Bill, Deposit, Money, PlannedBill, CategoryTree, \
+    CategoryTotals
+from beancounter.basics.frequency import Monthly
+from datetime import date, timedelta
+from decimal import Decimal
+import gc
+import random
+import pytest
+
+
+def test_tree():
+    """
+    Categories are added as they are looked up by path
+    """
+    tree = CategoryTree()
+    electricity = tree.category('Housing > Utilities > Electricity')
+    assert electricity.name() == 'Electricity'
+    assert electricity.path() == 'Housing > Utilities > Electricity'
+    assert [category.name() for category in electricity.ancestors()] == [
+        'Electricity', 'Utilities', 'Housing']
+
+    assert tree.category('Housing>Utilities>Electricity') is electricity
+    assert tree.category(electricity) is electricity
+    rent = tree.category('Housing > Rent')
+    assert rent.parent() is electricity.parent().parent()
+    tree.category('Food')
+    assert [str(category) for category in tree] == [
+        'Housing', 'Housing > Utilities', 'Housing > Utilities > Electricity', 'Housing > Rent',
+        'Food']
+
+    with pytest.raises(ValueError):
+        tree.category('Housing > > Rent')
+
+
+def test_totals():
+    """
+    Totals include subcategories, over any date range
+    """
+    logbook = Logbook()
+    totals = CategoryTotals(date(2015, 1, 1))
+    logbook.subscribe(totals)
+    acc = logbook.add_account('checking')
+    logbook.bill(acc, Decimal('50.00'), date(2015, 4, 10),
+                 category='Housing > Utilities > Electricity')
+    logbook.bill(acc, Decimal('700.00'), date(2015, 5, 1), category='Housing > Rent')
+    logbook.bill(acc, Decimal('20.00'), date(2015, 7, 1), category='Housing > Rent')
+    logbook.bill(acc, Decimal('9.99'), date(2015, 5, 1))
+    logbook.enter_many([Bill(acc, Decimal('30.00'), date(2015, 6, 30), category='Food'),
+                        Deposit(acc, Decimal('5.00'), date(2015, 6, 1), category='Food')])
+
+    q2 = (date(2015, 4, 1), date(2015, 6, 30))
+    assert totals.total('Housing', *q2) == Decimal('-750.00')
+    assert totals.total('Housing') == Decimal('-770.00')
+    assert totals.total('Housing > Utilities', end=date(2015, 4, 9)) == Decimal('0.00')
+    assert totals.total('Housing > Utilities', start=date(2015, 4, 10)) == Decimal('-50.00')
+    assert totals.total('Food', *q2) == Decimal('-25.00')
+    assert totals.total('Travel') == Decimal('0.00')
+
+    with pytest.raises(ValueError):
+        totals.add(Bill(acc, Decimal('1.00'), date(2014, 12, 31), category='Food'))
+    with pytest.raises(ValueError):
+        totals.add(logbook.transactions()[0])
+    with pytest.raises(ValueError):
+        totals.add(logbook.transactions()[3])
+
+
+def test_recategorize():
+    """
+    Re-categorising moves the amount between categories and their ancestors
+    """
+    totals = CategoryTotals(date(2015, 1, 1))
+    bill = Bill(None, Decimal('50.00'), date(2015, 4, 10), category='Housing > Utilities')
+    totals.add(bill)
+    totals.recategorize(bill, 'Housing > Rent')
+    assert bill.category() is totals.tree().category('Housing > Rent')
+    assert totals.total('Housing > Utilities') == Decimal('0.00')
+    assert totals.total('Housing') == Decimal('-50.00')
+
+    totals.recategorize(bill, 'Food')
+    assert totals.total('Housing') == Decimal('0.00')
+    assert totals.total('Food') == Decimal('-50.00')
+
+    totals.remove(bill)
+    assert totals.total('Food') == Decimal('0.00')
+    with pytest.raises(ValueError):
+        totals.remove(bill)
+
+    other = Bill(None, Decimal('1.00'), date(2015, 4, 10))
+    totals.recategorize(other, 'Food')
+    assert other.category().path() == 'Food'
+    assert totals.total('Food') == Decimal('0.00')
+
+
+def test_recategorize_entered():
+    """
+    Transactions entered without a category are added once they get one
+    """
+    logbook = Logbook()
+    totals = CategoryTotals(date(2015, 1, 1))
+    logbook.subscribe(totals)
+    acc = logbook.add_account('checking')
+    bill = logbook.bill(acc, Decimal('9.99'), date(2015, 5, 1))
+    logbook.enter_many([Deposit(acc, Decimal('5.00'), date(2015, 6, 1))])
+    assert totals.total('Food') == Decimal('0.00')
+
+    totals.recategorize(bill, 'Food > Groceries')
+    totals.recategorize(logbook.transactions()[1], 'Food')
+    assert totals.total('Food') == Decimal('-4.99')
+    totals.recategorize(bill, 'Housing')
+    assert totals.total('Food') == Decimal('5.00')
+    assert totals.total('Housing') == Decimal('-9.99')
+
+    other = logbook.bill(acc, Decimal('1.00'), date(2015, 5, 1))
+    logbook.unsubscribe(totals)
+    unsubscribed = logbook.bill(acc, Decimal('2.00'), date(2015, 5, 1))
+    totals.recategorize(unsubscribed, 'Housing')
+    assert totals.total('Housing') == Decimal('-9.99')
+    totals.recategorize(other, 'Housing')
+    assert totals.total('Housing') == Decimal('-10.99')
+
+
+def test_recategorize_columnar():
+    """
+    Transactions of a ColumnarStore are followed after they are materialised again
+    """
+    logbook = Logbook(store=ColumnarStore())
+    totals = CategoryTotals(date(2015, 1, 1))
+    logbook.subscribe(totals)
+    acc = logbook.add_account('checking')
+    logbook.bill(acc, Decimal('9.99'), date(2015, 5, 1))
+    logbook.enter_many([Bill(acc, Decimal('5.00'), date(2015, 6, 1), category='Food')])
+    gc.collect()
+
+    totals.recategorize(logbook.transactions()[0], 'Food > Groceries')
+    gc.collect()
+    assert logbook.transactions()[0].category() == 'Food > Groceries'
+    assert totals.total('Food') == Decimal('-14.99')
+    logbook.transactions()[1].categorize('Housing')
+    gc.collect()
+    assert totals.total('Food') == Decimal('-9.99')
+    assert totals.total('Housing') == Decimal('-5.00')
+    with pytest.raises(ValueError):
+        totals.add(logbook.transactions()[1])
+    totals.remove(logbook.transactions()[1])
+    assert totals.total('Housing') == Decimal('0.00')
+
+    logbook.transactions()[0].categorize(None)
+    assert totals.total('Food') == Decimal('0.00')
+    logbook.transactions()[0].categorize('Travel')
+    assert totals.total('Travel') == Decimal('-9.99')
+
+
+def test_planned():
+    """
+    Projected occurrences carry their plan's category
+    """
+    totals = CategoryTotals(date(2015, 1, 1), zero=Money('0.00', 'EUR'))
+    plan = PlannedBill(None, Money('100.00', 'EUR'), Monthly(date(2015, 1, 15)),
+                       category='Housing > Rent')
+    for bill in plan.occurrences(date(2015, 1, 1), date(2015, 12, 31)):
+        totals.add(bill)
+    assert totals.total('Housing', date(2015, 4, 1), date(2015, 6, 30)) == Money('-300.00', 'EUR')
+
+
+def test_signed_totals():
+    """
+    Deposits and bills of a category offset each other, also when moved or removed
+    """
+    totals = CategoryTotals(date(2015, 1, 1))
+    refund = Deposit(None, Decimal('30.00'), date(2015, 3, 2), category='Food > Groceries')
+    groceries = Bill(None, Decimal('45.50'), date(2015, 3, 1), category='Food > Groceries')
+    dinner = Bill(None, Decimal('20.00'), date(2015, 3, 5), category='Food')
+    for transaction in (refund, groceries, dinner):
+        totals.add(transaction)
+    assert totals.total('Food > Groceries') == Decimal('-15.50')
+    assert totals.total('Food') == Decimal('-35.50')
+    assert totals.total('Food', start=date(2015, 3, 2), end=date(2015, 3, 4)) == \
+        Decimal('30.00')
+
+    totals.recategorize(refund, 'Food')
+    assert totals.total('Food > Groceries') == Decimal('-45.50')
+    assert totals.total('Food') == Decimal('-35.50')
+    totals.remove(groceries)
+    assert totals.total('Food') == Decimal('10.00')
+
+
+def test_matches_full_scan():
+    """
+    Totals match a full scan, with transactions added and re-categorised in random order
+    """
+    rnd = random.Random(11)
+    paths = ['A', 'A > B', 'A > B > C', 'A > D', 'E']
+    totals = CategoryTotals(date(2015, 1, 1))
+    bills = []
+    for _ in range(300):
+        bill = rnd.choice((Bill, Deposit))(
+            None, Decimal(rnd.randrange(1, 10000)).scaleb(-2),
+            date(2015, 1, 1) + timedelta(days=rnd.randrange(400)), category=rnd.choice(paths))
+        totals.add(bill)
+        bills.append(bill)
+        if rnd.random() < 0.3:
+            totals.recategorize(rnd.choice(bills), rnd.choice(paths))
+
+    for path in paths:
+        for _ in range(10):
+            start = date(2015, 1, 1) + timedelta(days=rnd.randrange(-10, 400))
+            end = start + timedelta(days=rnd.randrange(100))
+            expected = sum(bill.operations()[0].balance_change() for bill in bills
+                           if start <= bill.date() <= end and
+                           (str(bill.category()) + ' >').startswith(path + ' >'))
+            assert totals.total(path, start, end) == expected
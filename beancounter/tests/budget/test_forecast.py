@@ -0,0 +1,72 @@
+from beancounter import Logbook, Forecast, PlannedBill, PlannedIncome, PlannedTransfer, Account
+from beancounter.basics.frequency import Once, Daily, Weekly, Monthly
+from datetime import date, timedelta
+from decimal import Decimal
+import pytest
+
+
+def get_test_logbook():
+    logbook = Logbook()
+    acc1 = logbook.add_account('test account 1', balance=Decimal('100.00'))
+    acc2 = logbook.add_account('test account 2')
+    logbook.deposit(acc1, Decimal('50.00'), date(2014, 12, 1))
+    logbook.bill(acc1, Decimal('30.00'), date(2015, 1, 5))
+    return logbook, acc1, acc2
+
+
+def test_ledger_only():
+    logbook, acc1, acc2 = get_test_logbook()
+    forecast = Forecast(logbook, [], date(2015, 1, 1), date(2015, 1, 10))
+
+    assert forecast.accounts() == [acc1, acc2]
+    assert list(forecast.balances(acc1)) == [15000] * 4 + [12000] * 6
+    assert list(forecast.balances(acc2)) == [0] * 10
+    assert forecast.balance_on(acc1, date(2015, 1, 5)) == Decimal('120.00')
+    with pytest.raises(ValueError):
+        forecast.balance_on(acc1, date(2015, 1, 11))
+
+
+def test_matches_projected_transactions():
+    """
+    Forecast balances match entering every projected occurrence into the Logbook.
+    """
+    logbook, acc1, acc2 = get_test_logbook()
+    outside = Account('outside account')
+    plans = [PlannedBill(acc1, Decimal('1.25'), Daily(date(2014, 12, 30), 3)),
+             PlannedIncome(acc1, Decimal('20.00'), Weekly(date(2015, 1, 2)), end=date(2015, 2, 20)),
+             PlannedTransfer(acc1, acc2, Decimal('7.00'), Monthly(date(2014, 1, 31))),
+             PlannedBill(outside, Decimal('3.00'), Once(date(2015, 2, 1))),
+             PlannedBill(None, Decimal('9.00'), Daily(date(2015, 1, 1))),
+             PlannedIncome(acc2, Decimal('1.00'), Daily(date(2015, 3, 1)))]
+    start, end = date(2015, 1, 1), date(2015, 3, 31)
+    forecast = Forecast(logbook, plans, start, end)
+    assert forecast.accounts() == [acc1, acc2, outside]
+
+    for plan in plans:
+        if plan.account_from() if isinstance(plan, PlannedTransfer) else plan.account():
+            for transaction in plan.occurrences(start, end):
+                logbook.enter(transaction)
+    for account in forecast.accounts():
+        day = start
+        while day <= end:
+            assert forecast.balance_on(account, day) == account.balance_at(day), (account, day)
+            day += timedelta(days=1)
+
+
+def test_first_below():
+    logbook, acc1, acc2 = get_test_logbook()
+    plans = [PlannedBill(acc1, Decimal('10.00'), Daily(date(2015, 1, 1))),
+             PlannedIncome(acc1, Decimal('100.00'), Once(date(2015, 1, 8)))]
+    forecast = Forecast(logbook, plans, date(2015, 1, 1), date(2015, 1, 31))
+
+    assert forecast.first_below(acc1, Decimal('150.00')) == date(2015, 1, 1)
+    assert forecast.first_below(acc1, Decimal('60.00')) == date(2015, 1, 7)
+    assert forecast.first_below(acc1, Decimal('0.00')) == date(2015, 1, 23)
+    assert forecast.first_below(acc1, Decimal('-1000.00')) is None
+    assert forecast.first_below(acc2, Decimal('0.00')) is None
+
+
+def test_invalid_range():
+    logbook = Logbook()
+    with pytest.raises(ValueError):
+        Forecast(logbook, [], date(2015, 1, 2), date(2015, 1, 1))
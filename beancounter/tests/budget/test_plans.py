@@ -1,16 +1,179 @@
 from beancounter.budget.plans import PlannedTransaction
-from beancounter import PlannedBill
+from beancounter import PlannedBill, PlannedIncome, PlannedTransfer, Budget
+from beancounter import Account, Bill, Deposit, Transfer
+from beancounter.basics.frequency import Once, Daily, Weekly, Monthly, Yearly
+from beancounter import Money
+from decimal import Decimal
+from datetime import date, timedelta
+from fractions import Fraction
+import pytest
+import types
+
 
 def test_transaction_creation():
-    pass
+    acc = Account('test account')
+    frequency = Monthly(date(2015, 1, 31))
+    plan = PlannedBill(acc, Decimal('12.50'), frequency, category='rent')
+
+    assert isinstance(plan, PlannedTransaction)
+    assert plan.account() is acc
+    assert plan.amount() == Decimal('12.50')
+    assert plan.frequency() is frequency
+    assert plan.start() == date(2015, 1, 31)
+    assert plan.end() is None
+    assert plan.category() == 'rent'
+
+    bills = list(plan.occurrences(date(2015, 1, 1), date(2015, 3, 31)))
+    assert [bill.date() for bill in bills] == [date(2015, 1, 31), date(2015, 2, 28),
+                                               date(2015, 3, 31)]
+    for bill in bills:
+        assert type(bill) is Bill
+        assert bill.entered() == bill.date()
+        assert bill.operations()[0].account() is acc
+        assert bill.operations()[0].balance_change() == Decimal('-12.50')
+
+
+def test_income_and_transfer():
+    acc1 = Account('test account 1')
+    acc2 = Account('test account 2')
+
+    deposit, = PlannedIncome(acc1, Decimal('100.00'), Once(date(2015, 3, 1))).occurrences(
+        date(2015, 1, 1), date(2015, 12, 31))
+    assert type(deposit) is Deposit
+    assert deposit.date() == date(2015, 3, 1)
+    assert deposit.operations()[0].balance_change() == Decimal('100.00')
+
+    transfer, = PlannedTransfer(acc1, acc2, Decimal('20.00'), Once(date(2015, 3, 1))).occurrences(
+        date(2015, 1, 1), date(2015, 12, 31))
+    assert type(transfer) is Transfer
+    assert [op.account() for op in transfer.operations()] == [acc1, acc2]
+    assert [op.balance_change() for op in transfer.operations()] == [Decimal('-20.00'),
+                                                                     Decimal('20.00')]
+
 
 def test_transaction_entered():
     #no-op for ongoing bill
     pass
 
+
 def test_transaction_accrual():
-    #give range (and accrued balance?), calculate daily cost
-    pass
+    """
+    Ongoing plans accrue their amounts evenly over the days until the next occurrence
+    """
+    plan = PlannedBill(None, Decimal('31.00'), Monthly(date(2015, 1, 1)))
+    assert plan.accrued(date(2015, 1, 1)) == 0
+    assert plan.accrued(date(2015, 1, 11)) == Fraction(10, 31)
+    assert plan.accrued(date(2015, 2, 15)) == Fraction(3, 2)
+    assert plan.accrual(date(2015, 1, 1), date(2015, 1, 31)) == Decimal('31.00')
+    assert plan.accrual(date(2015, 1, 10), date(2015, 2, 14)) == Decimal('37.50')
+    assert plan.accrual(date(2014, 1, 1), date(2015, 12, 31)) == Decimal('372.00')
+    assert plan.accrual(date(2015, 1, 2), date(2015, 1, 1)) == Decimal('0.00')
+
+    plan = PlannedBill(None, Money('7.00', 'EUR'), Weekly(date(2015, 1, 1)),
+                       end=date(2015, 1, 10))
+    assert plan.accrual(date(2015, 1, 1), date(2015, 12, 31)) == Money('10.00', 'EUR')
+    once = PlannedBill(None, Decimal('5.00'), Once(date(2015, 1, 1)))
+    assert once.accrual(date(2015, 1, 1), date(2015, 1, 1)) == Decimal('5.00')
+    assert once.accrual(date(2015, 1, 2), date(2015, 12, 31)) == Decimal('0.00')
+
 
 def test_transaction_end():
-    pass
\ No newline at end of file
+    plan = PlannedBill(None, Decimal('1.00'), Daily(date(2015, 1, 1)), end=date(2015, 1, 10))
+
+    assert plan.count(date(2015, 1, 1), date(2015, 12, 31)) == 10
+    assert [bill.date() for bill in plan.occurrences(date(2015, 1, 8), date(2015, 12, 31))] == \
+        [date(2015, 1, 8), date(2015, 1, 9), date(2015, 1, 10)]
+    assert list(plan.occurrences(date(2015, 1, 11), date(2015, 12, 31))) == []
+
+
+def test_occurrences_lazy():
+    """
+    Occurrences are projected one by one, only within the queried window.
+    """
+    plan = PlannedBill(None, Decimal('1.00'), Daily(date(2000, 1, 1)))
+    occurrences = plan.occurrences(date(2015, 1, 1), date(9999, 12, 31))
+
+    assert isinstance(occurrences, types.GeneratorType)
+    assert next(occurrences).date() == date(2015, 1, 1)
+    assert next(occurrences).date() == date(2015, 1, 2)
+
+
+def test_budget_occurrences():
+    acc = Account('test account')
+    budget = Budget([PlannedBill(acc, Decimal('10.00'), Monthly(date(2015, 1, 15))),
+                     PlannedIncome(acc, Decimal('100.00'), Monthly(date(2015, 1, 1)))])
+    budget.add(PlannedBill(acc, Decimal('5.00'), Once(date(2015, 2, 10))))
+
+    occurrences = budget.occurrences(date(2015, 1, 1), date(2015, 2, 28))
+    assert [(type(tx), tx.date()) for tx in occurrences] == [
+        (Deposit, date(2015, 1, 1)), (Bill, date(2015, 1, 15)), (Deposit, date(2015, 2, 1)),
+        (Bill, date(2015, 2, 10)), (Bill, date(2015, 2, 15))]
+
+
+def test_budget_cached_window():
+    """
+    Queries within the last projected window reuse its transactions; adding a plan resets it.
+    """
+    acc = Account('test account')
+    budget = Budget([PlannedBill(acc, Decimal('10.00'), Daily(date(2015, 1, 1)))])
+
+    occurrences = budget.occurrences(date(2015, 1, 1), date(2015, 12, 31))
+    assert len(occurrences) == 365
+    march = budget.occurrences(date(2015, 3, 1), date(2015, 3, 31))
+    assert [tx.date() for tx in march] == [date(2015, 3, day) for day in range(1, 32)]
+    assert march[0] is occurrences[59]
+
+    budget.add(PlannedIncome(acc, Decimal('1.00'), Once(date(2015, 3, 1))))
+    march = budget.occurrences(date(2015, 3, 1), date(2015, 3, 31))
+    assert len(march) == 32
+    assert march[0] is not occurrences[59]
+
+    assert len(budget.plans()) == 2
+    with pytest.raises(AttributeError):
+        budget.plans().append(PlannedIncome(acc, Decimal('1.00'), Once(date(2015, 3, 2))))
+
+
+def test_budget_accruals():
+    """
+    Accruals of many plans per period match the sums of daily accruals of each plan
+    """
+    acc = Account('test account')
+    plans = [PlannedBill(acc, Decimal(100 + i % 7), Monthly(date(2015, 1, 1 + i % 28)))
+             for i in range(200)]
+    plans += [PlannedBill(acc, Decimal('3.50'), Weekly(date(2015, 2, 3)), end=date(2015, 5, 20)),
+              PlannedBill(acc, Decimal('1200.00'), Yearly(date(2014, 7, 1))),
+              PlannedIncome(acc, Decimal('1000.00'), Monthly(date(2015, 1, 1)))]
+    budget = Budget(plans)
+    accruals = budget.accruals(Monthly(date(2015, 1, 1)), date(2015, 6, 30))
+
+    assert [start for start, _ in accruals] == [date(2015, month, 1) for month in range(1, 7)]
+    for start, total in accruals:
+        end = Monthly(start).occurrence(1) - timedelta(days=1)
+        days = [start + timedelta(days=n) for n in range((end - start).days + 1)]
+        expected = sum(sum(plan.accrued(day + timedelta(days=1)) - plan.accrued(day)
+                           for day in days) * Fraction(plan.amount()) for plan in plans[:-1])
+        # Rounded once per group of plans with the same schedule, 30 of them.
+        assert abs(Fraction(total) - expected) <= 30 * Fraction(1, 200)
+
+    income, = budget.accruals(Yearly(date(2015, 1, 1)), date(2015, 12, 31), PlannedIncome)
+    assert income == (date(2015, 1, 1), Decimal('12000.00'))
+
+
+def test_budget_accruals_amounts():
+    """
+    Accruals of integer amounts are rounded to minor units; currencies are not mixed
+    """
+    acc = Account('test account')
+    budget = Budget([PlannedBill(acc, 100, Yearly(date(2015, 1, 1))),
+                     PlannedBill(acc, 20, Monthly(date(2015, 1, 1)))])
+    assert budget.accruals(Monthly(date(2015, 1, 1)), date(2015, 1, 31)) == [
+        (date(2015, 1, 1), Decimal('28.49'))]
+
+    budget = Budget([PlannedBill(acc, Money('10.00', 'EUR'), Monthly(date(2015, 1, 1))),
+                     PlannedBill(acc, Money('10.00', 'EUR'), Weekly(date(2015, 1, 1))),
+                     PlannedIncome(acc, Money('10.00', 'USD'), Monthly(date(2015, 1, 1)))])
+    assert budget.accruals(Monthly(date(2015, 1, 1)), date(2015, 1, 31)) == [
+        (date(2015, 1, 1), Money('54.29', 'EUR'))]
+    with pytest.raises(ValueError):
+        budget.accruals(Monthly(date(2015, 1, 1)), date(2015, 1, 31),
+                        (PlannedBill, PlannedIncome))
@@ -0,0 +1,83 @@
+from beancounter import Logbook, AccountReport, TotalReport
+from beancounter.basics.frequency import Monthly
+from datetime import date
+from decimal import Decimal
+
+
+def get_test_logbook():
+    logbook = Logbook()
+    acc1 = logbook.add_account('test account 1', balance=Decimal('100.00'))
+    acc2 = logbook.add_account('test account 2')
+    logbook.deposit(acc1, Decimal('50.00'), date(2014, 12, 1))
+    logbook.bill(acc1, Decimal('30.00'), date(2015, 1, 5))
+    logbook.transfer(acc1, acc2, Decimal('20.00'), date(2015, 3, 10))
+    return logbook, acc1, acc2
+
+
+def test_account_report():
+    logbook, acc1, acc2 = get_test_logbook()
+    report = AccountReport(logbook, acc1, Monthly(date(2015, 1, 1)))
+
+    assert report.account() is acc1
+    assert report.opening_balance() == Decimal('150.00')
+    assert report.totals() == [(date(2015, 1, 1), Decimal('-30.00')),
+                               (date(2015, 2, 1), Decimal('0.00')),
+                               (date(2015, 3, 1), Decimal('-20.00'))]
+    assert report.balances() == [(date(2015, 1, 1), Decimal('120.00')),
+                                 (date(2015, 2, 1), Decimal('120.00')),
+                                 (date(2015, 3, 1), Decimal('100.00'))]
+
+
+def test_total_report():
+    """
+    Transfers between the Logbook's accounts cancel out; new accounts are included.
+    """
+    logbook, acc1, acc2 = get_test_logbook()
+    report = TotalReport(logbook, Monthly(date(2015, 1, 1)))
+    assert report.totals() == [(date(2015, 1, 1), Decimal('-30.00')),
+                               (date(2015, 2, 1), Decimal('0.00')),
+                               (date(2015, 3, 1), Decimal('0.00'))]
+
+    acc3 = logbook.add_account('test account 3', balance=Decimal('5.00'))
+    logbook.deposit(acc3, Decimal('1.00'), date(2015, 2, 2))
+    assert report.opening_balance() == Decimal('155.00')
+    assert report.balances()[-1] == (date(2015, 3, 1), Decimal('126.00'))
+
+
+def test_incremental_updates():
+    """
+    Entered and recorded operations update the report, the same as building it again.
+    """
+    logbook, acc1, acc2 = get_test_logbook()
+    timeline = Monthly(date(2015, 1, 1))
+    report = AccountReport(logbook, acc2, timeline)
+    assert report.balances()[-1] == (date(2015, 3, 1), Decimal('20.00'))
+
+    logbook.deposit(acc2, Decimal('7.00'), date(2015, 6, 30))
+    logbook.deposit(acc2, Decimal('3.00'), date(2015, 2, 1))
+    logbook.bill(acc2, Decimal('1.00'), date(2014, 1, 1))
+    logbook.transactions()[2].operations()[1].record(date(2015, 4, 1))
+    logbook.transactions()[4].operations()[0].record(date(2015, 2, 3))
+
+    assert len(report.periods()) == 6
+    assert report.opening_balance() == Decimal('-1.00')
+    assert report.balances()[-1] == (date(2015, 6, 1), Decimal('29.00'))
+    assert report.totals(recorded=True) == [
+        (date(2015, 1, 1), Decimal('0.00')), (date(2015, 2, 1), Decimal('3.00')),
+        (date(2015, 3, 1), Decimal('0.00')), (date(2015, 4, 1), Decimal('20.00')),
+        (date(2015, 5, 1), Decimal('0.00')), (date(2015, 6, 1), Decimal('0.00'))]
+    assert report.balances(recorded=True)[-1] == (date(2015, 6, 1), Decimal('23.00'))
+
+    rebuilt = AccountReport(logbook, acc2, timeline)
+    for recorded in (False, True):
+        assert rebuilt.totals(recorded) == report.totals(recorded)
+        assert rebuilt.balances(recorded) == report.balances(recorded)
+        assert rebuilt.opening_balance(recorded) == report.opening_balance(recorded)
+
+
+def test_close():
+    logbook, acc1, acc2 = get_test_logbook()
+    report = AccountReport(logbook, acc1, Monthly(date(2015, 1, 1)))
+    report.close()
+    logbook.deposit(acc1, Decimal('7.00'), date(2015, 1, 2))
+    assert report.totals()[0] == (date(2015, 1, 1), Decimal('-30.00'))
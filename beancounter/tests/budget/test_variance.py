@@ -0,0 +1,120 @@
+from beancounter import Logbook, Budget, PlannedBill, PlannedIncome, PlannedTransfer, \
+    VarianceReport, Bill, Deposit, ColumnarStore
+from beancounter.basics.frequency import Monthly, Once
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+
+def get_test_report(tolerance=3, store=None):
+    """
+    Helper method, a monthly report of rent, salary and a trip against three months of actuals.
+    """
+    logbook = Logbook(store=store)
+    acc1 = logbook.add_account('checking')
+    acc2 = logbook.add_account('savings')
+    budget = Budget([
+        PlannedBill(acc1, Decimal('700.00'), Monthly(date(2015, 1, 1)), category='Rent'),
+        PlannedIncome(acc1, Decimal('2000.00'), Monthly(date(2015, 1, 25))),
+        PlannedBill(None, Decimal('300.00'), Once(date(2015, 2, 14)), category='Travel'),
+        PlannedTransfer(acc1, acc2, Decimal('100.00'), Monthly(date(2015, 1, 28))),
+    ])
+    logbook.bill(acc1, Decimal('700.00'), date(2014, 12, 30), category='Rent')
+    logbook.bill(acc1, Decimal('700.00'), date(2015, 2, 3), category='Rent')
+    logbook.bill(acc1, Decimal('720.00'), date(2015, 3, 1), category='Rent')
+    logbook.deposit(acc1, Decimal('2000.00'), date(2015, 1, 26))
+    logbook.deposit(acc1, Decimal('2100.00'), date(2015, 2, 25))
+    logbook.bill(acc2, Decimal('350.00'), date(2015, 2, 15), category='Travel')
+    logbook.bill(acc1, Decimal('42.00'), date(2015, 3, 10), category='Rent')
+    logbook.transfer(acc1, acc2, Decimal('100.00'), date(2015, 1, 28))
+    return VarianceReport(budget, logbook, Monthly(date(2015, 1, 1)), tolerance), logbook
+
+
+def test_matches():
+    """
+    Actuals match occurrences of the same type, account and category within the tolerance
+    """
+    report, logbook = get_test_report()
+    rent1, rent2, rent3, salary1, salary2, trip, extra = logbook.transactions()[:7]
+    pairs, unplanned = report.matches(date(2015, 1, 1), date(2015, 3, 31))
+
+    assert [(occurrence.date(), actual) for occurrence, actual in pairs] == [
+        (date(2015, 1, 1), rent1), (date(2015, 1, 25), salary1), (date(2015, 2, 1), rent2),
+        (date(2015, 2, 14), trip), (date(2015, 2, 25), salary2), (date(2015, 3, 1), rent3),
+        (date(2015, 3, 25), None)]
+    assert unplanned == [extra]
+
+
+def test_tolerance():
+    """
+    Actuals further than the tolerance are unplanned
+    """
+    report, logbook = get_test_report(tolerance=1)
+    pairs, unplanned = report.matches(date(2015, 1, 1), date(2015, 3, 31))
+    assert [actual is not None for _, actual in pairs] == [False, True, False, True, True, True,
+                                                           False]
+    assert [transaction.date() for transaction in unplanned] == [date(2015, 2, 3),
+                                                                 date(2015, 3, 10)]
+
+
+def test_table():
+    """
+    Planned and actual totals per period, matched actuals in their occurrences' periods
+    """
+    report, _ = get_test_report()
+    assert report.table(date(2015, 3, 31)) == [
+        (date(2015, 1, 1), Decimal('1300.00'), Decimal('1300.00'), Decimal('0.00')),
+        (date(2015, 2, 1), Decimal('1000.00'), Decimal('1050.00'), Decimal('50.00')),
+        (date(2015, 3, 1), Decimal('1300.00'), Decimal('-762.00'), Decimal('-2062.00'))]
+
+
+def test_columnar_store():
+    """
+    Categorised actuals read back from a ColumnarStore match as they do in a plain list
+    """
+    def matched(report):
+        pairs, unplanned = report.matches(date(2015, 1, 1), date(2015, 3, 31))
+        return ([(occurrence.date(), actual.date() if actual is not None else None)
+                 for occurrence, actual in pairs],
+                [(transaction.date(), transaction.category()) for transaction in unplanned])
+
+    report, _ = get_test_report()
+    columnar, _ = get_test_report(store=ColumnarStore())
+    assert matched(columnar) == matched(report)
+    assert (date(2015, 2, 14), date(2015, 2, 15)) in matched(columnar)[0]
+    assert columnar.table(date(2015, 3, 31)) == report.table(date(2015, 3, 31))
+
+
+def test_match_conditions():
+    """
+    Every match satisfies the join conditions, and every actual is matched at most once or
+    reported as unplanned
+    """
+    rnd = random.Random(3)
+    logbook = Logbook()
+    accounts = [logbook.add_account('account {i}'.format(i=i)) for i in range(3)]
+    categories = ['A', 'B', None]
+    plans = [PlannedBill(rnd.choice(accounts + [None]), Decimal('10.00'),
+                         Monthly(date(2015, 1, rnd.randrange(1, 29))),
+                         category=rnd.choice(categories)) for _ in range(20)]
+    for _ in range(300):
+        kind = rnd.choice((Bill, Bill, Deposit))
+        logbook.enter(kind(rnd.choice(accounts), Decimal('10.00'),
+                           date(2015, 1, 1) + timedelta(days=rnd.randrange(365)),
+                           category=rnd.choice(categories)))
+    report = VarianceReport(Budget(plans), logbook, Monthly(date(2015, 1, 1)), tolerance=5)
+    start, end = date(2015, 1, 1), date(2015, 12, 31)
+    pairs, unplanned = report.matches(start, end)
+
+    taken = set()
+    for occurrence, actual in pairs:
+        if actual is not None:
+            assert type(actual) is type(occurrence)
+            assert actual.category() == occurrence.category()
+            assert occurrence.operations()[0].account() in (None, actual.operations()[0].account())
+            assert abs((actual.date() - occurrence.date()).days) <= 5
+            assert id(actual) not in taken
+            taken.add(id(actual))
+    assert all(transaction.date() >= start and id(transaction) not in taken
+               for transaction in unplanned)
+    assert taken | set(map(id, unplanned)) >= set(map(id, logbook.transactions()))
@@ -0,0 +1,191 @@
+from beancounter import Logbook, ColumnarStore, Account, Deposit, Bill, Money, CategoryTree
+from beancounter.io import binary
+from ..basics.test_utils import objects_equal
+from decimal import Decimal
+from datetime import date
+import pytest
+
+
+def get_saved_logbook(tmp_path, store=None):
+    """
+    Helper method, saves a small Logbook and loads it back.
+    """
+    logbook = Logbook(store=store)
+    acc1 = logbook.add_account('checking', balance=Decimal('100.00'))
+    acc2 = logbook.add_account('savings ☂')
+    logbook.deposit(acc1, Decimal('50.00'), date(2015, 3, 1), date(2015, 3, 2))
+    logbook.bill(acc1, Decimal('20.25'), date(2015, 2, 1), date(2015, 3, 2)).operations()[0] \
+        .record(date(2015, 2, 3))
+    logbook.transfer(acc1, acc2, Decimal('30.00'), date(2015, 3, 15), date(2015, 3, 16))
+
+    path = str(tmp_path / 'ledger.bclb')
+    logbook.save(path)
+    return logbook, Logbook.load(path), path
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_round_trip(tmp_path, store):
+    """
+    A saved Logbook loads with equal accounts and transactions
+    """
+    logbook, loaded, _ = get_saved_logbook(tmp_path, store)
+    acc1, acc2 = loaded.accounts()
+
+    assert [a.name() for a in loaded.accounts()] == ['checking', 'savings ☂']
+    assert acc1.balance() == Decimal('99.75')
+    assert acc1.recorded_balance() == Decimal('79.75')
+    assert acc2.balance() == Decimal('30.00')
+    assert acc1._logbook is loaded
+    assert len(loaded.transactions()) == 3
+
+    deposit, bill, transfer = loaded.transactions()
+    entered = date(2015, 3, 2)
+    assert objects_equal(deposit, Deposit(acc1, Decimal('50.00'), date(2015, 3, 1), entered))
+    expected = Bill(acc1, Decimal('20.25'), date(2015, 2, 1), entered)
+    expected.operations()[0]._recorded = date(2015, 2, 3)
+    assert objects_equal(bill, expected)
+    assert transfer.incoming().account() is acc2
+    assert transfer.amount() == Decimal('30.00')
+
+
+def test_history_round_trip(tmp_path):
+    """
+    Point-in-time balances are available right after loading
+    """
+    logbook, loaded, _ = get_saved_logbook(tmp_path)
+    for original, account in zip(logbook.accounts(), loaded.accounts()):
+        for day in (date(2015, 1, 31), date(2015, 2, 1), date(2015, 3, 1), date(2015, 3, 15)):
+            assert account.balance_at(day) == original.balance_at(day)
+            assert account.recorded_balance_at(day) == original.recorded_balance_at(day)
+
+
+def test_loaded_logbook_is_writable(tmp_path):
+    """
+    A loaded Logbook can be recorded and appended to, without changing the file
+    """
+    _, loaded, path = get_saved_logbook(tmp_path)
+    acc1, acc2 = loaded.accounts()
+    loaded.transactions()[0].operations()[0].record(date(2015, 3, 3))
+    loaded.deposit(acc2, Decimal('1.00'), date(2015, 4, 1))
+
+    assert loaded.transactions()[0].operations()[0].recorded() == date(2015, 3, 3)
+    assert len(loaded.transactions()) == 4
+    assert acc2.balance() == Decimal('31.00')
+
+    reloaded = Logbook.load(path)
+    assert reloaded.transactions()[0].operations()[0].recorded() is None
+    assert len(reloaded.transactions()) == 3
+
+
+def test_pending_round_trip(tmp_path):
+    """
+    Pending operations are indexed again on load, and recording them writes through
+    """
+    logbook, loaded, path = get_saved_logbook(tmp_path)
+    acc1, acc2 = loaded.accounts()
+
+    assert [op.balance_change() for op in loaded.pending(acc1)] == [Decimal('50.00'),
+                                                                    Decimal('-30.00')]
+    assert loaded.pending(acc2) == [loaded.transactions()[2].incoming()]
+    assert loaded.pending_total(acc1) == Decimal('20.00')
+
+    loaded.pending(acc2)[0].record(date(2015, 3, 17))
+    loaded.save(path)
+    assert Logbook.load(path).pending(Logbook.load(path).accounts()[1]) == []
+
+
+def test_money_round_trip(tmp_path):
+    """
+    Money-denominated accounts load with their currency and minor unit balances
+    """
+    logbook = Logbook()
+    acc1 = logbook.add_account('checking', balance=Decimal('100.00'), currency='EUR')
+    acc2 = logbook.add_account('no currency', balance=Money('1.00'))
+    logbook.bill(acc1, Money('20.25', 'EUR'), date(2015, 2, 1))
+    logbook.deposit(acc2, Money('5.00'), date(2015, 2, 2)).operations()[0].record(
+        date(2015, 2, 3))
+    acc3 = logbook.add_account('dollars', currency='USD')
+    logbook.transfer(acc1, acc3, Money('9.00', 'EUR'), date(2015, 2, 4),
+                     amount_in=Money('10.00', 'USD'))
+    path = str(tmp_path / 'ledger.bclb')
+    logbook.save(path)
+
+    acc1, acc2, acc3 = Logbook.load(path).accounts()
+    assert acc1.currency() == 'EUR'
+    assert acc1.balance() == Money('70.75', 'EUR')
+    assert acc3.balance() == Money('10.00', 'USD')
+    assert acc1.initial_balance() == Money('100.00', 'EUR')
+    assert acc1.balance_at(date(2015, 1, 31)) == Money('100.00', 'EUR')
+    assert acc2.balance() == Money('6.00')
+    assert acc2.recorded_balance_at(date(2015, 2, 3)) == Money('6.00')
+    assert acc1._history == logbook.accounts()[0]._history
+
+
+@pytest.mark.parametrize('store', [None, ColumnarStore()])
+def test_category_round_trip(tmp_path, store):
+    """
+    Categories are saved as paths, including the ones changed after entering
+    """
+    logbook = Logbook(store=store)
+    acc = logbook.add_account('checking')
+    tree = CategoryTree()
+    logbook.bill(acc, Decimal('20.25'), date(2015, 2, 1), category=tree.category('Food'))
+    logbook.deposit(acc, Decimal('50.00'), date(2015, 3, 1))
+    logbook.bill(acc, Decimal('1.00'), date(2015, 3, 2), category='Housing > Rent')
+    logbook.transactions()[1].categorize('Salary ☂')
+    path = str(tmp_path / 'ledger.bclb')
+    logbook.save(path)
+
+    loaded = Logbook.load(path)
+    assert [transaction.category() for transaction in loaded.transactions()] == [
+        'Food', 'Salary ☂', 'Housing > Rent']
+    loaded.transactions()[0].categorize(None)
+    loaded.save(path)
+    assert [transaction.category() for transaction in Logbook.load(path).transactions()] == [
+        None, 'Salary ☂', 'Housing > Rent']
+
+
+def test_foreign_accounts(tmp_path):
+    """
+    Accounts outside the Logbook are kept, without joining it
+    """
+    logbook = Logbook()
+    foreign = Account('foreign')
+    logbook.enter(Deposit(foreign, Decimal('5.00'), date(2015, 1, 1)))
+    path = str(tmp_path / 'ledger.bclb')
+    logbook.save(path)
+
+    loaded = Logbook.load(path)
+    assert loaded.accounts() == []
+    assert loaded.transactions()[0].operations()[0].account().name() == 'foreign'
+
+
+def test_path_like(tmp_path):
+    """
+    Logbooks are saved to and loaded from path-like objects too
+    """
+    logbook = Logbook()
+    logbook.deposit(logbook.add_account('checking'), Decimal('5.00'), date(2015, 1, 1))
+    path = tmp_path / 'ledger.bclb'
+    logbook.save(path)
+    logbook.save(path)
+    assert Logbook.load(path).accounts()[0].balance() == Decimal('5.00')
+    assert [entry.name for entry in tmp_path.iterdir()] == ['ledger.bclb']
+
+
+def test_not_a_logbook(tmp_path):
+    """
+    Files of another format or version are rejected
+    """
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a logbook at all, really not' * 2)
+    with pytest.raises(ValueError):
+        Logbook.load(str(path))
+
+    logbook = Logbook()
+    logbook.save(str(path))
+    data = bytearray(path.read_bytes())
+    data[4] = binary.VERSION + 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        Logbook.load(str(path))
@@ -0,0 +1,216 @@
+from beancounter import Logbook, Money, Deposit, Bill
+from beancounter.io.journal import Journal
+from decimal import Decimal
+from datetime import date
+import os
+import pytest
+
+
+def fill_logbook(logbook, currency=None):
+    """
+    Helper method, adds accounts and a few transactions to a Logbook.
+    """
+    acc1 = logbook.add_account('checking', balance=Decimal('100.00'), currency=currency)
+    acc2 = logbook.add_account('savings', currency=currency)
+    logbook.deposit(acc1, acc1.to_amount(Decimal('50.00')), date(2015, 3, 1), date(2015, 3, 2))
+    bill = logbook.bill(acc1, acc1.to_amount(Decimal('20.25')), date(2015, 2, 1),
+                        date(2015, 3, 2))
+    logbook.transfer(acc1, acc2, acc1.to_amount(Decimal('30.00')), date(2015, 3, 15),
+                     date(2015, 3, 16))
+    bill.operations()[0].record(date(2015, 2, 3))
+    return acc1, acc2
+
+
+def assert_recovered(logbook):
+    acc1, acc2 = logbook.accounts()
+    assert [a.name() for a in logbook.accounts()] == ['checking', 'savings']
+    assert acc1.balance() == Decimal('99.75')
+    assert acc1.recorded_balance() == Decimal('79.75')
+    assert acc2.balance() == Decimal('30.00')
+    assert acc1.balance_at(date(2015, 2, 28)) == Decimal('79.75')
+    assert len(logbook.transactions()) == 3
+    assert logbook.transactions()[1].operations()[0].recorded() == date(2015, 2, 3)
+
+
+def test_journal_recovery(tmp_path):
+    """
+    A journaled Logbook is recovered from the journal alone
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path)
+    fill_logbook(journal.open())
+    assert journal.records() == 6
+    journal.close()
+
+    assert_recovered(Journal(path).open())
+
+
+def test_journal_batch(tmp_path):
+    """
+    Every transaction of a batch is journaled with its own index
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path)
+    logbook = journal.open()
+    acc = logbook.add_account('checking')
+    logbook.deposit(acc, Decimal('1.00'), date(2015, 1, 1))
+    logbook.enter_many([Deposit(acc, Decimal('10.00'), date(2015, 1, 2)),
+                        Bill(acc, Decimal('2.50'), date(2015, 1, 3)),
+                        Deposit(acc, Decimal('0.25'), date(2015, 1, 4))])
+    logbook.transactions()[2].operations()[0].record(date(2015, 1, 5))
+    journal.close()
+
+    logbook = Journal(path).open()
+    assert [transaction.amount() for transaction in logbook.transactions()] == [
+        Decimal('1.00'), Decimal('10.00'), Decimal('2.50'), Decimal('0.25')]
+    assert logbook.accounts()[0].balance() == Decimal('8.75')
+    assert logbook.accounts()[0].recorded_balance() == Decimal('-2.50')
+
+
+def test_journal_path_like(tmp_path):
+    """
+    Journals accept path-like objects
+    """
+    path = tmp_path / 'ledger.journal'
+    journal = Journal(path, compact_every=4)
+    fill_logbook(journal.open())
+    journal.close()
+
+    assert_recovered(Journal(path).open())
+    assert (tmp_path / 'ledger.journal.snapshot').exists()
+
+
+@pytest.mark.parametrize('compact_every', [1, 2, 4, 100])
+def test_journal_compaction(tmp_path, compact_every):
+    """
+    Snapshots compact the journal, and recovery combines them with the journal tail
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path, compact_every=compact_every)
+    fill_logbook(journal.open())
+    assert journal.records() == 6 % compact_every
+    journal.close()
+
+    journal = Journal(path)
+    logbook = journal.open()
+    assert_recovered(logbook)
+    logbook.transactions()[0].operations()[0].record(date(2015, 3, 3))
+    journal.checkpoint()
+    assert os.path.getsize(path) == 0
+    journal.close()
+
+    logbook = Journal(path).open()
+    assert logbook.accounts()[0].recorded_balance() == Decimal('129.75')
+
+
+def test_journal_torn_record(tmp_path):
+    """
+    A record torn by a crash is discarded, and journaling continues after the valid part
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path)
+    fill_logbook(journal.open())
+    journal.close()
+    with open(path, 'ab') as stream:
+        stream.write(b'\x20\x00\x00\x00torn')
+
+    journal = Journal(path)
+    logbook = journal.open()
+    assert_recovered(logbook)
+    logbook.deposit(logbook.accounts()[1], Decimal('1.00'), date(2015, 4, 1))
+    journal.close()
+
+    assert Journal(path).open().accounts()[1].balance() == Decimal('31.00')
+
+
+@pytest.mark.parametrize('replaced', [False, True])
+def test_journal_crash_during_checkpoint(tmp_path, replaced):
+    """
+    Recovery is correct whether or not a crashed checkpoint replaced the snapshot
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path)
+    logbook = journal.open()
+    fill_logbook(logbook)
+    journal._write_snapshot(logbook)
+    journal._stream.close()
+    os.replace(path, path + '.old')
+    if replaced:
+        os.replace(path + '.snapshot.tmp', path + '.snapshot')
+
+    assert_recovered(Journal(path).open())
+    assert not os.path.exists(path + '.old')
+    assert not os.path.exists(path + '.snapshot.tmp')
+
+
+def test_journal_initial_logbook(tmp_path):
+    """
+    An existing Logbook can become the initial snapshot of a new journal
+    """
+    path = str(tmp_path / 'ledger.journal')
+    logbook = Logbook()
+    fill_logbook(logbook)
+    journal = Journal(path)
+    assert_recovered(journal.open(logbook))
+    journal.close()
+
+    assert_recovered(Journal(path).open())
+    with pytest.raises(ValueError):
+        Journal(path).open(logbook)
+
+
+@pytest.mark.parametrize('compact_every', [None, 3])
+def test_journal_money_recovery(tmp_path, compact_every):
+    """
+    Money-denominated accounts are recovered with their currency, from journal and snapshot
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path, compact_every=compact_every)
+    fill_logbook(journal.open(), currency='EUR')
+    journal.close()
+
+    logbook = Journal(path).open()
+    assert_recovered(logbook)
+    acc1, acc2 = logbook.accounts()
+    assert acc1.balance() == Money('99.75', 'EUR')
+    assert acc2.currency() == 'EUR'
+    assert logbook.transactions()[2].amount() == Money('30.00', 'EUR')
+
+
+def test_journal_cross_currency_transfer(tmp_path):
+    """
+    Transfers between currencies are recovered with the amounts of both sides
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path)
+    logbook = journal.open()
+    eur = logbook.add_account('eur', currency='EUR')
+    usd = logbook.add_account('usd', currency='USD')
+    logbook.transfer(eur, usd, Money('9.00', 'EUR'), date(2015, 3, 1),
+                     amount_in=Money('10.00', 'USD'))
+    journal.close()
+
+    eur, usd = Journal(path).open().accounts()
+    assert eur.balance() == Money('-9.00', 'EUR')
+    assert usd.balance() == Money('10.00', 'USD')
+
+
+@pytest.mark.parametrize('compact_every', [None, 2])
+def test_journal_categories(tmp_path, compact_every):
+    """
+    Categories of entered transactions and their changes are recovered
+    """
+    path = str(tmp_path / 'ledger.journal')
+    journal = Journal(path, compact_every=compact_every)
+    logbook = journal.open()
+    acc = logbook.add_account('checking')
+    logbook.bill(acc, Decimal('20.25'), date(2015, 2, 1), category='Food')
+    logbook.enter_many([Deposit(acc, Decimal('50.00'), date(2015, 3, 1)),
+                        Bill(acc, Decimal('1.00'), date(2015, 3, 2), category='Housing')])
+    logbook.transactions()[1].categorize('Salary ☂')
+    logbook.transactions()[2].categorize(None)
+    journal.close()
+
+    logbook = Journal(path).open()
+    assert [transaction.category() for transaction in logbook.transactions()] == [
+        'Food', 'Salary ☂', None]
@@ -0,0 +1,182 @@
+from beancounter import Money, Bill, Deposit
+from beancounter.basics.storage import copy_transaction
+from beancounter.io.sqlite import SQLiteStore
+from ..basics.test_utils import objects_equal
+from .test_journal import fill_logbook, assert_recovered
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from datetime import date
+import gc
+import sqlite3
+import pytest
+
+
+def count_rows(path, table):
+    """
+    Helper method, counts the rows of a table as another process would see them.
+    """
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute('SELECT count(*) FROM {table}'.format(table=table)).fetchone()[0]
+    finally:
+        connection.close()
+
+
+@pytest.mark.parametrize('batch_size', [1, 1000])
+def test_round_trip(tmp_path, batch_size):
+    """
+    A Logbook stored in SQLite is recovered with its balances, history and pending operations
+    """
+    path = str(tmp_path / 'ledger.db')
+    store = SQLiteStore(path, batch_size=batch_size)
+    logbook = store.open()
+    fill_logbook(logbook)
+    originals = list(logbook.transactions())
+    store.close()
+
+    store = SQLiteStore(path)
+    logbook = store.open()
+    assert_recovered(logbook)
+    acc1, acc2 = logbook.accounts()
+    assert acc1._history == originals[0].operations()[0].account()._history
+    assert [op.balance_change() for op in logbook.pending(acc1)] == [Decimal('50.00'),
+                                                                     Decimal('-30.00')]
+    deposit, bill, transfer = logbook.transactions()
+    accounts = dict(zip(originals[2].operations()[0].account()._logbook.accounts(),
+                        logbook.accounts()))
+    assert objects_equal(deposit, copy_transaction(originals[0], accounts))
+    assert objects_equal(bill, copy_transaction(originals[1], accounts))
+    assert bill.operations()[0].recorded() == date(2015, 2, 3)
+    assert transfer.incoming().account() is acc2
+    assert transfer.amount() == Decimal('30.00')
+
+    logbook.pending(acc2)[0].record(date(2015, 3, 17))
+    logbook.deposit(acc2, Decimal('1.00'), date(2015, 4, 1))
+    store.close()
+
+    logbook = SQLiteStore(path).open()
+    acc1, acc2 = logbook.accounts()
+    assert acc2.recorded_balance() == Decimal('30.00')
+    assert acc2.balance() == Decimal('31.00')
+    assert logbook.pending(acc2) == [logbook.transactions()[3].operations()[0]]
+    assert list(logbook.query().account(acc2).kind(Deposit)) == [logbook.transactions()[3]]
+
+
+def test_batched_writes(tmp_path):
+    """
+    Changes are written once a batch is full, before reads and on flush()
+    """
+    path = str(tmp_path / 'ledger.db')
+    store = SQLiteStore(path, batch_size=3)
+    logbook = store.open()
+    account = logbook.add_account('checking')
+    logbook.bill(account, Decimal('1.00'), date(2015, 3, 1))
+    logbook.bill(account, Decimal('2.00'), date(2015, 3, 2))
+    assert count_rows(path, 'transactions') == 0
+
+    logbook.bill(account, Decimal('3.00'), date(2015, 3, 3))
+    assert count_rows(path, 'transactions') == 3
+    logbook.enter_many([Bill(account, Decimal('4.00'), date(2015, 3, 4))])
+    assert count_rows(path, 'transactions') == 3
+    store.flush()
+    assert count_rows(path, 'transactions') == 4
+    assert count_rows(path, 'history') == 4
+    store.close()
+
+
+def test_money_round_trip(tmp_path):
+    """
+    Money-denominated and foreign accounts are kept, with transfers between currencies
+    """
+    path = str(tmp_path / 'ledger.db')
+    store = SQLiteStore(path)
+    logbook = store.open()
+    eur = logbook.add_account('eur', balance=Decimal('100.00'), currency='EUR')
+    usd = logbook.add_account('usd', currency='USD')
+    logbook.transfer(eur, usd, Money('9.00', 'EUR'), date(2015, 3, 1),
+                     amount_in=Money('10.00', 'USD'))
+    foreign = SQLiteStore(str(tmp_path / 'other.db')).open().add_account('foreign')
+    logbook.enter(Deposit(foreign, Decimal('5.00'), date(2015, 3, 2)))
+    store.close()
+
+    logbook = SQLiteStore(path).open()
+    eur, usd = logbook.accounts()
+    assert eur.balance() == Money('91.00', 'EUR')
+    assert usd.balance() == Money('10.00', 'USD')
+    assert logbook.transactions()[0].amount_in() == Money('10.00', 'USD')
+    assert logbook.transactions()[1].operations()[0].account().name() == 'foreign'
+
+
+def test_categories(tmp_path):
+    """
+    Categories and their changes are stored, also in databases written without them
+    """
+    path = str(tmp_path / 'ledger.db')
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE transactions ('
+                       'id INTEGER PRIMARY KEY, date INTEGER NOT NULL, entered INTEGER NOT NULL)')
+    connection.close()
+    store = SQLiteStore(path)
+    logbook = store.open()
+    acc = logbook.add_account('checking')
+    logbook.bill(acc, Decimal('20.25'), date(2015, 2, 1), category='Food')
+    logbook.enter_many([Deposit(acc, Decimal('50.00'), date(2015, 3, 1)),
+                        Bill(acc, Decimal('1.00'), date(2015, 3, 2), category='Housing')])
+    store.flush()
+    logbook.transactions()[1].categorize('Salary')
+    logbook.transactions()[2].categorize(None)
+    store.close()
+
+    logbook = SQLiteStore(path).open()
+    assert [transaction.category() for transaction in logbook.transactions()] == [
+        'Food', 'Salary', None]
+
+
+def test_concurrent_readers(tmp_path):
+    """
+    Transactions are read from several threads through the connection pool
+    """
+    path = str(tmp_path / 'ledger.db')
+    store = SQLiteStore(path, readers=2)
+    logbook = store.open()
+    account = logbook.add_account('checking')
+    logbook.enter_rows(('deposit', account, Decimal(i).scaleb(-2), date(2015, 1, 1))
+                       for i in range(1, 201))
+    store.close()
+
+    store = SQLiteStore(path, readers=2)
+    logbook = store.open()
+    transactions = logbook.transactions()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        amounts = list(executor.map(lambda i: transactions[i].amount(), range(200)))
+    assert amounts == [Decimal(i).scaleb(-2) for i in range(1, 201)]
+    assert len(store._pool._opened) <= 2
+    store.close()
+
+
+def test_lazy_pending(tmp_path):
+    """
+    Pending operations are read when first asked for, and stored ones are located by id
+    """
+    path = str(tmp_path / 'ledger #1?%.db')
+    store = SQLiteStore(path)
+    logbook = store.open()
+    acc1, acc2 = fill_logbook(logbook)
+    store.close()
+
+    store = SQLiteStore(path)
+    logbook = store.open()
+    acc1, acc2 = logbook.accounts()
+    assert len(store._views) == 0
+    logbook.deposit(acc1, Decimal('1.00'), date(2015, 4, 1)).operations()[0].record(
+        date(2015, 4, 2))
+    logbook.deposit(acc1, Decimal('2.00'), date(2015, 4, 3))
+    assert [op.balance_change() for op in logbook.pending(acc1)] == [
+        Decimal('50.00'), Decimal('-30.00'), Decimal('2.00')]
+    assert logbook.pending_total(acc2) == Decimal('30.00')
+
+    gc.collect()
+    bill = logbook.transactions()[1]
+    assert store.locate(bill.operations()[0]) == (1, 0)
+    assert store.locate(copy_transaction(bill, {}).operations()[0]) is None
+    store.close()
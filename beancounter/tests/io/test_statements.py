@@ -0,0 +1,172 @@
+from beancounter import Logbook, Deposit, Bill
+from beancounter.io import ColumnMapping, CsvStatement, OfxStatement, Importer
+from ..basics.test_utils import objects_equal
+from decimal import Decimal
+from datetime import date
+import pytest
+
+CSV = '''Date;Account;Description;Amount
+05.01.2015;checking;"Salary
+January";"1 200,00"
+07.01.2015;savings;Groceries;-45,10
+09.01.2015;checking;Rent;-700,00
+'''
+
+OFX = '''OFXHEADER:100
+DATA:OFXSGML
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS>
+<BANKACCTFROM><BANKID>1234<ACCTID>checking</BANKACCTFROM>
+<BANKTRANLIST>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20150105120000<TRNAMT>1200.00<NAME>Salary</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20150109
+<TRNAMT>-700.00
+<NAME>Rent
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+'''
+
+
+def get_import_logbook():
+    """
+    Helper method, creates a Logbook with 'checking' and 'savings' accounts.
+    """
+    logbook = Logbook()
+    accounts = {'checking': logbook.add_account('checking'),
+                'savings': logbook.add_account('savings', balance=Decimal('100.00'))}
+    return logbook, accounts
+
+
+def get_csv_statement(tmp_path, accounts):
+    path = tmp_path / 'statement.csv'
+    path.write_bytes(CSV.encode('utf-8'))
+    mapping = ColumnMapping(date='Date', amount='Amount', account='Account',
+                            description='Description', date_format='%d.%m.%Y',
+                            decimal_point=',', thousands_separator=' ', delimiter=';')
+    return CsvStatement(str(path), accounts, mapping)
+
+
+def test_csv_records(tmp_path):
+    """
+    CSV rows are parsed according to the column mapping
+    """
+    logbook, accounts = get_import_logbook()
+    records = list(get_csv_statement(tmp_path, accounts).records())
+
+    assert [r.account() for r in records] == [accounts['checking'], accounts['savings'],
+                                              accounts['checking']]
+    assert [r.amount() for r in records] == [Decimal('1200.00'), Decimal('-45.10'),
+                                             Decimal('-700.00')]
+    assert [r.date() for r in records] == [date(2015, 1, 5), date(2015, 1, 7), date(2015, 1, 9)]
+    assert records[0].description() == 'Salary\nJanuary'
+    assert records[-1].offset() == len(CSV.encode('utf-8'))
+
+
+def test_csv_import(tmp_path):
+    """
+    Importing a CSV statement enters deposits and bills
+    """
+    logbook, accounts = get_import_logbook()
+    entered = date(2015, 2, 1)
+    importer = Importer(logbook, get_csv_statement(tmp_path, accounts), entered).run()
+
+    assert importer.rows() == 3
+    assert importer.offset() == len(CSV.encode('utf-8'))
+    assert importer.rows_per_second() > 0
+    assert objects_equal(logbook.transactions()[0],
+                         Deposit(accounts['checking'], Decimal('1200.00'), date(2015, 1, 5),
+                                 entered))
+    assert objects_equal(logbook.transactions()[1],
+                         Bill(accounts['savings'], Decimal('45.10'), date(2015, 1, 7), entered))
+    assert accounts['checking'].balance() == Decimal('500.00')
+    assert accounts['savings'].balance() == Decimal('54.90')
+
+
+def test_csv_resume(tmp_path):
+    """
+    An interrupted import can be resumed from its offset
+    """
+    logbook, accounts = get_import_logbook()
+    statement = get_csv_statement(tmp_path, accounts)
+    first = next(statement.records())
+
+    importer = Importer(logbook, statement).run(first.offset())
+    assert importer.rows() == 2
+    assert accounts['checking'].balance() == Decimal('-700.00')
+    assert accounts['savings'].balance() == Decimal('54.90')
+
+
+def test_csv_unmapped_account(tmp_path):
+    """
+    Rows of accounts without a mapping are rejected
+    """
+    logbook, accounts = get_import_logbook()
+    del accounts['savings']
+    with pytest.raises(ValueError):
+        list(get_csv_statement(tmp_path, accounts).records())
+
+
+def test_csv_credit_debit(tmp_path):
+    """
+    Amounts can come from separate credit and debit columns, without a header
+    """
+    path = tmp_path / 'statement.csv'
+    path.write_text('2015-01-05,10.00,\n2015-01-06,,2.50\n')
+    logbook, accounts = get_import_logbook()
+    mapping = ColumnMapping(date=0, credit=1, debit=2, header=False)
+    records = list(CsvStatement(str(path), accounts['checking'], mapping).records())
+
+    assert [r.amount() for r in records] == [Decimal('10.00'), Decimal('-2.50')]
+
+
+def test_ofx_import(tmp_path):
+    """
+    OFX transactions are imported, and can be resumed from an offset
+    """
+    path = tmp_path / 'statement.ofx'
+    path.write_bytes(OFX.encode('ascii'))
+    logbook, accounts = get_import_logbook()
+    statement = OfxStatement(str(path), accounts)
+    records = list(statement.records())
+
+    assert [(r.amount(), r.date(), r.description()) for r in records] == [
+        (Decimal('1200.00'), date(2015, 1, 5), 'Salary'),
+        (Decimal('-700.00'), date(2015, 1, 9), 'Rent')]
+
+    importer = Importer(logbook, statement).run(records[0].offset())
+    assert importer.rows() == 1
+    assert accounts['checking'].balance() == Decimal('-700.00')
+
+
+OFX2 = ('<?xml version="1.0"?><OFX><BANKMSGSRSV1>' + ''.join(
+    '<STMTTRNRS><STMTRS><BANKACCTFROM><ACCTID>{account}</ACCTID></BANKACCTFROM><BANKTRANLIST>'
+    '<STMTTRN><DTPOSTED>2015010{day}</DTPOSTED><TRNAMT>{amount}</TRNAMT><NAME>{name}</NAME>'
+    '</STMTTRN></BANKTRANLIST></STMTRS></STMTTRNRS>'.format(
+        account=account, day=day, amount=amount, name=name)
+    for account, day, amount, name in (('checking', 5, '1200.00', 'Salary'),
+                                       ('savings', 7, '-45.10', 'Groceries'),
+                                       ('checking', 9, '-700.00', 'Rent'))) +
+    '</BANKMSGSRSV1></OFX>')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 64 * 1024])
+def test_ofx_chunks(tmp_path, monkeypatch, chunk_size):
+    """
+    Single-line OFX files are read in chunks, and resumed with the account at the offset
+    """
+    monkeypatch.setattr(OfxStatement, 'CHUNK_SIZE', chunk_size)
+    path = tmp_path / 'statement.ofx'
+    path.write_bytes(OFX2.encode('ascii'))
+    _, accounts = get_import_logbook()
+    statement = OfxStatement(str(path), accounts)
+    records = list(statement.records())
+
+    assert [(r.account(), r.amount(), r.description()) for r in records] == [
+        (accounts['checking'], Decimal('1200.00'), 'Salary'),
+        (accounts['savings'], Decimal('-45.10'), 'Groceries'),
+        (accounts['checking'], Decimal('-700.00'), 'Rent')]
+    assert records[-1].offset() == OFX2.index('</BANKTRANLIST>', OFX2.index('Rent'))
+    for i, record in enumerate(records):
+        assert [(r.account(), r.amount(), r.offset()) for r in statement.records(
+            record.offset())] == [(r.account(), r.amount(), r.offset()) for r in records[i + 1:]]
@@ -0,0 +1,56 @@
+"""
+Compares monthly accruals of many ongoing plans computed by Budget.accruals() with summing each
+plan's daily accruals.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_accruals.py [plans] [years]
+"""
+from beancounter import Budget, PlannedBill
+from beancounter.basics.frequency import Monthly, Weekly
+from datetime import date, timedelta
+from decimal import Decimal
+import sys
+import time
+
+
+def make_plans(count):
+    plans = []
+    for i in range(count):
+        if i % 5:
+            frequency = Monthly(date(2015, 1, 1 + i % 28))
+        else:
+            frequency = Weekly(date(2015, 1, 1 + i % 7))
+        plans.append(PlannedBill(None, Decimal(i % 997 + 1).scaleb(-1), frequency))
+    return plans
+
+
+def per_day(plans, timeline, end):
+    starts = timeline.between(timeline.start, end)
+    totals = []
+    for n, start in enumerate(starts):
+        last = starts[n + 1] - timedelta(days=1) if n + 1 < len(starts) else end
+        total = Decimal('0.00')
+        day = start
+        while day <= last:
+            for plan in plans:
+                total += plan.accrual(day, day)
+            day += timedelta(days=1)
+        totals.append((start, total))
+    return totals
+
+
+def main(count=300, years=1):
+    plans = make_plans(count)
+    timeline = Monthly(date(2015, 1, 1))
+    end = date(2015 + years, 1, 1) - timedelta(days=1)
+    for name, measure in (('per day', lambda: per_day(plans, timeline, end)),
+                          ('accruals', lambda: Budget(plans).accruals(timeline, end))):
+        started = time.perf_counter()
+        measure()
+        print('{name:>9}: {seconds:8.4f} s'.format(name=name,
+                                                   seconds=time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""
+Measures ConcurrentLogbook.enter() throughput with 1 to 8 writer threads, each entering
+transfers between its own pair of accounts, next to a plain Logbook in a single thread.
+
+Writers touching disjoint accounts never wait for each other's account locks; how far the
+throughput scales with threads then depends on the interpreter (on builds with a GIL the
+Python work of all threads is still serialised).
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_concurrent.py [transfers per thread]
+"""
+from beancounter import Logbook, ConcurrentLogbook, Transfer
+from datetime import date, timedelta
+from decimal import Decimal
+import sys
+import threading
+import time
+
+
+def make_transfers(logbook, count, pair):
+    account_from = logbook.add_account('from {pair}'.format(pair=pair))
+    account_to = logbook.add_account('to {pair}'.format(pair=pair))
+    return [Transfer(account_from, account_to, Decimal(i % 997 + 1).scaleb(-2),
+                     date(2015, 1, 1) + timedelta(days=i % 365)) for i in range(count)]
+
+
+def run(logbook, threads, count):
+    batches = [make_transfers(logbook, count, i) for i in range(threads)]
+
+    def write(transfers):
+        for transfer in transfers:
+            logbook.enter(transfer)
+
+    workers = [threading.Thread(target=write, args=(batch,)) for batch in batches]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * count / (time.perf_counter() - started)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print('  Logbook, 1 thread:  {rate:,.0f} transfers/s'.format(rate=run(Logbook(), 1, count)))
+    for threads in (1, 2, 4, 8):
+        print('ConcurrentLogbook, {threads} thread(s): {rate:,.0f} transfers/s'.format(
+            threads=threads, rate=run(ConcurrentLogbook(), threads, count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compares entering statement rows one call at a time with Logbook.enter_rows(), and entering
+prebuilt transactions with Logbook.enter() and Logbook.enter_many().
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_enter_many.py [rows]
+"""
+from beancounter import Logbook
+from beancounter.basics.account import _ROW_TYPES
+from datetime import date, timedelta
+from decimal import Decimal
+import sys
+import time
+
+
+def make_rows(accounts, count):
+    """
+    Generates a deterministic year-like mix of deposit, bill and transfer rows.
+    """
+    start = date(2015, 1, 1)
+    for i in range(count):
+        tx_date = start + timedelta(days=i % 365)
+        amount = Decimal(i % 9973 + 1).scaleb(-2)
+        account = accounts[i % len(accounts)]
+        if i % 10 == 0:
+            yield ('transfer', account, accounts[(i + 1) % len(accounts)], amount, tx_date,
+                   tx_date)
+        elif i % 3 == 0:
+            yield ('deposit', account, amount, tx_date, tx_date)
+        else:
+            yield ('bill', account, amount, tx_date, tx_date)
+
+
+def new_logbook(accounts=20):
+    logbook = Logbook()
+    for i in range(accounts):
+        logbook.add_account('account {i}'.format(i=i))
+    return logbook
+
+
+def per_call(count):
+    logbook = new_logbook()
+    rows = list(make_rows(logbook.accounts(), count))
+    started = time.perf_counter()
+    for row in rows:
+        getattr(logbook, row[0])(*row[1:])
+    return count / (time.perf_counter() - started)
+
+
+def batched(count):
+    logbook = new_logbook()
+    rows = list(make_rows(logbook.accounts(), count))
+    started = time.perf_counter()
+    logbook.enter_rows(rows)
+    return count / (time.perf_counter() - started)
+
+
+def prebuilt(count, enter):
+    logbook = new_logbook()
+    transactions = [_ROW_TYPES[row[0]](*row[1:]) for row in make_rows(logbook.accounts(), count)]
+    started = time.perf_counter()
+    enter(logbook, transactions)
+    return count / (time.perf_counter() - started)
+
+
+def enter_each(logbook, transactions):
+    for transaction in transactions:
+        logbook.enter(transaction)
+
+
+def main(count=200000):
+    measures = (('per call', per_call),
+                ('enter_rows', batched),
+                ('enter', lambda count: prebuilt(count, enter_each)),
+                ('enter_many', lambda count: prebuilt(count, Logbook.enter_many)))
+    for name, measure in measures:
+        print('{name:>10}: {rate:10.0f} rows/s'.format(name=name, rate=measure(count)))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,62 @@
+"""
+Times building a Forecast for thousands of plans over a multi-year horizon, and answering
+"first day below" queries on it.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_forecast.py [plans] [years]
+"""
+from beancounter import Forecast, PlannedBill, PlannedIncome, PlannedTransfer
+from beancounter.basics.frequency import Daily, Weekly, Monthly, Yearly
+from bench_enter_many import make_rows, new_logbook
+from datetime import date
+from decimal import Decimal
+import sys
+import time
+
+
+def make_plans(accounts, count):
+    """
+    Generates a deterministic mix of plans of all frequencies.
+    """
+    start = date(2015, 1, 1)
+    frequencies = [lambda i: Daily(date(2015, 1, 1 + i % 28), 1 + i % 3),
+                   lambda i: Weekly(date(2015, 1, 1 + i % 28), 1 + i % 2),
+                   lambda i: Monthly(date(2015, 1, 1 + i % 31)),
+                   lambda i: Yearly(date(2015, 1 + i % 12, 1 + i % 28))]
+    for i in range(count):
+        frequency = frequencies[i % 4](i)
+        amount = Decimal(i % 997 + 1).scaleb(-2)
+        account = accounts[i % len(accounts)]
+        if i % 10 == 0:
+            yield PlannedTransfer(account, accounts[(i + 1) % len(accounts)], amount, frequency)
+        elif i % 3 == 0:
+            yield PlannedIncome(account, amount, frequency)
+        else:
+            yield PlannedBill(account, amount, frequency, end=date(2015 + i % 5, 12, 31))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logbook = new_logbook()
+    logbook.enter_rows(make_rows(logbook.accounts(), 100000))
+    plans = list(make_plans(logbook.accounts(), count))
+
+    started = time.perf_counter()
+    forecast = Forecast(logbook, plans, date(2015, 1, 1), date(2015 + years - 1, 12, 31))
+    built = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for account in forecast.accounts():
+        forecast.first_below(account, Decimal('0.00'))
+    queried = time.perf_counter() - started
+
+    print('{plans} plans, {accounts} accounts, {years} years: forecast {built:.3f}s, '
+          'first_below for all accounts {queried:.3f}s'.format(
+              plans=count, accounts=len(forecast.accounts()), years=years, built=built,
+              queried=queried))
+
+
+if __name__ == '__main__':
+    main()
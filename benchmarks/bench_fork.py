@@ -0,0 +1,49 @@
+"""
+Compares forking a Logbook (with 1% of its operations not recorded yet) with copying it by a
+pickle round trip, and times balance queries on the forks.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_fork.py [rows] [forks]
+"""
+from beancounter import Logbook
+from bench_enter_many import make_rows
+from datetime import date
+import pickle
+import sys
+import time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    forks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    logbook = Logbook()
+    for i in range(20):
+        logbook.add_account('account {i}'.format(i=i))
+    transactions = logbook.enter_rows(make_rows(logbook.accounts(), count))
+    # All but the latest 1% of the operations have been recorded.
+    logbook.record_many((operation, transaction.date())
+                        for transaction in transactions[:count - count // 100]
+                        for operation in transaction.operations())
+    day = date(2015, 6, 30)
+
+    started = time.perf_counter()
+    pickle.loads(pickle.dumps(logbook))
+    print('pickle round trip: {seconds:.3f}s'.format(seconds=time.perf_counter() - started))
+
+    started = time.perf_counter()
+    scenarios = [logbook.fork() for _ in range(forks)]
+    seconds = time.perf_counter() - started
+    print('{forks} forks: {seconds:.3f}s, {each:.2f}ms each'.format(
+        forks=forks, seconds=seconds, each=seconds / forks * 1000))
+
+    for name, target in (('Logbook', logbook), ('fork', scenarios[-1])):
+        started = time.perf_counter()
+        for _ in range(1000):
+            target.balances_at(day)
+        print('{name:>8} balances_at x1000: {seconds:.3f}s'.format(
+            name=name, seconds=time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Measures the memory taken by a transaction, with its operations, using tracemalloc.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_memory.py [transactions]
+"""
+from beancounter import Account, Deposit, Bill, Transfer
+from datetime import date
+from decimal import Decimal
+import sys
+import tracemalloc
+
+
+def measure(make, count):
+    transactions = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        transactions[i] = make()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    account_from = Account('from')
+    account_to = Account('to')
+    amount = Decimal('12.34')
+    tx_date = date(2015, 3, 1)
+    for name, make in (('Deposit', lambda: Deposit(account_from, amount, tx_date, tx_date)),
+                       ('Bill', lambda: Bill(account_from, amount, tx_date, tx_date)),
+                       ('Transfer', lambda: Transfer(account_from, account_to, amount, tx_date,
+                                                     tx_date))):
+        print('{name:>9}: {size:.0f} bytes per transaction'.format(
+            name=name, size=measure(make, count)))
+
+
+if __name__ == '__main__':
+    main()
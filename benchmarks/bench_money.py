@@ -0,0 +1,61 @@
+"""
+Replays a ledger of about 1M operations with Decimal and with Money amounts, one transaction
+at a time and as a batch, into a list-backed and a ColumnarStore-backed Logbook.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_money.py [transactions]
+"""
+from beancounter import Logbook, ColumnarStore, Money
+from beancounter.basics.account import _ROW_TYPES
+from bench_enter_many import make_rows
+import sys
+import time
+
+
+def new_logbook(store, currency, accounts=20):
+    logbook = Logbook(store=store)
+    for i in range(accounts):
+        logbook.add_account('account {i}'.format(i=i), currency=currency)
+    return logbook
+
+
+def make_transactions(logbook, count, currency):
+    transactions = []
+    for row in make_rows(logbook.accounts(), count):
+        if currency is not None:
+            amount = row[-3]
+            row = row[:-3] + (Money(amount, currency),) + row[-2:]
+        transactions.append(_ROW_TYPES[row[0]](*row[1:]))
+    return transactions
+
+
+def replay(store, currency, count, batch):
+    logbook = new_logbook(store, currency)
+    transactions = make_transactions(logbook, count, currency)
+    started = time.perf_counter()
+    if batch:
+        logbook.enter_many(transactions)
+    else:
+        for transaction in transactions:
+            logbook.enter(transaction)
+    seconds = time.perf_counter() - started
+    logbook.balances_at(transactions[-1].date())
+    return seconds, logbook.transactions().operation_count() if store else sum(
+        len(transaction.operations()) for transaction in transactions)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 900000
+    for store_name, store in (('list', lambda: None), ('columnar', ColumnarStore)):
+        for batch in (False, True):
+            for name, currency in (('Decimal', None), ('Money', 'EUR')):
+                seconds, operations = replay(store(), currency, count, batch)
+                print('{store:>8} {mode:>10} {name:>7}: {operations} operations in '
+                      '{seconds:.2f}s, {rate:,.0f} ops/s'.format(
+                          store=store_name, mode='enter_many' if batch else 'enter', name=name,
+                          operations=operations, seconds=seconds, rate=operations / seconds))
+
+
+if __name__ == '__main__':
+    main()
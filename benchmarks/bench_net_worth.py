@@ -0,0 +1,61 @@
+"""
+Consolidates the net worth of a Logbook with thousands of accounts in a few currencies, and
+compares it with converting each account's balance separately.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_net_worth.py [accounts]
+"""
+from beancounter import Logbook, Money, RateTable
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import sys
+import time
+
+CURRENCIES = ('EUR', 'USD', 'GBP', 'CHF', 'CZK', 'JPY')
+
+
+def make_rates(days=3650):
+    rates = RateTable('EUR')
+    start = date(2010, 1, 1)
+    for currency in CURRENCIES[1:]:
+        for day in range(days):
+            rates.add(currency, start + timedelta(days=day),
+                      Decimal(random.randint(1, 200000)).scaleb(-5))
+    return rates
+
+
+def make_logbook(accounts):
+    logbook = Logbook()
+    for i in range(accounts):
+        currency = CURRENCIES[i % len(CURRENCIES)]
+        account = logbook.add_account('account {i}'.format(i=i), currency=currency)
+        logbook.deposit(account, Money(random.randint(0, 10 ** 7), currency),
+                        date(2010, 1, 1) + timedelta(days=random.randrange(3650)))
+    return logbook
+
+
+def per_account(logbook, rates, on):
+    return sum((rates.convert(account.balance_at(on), on) for account in logbook.accounts()),
+               Money(0, rates.base()))
+
+
+def main():
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    random.seed(14)
+    rates = make_rates()
+    logbook = make_logbook(accounts)
+    days = [date(2011, 1, 1) + timedelta(days=30 * i) for i in range(100)]
+
+    for name, consolidate in (('net_worth', Logbook.net_worth), ('per account', per_account)):
+        started = time.perf_counter()
+        for day in days:
+            consolidate(logbook, rates, day)
+        seconds = time.perf_counter() - started
+        print('{name:>12}: {accounts} accounts at {days} dates in {seconds:.2f}s'.format(
+            name=name, accounts=accounts, days=len(days), seconds=seconds))
+
+
+if __name__ == '__main__':
+    main()
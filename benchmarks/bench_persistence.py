@@ -0,0 +1,52 @@
+"""
+Compares the binary Logbook format (Logbook.save/load) with pickle: file size and load time.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_persistence.py [transactions]
+"""
+from beancounter import Logbook
+from bench_enter_many import make_rows
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def load_pickle(path):
+    with open(path, 'rb') as stream:
+        return pickle.load(stream)
+
+
+def main(count=200000):
+    logbook = Logbook()
+    for i in range(20):
+        logbook.add_account('account {i}'.format(i=i))
+    logbook.enter_rows(make_rows(logbook.accounts(), count))
+
+    with tempfile.TemporaryDirectory() as directory:
+        pickle_path = os.path.join(directory, 'ledger.pickle')
+        binary_path = os.path.join(directory, 'ledger.bclb')
+        with open(pickle_path, 'wb') as stream:
+            pickle.dump(logbook, stream)
+        logbook.save(binary_path)
+
+        for name, path, load in (('pickle', pickle_path, load_pickle),
+                                 ('binary', binary_path, Logbook.load)):
+            loaded, seconds = timed(load, path)
+            _, first = timed(lambda: loaded.transactions()[count // 2])
+            print('{name:>7}: {size:6.1f} MB, load {seconds:6.3f} s, '
+                  'first access {first:8.6f} s'.format(
+                      name=name, size=os.path.getsize(path) / 2 ** 20, seconds=seconds,
+                      first=first))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
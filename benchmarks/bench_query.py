@@ -0,0 +1,56 @@
+"""
+Compares a Logbook query touching about 1% of a ledger with a filtered scan of all
+transactions, on a list-backed and a ColumnarStore-backed Logbook.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_query.py [rows]
+"""
+from beancounter import Logbook, ColumnarStore, Bill
+from bench_enter_many import make_rows
+from datetime import date
+from decimal import Decimal
+import sys
+import time
+
+
+def scan(logbook, account, start, end, minimum):
+    return [transaction for transaction in logbook.transactions()
+            if start <= transaction.date() <= end and type(transaction) is Bill and
+            transaction.amount() >= minimum and
+            any(operation.account() is account for operation in transaction.operations())]
+
+
+def query(logbook, account, start, end, minimum):
+    return list(logbook.query().between(start, end).account(account).kind(Bill)
+                .amount(minimum=minimum))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    for store_name, store in (('list', lambda: None), ('columnar', ColumnarStore)):
+        logbook = Logbook(store=store())
+        for i in range(20):
+            logbook.add_account('account {i}'.format(i=i))
+        logbook.enter_rows(make_rows(logbook.accounts(), count))
+        # One account out of 20, for 73 days out of 365: about 1% of the ledger.
+        arguments = (logbook.accounts()[3], date(2015, 3, 1), date(2015, 5, 12), Decimal('5.00'))
+
+        started = time.perf_counter()
+        list(logbook.query().between(date(2015, 1, 1), date(2015, 1, 1)))
+        indexed = time.perf_counter() - started
+        results = {}
+        for name, run in (('scan', scan), ('query', query)):
+            started = time.perf_counter()
+            results[name] = run(logbook, *arguments)
+            seconds = time.perf_counter() - started
+            print('{store:>8} {name:>5}: {found} of {count} transactions in {seconds:.3f}s'.format(
+                store=store_name, name=name, found=len(results[name]), count=count,
+                seconds=seconds))
+        assert sorted(map(id, results['scan'])) == sorted(map(id, results['query']))
+        print('{store:>8} index: built in {seconds:.3f}s'.format(store=store_name,
+                                                                 seconds=indexed))
+
+
+if __name__ == '__main__':
+    main()
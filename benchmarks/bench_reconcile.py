@@ -0,0 +1,51 @@
+"""
+Times reconciling statement records against a Logbook full of unrecorded operations.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_reconcile.py [open operations] [statement lines]
+"""
+from beancounter import Reconciler
+from beancounter.io import StatementRecord
+from bench_enter_many import make_rows, new_logbook
+from datetime import timedelta
+import sys
+import time
+
+
+def make_records(logbook, count):
+    """
+    Builds statement records for every n-th operation, recorded a day after their date.
+    """
+    operations = [operation for transaction in logbook.transactions()
+                  for operation in transaction.operations()]
+    stride = max(1, len(operations) // count)
+    for operation in operations[::stride][:count]:
+        yield StatementRecord(operation.account(), operation.balance_change(),
+                              operation.date() + timedelta(days=1))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+    logbook = new_logbook()
+    logbook.enter_rows(make_rows(logbook.accounts(), count))
+    records = list(make_records(logbook, lines))
+
+    started = time.perf_counter()
+    reconciler = Reconciler(logbook)
+    indexed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pairs = reconciler.reconcile(records)
+    reconciled = time.perf_counter() - started
+
+    matched = sum(1 for _, operation in pairs if operation is not None)
+    print('{count} transactions, {lines} lines: index {indexed:.3f}s, reconcile {reconciled:.3f}s '
+          '({matched} matched, {rate:,.0f} lines/s)'.format(
+              count=count, lines=lines, indexed=indexed, reconciled=reconciled, matched=matched,
+              rate=lines / reconciled))
+
+
+if __name__ == '__main__':
+    main()
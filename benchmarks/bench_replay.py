@@ -0,0 +1,35 @@
+"""
+Times Logbook.verify() with 1, 2, 4 and os.cpu_count() worker processes, on a list-backed and
+a ColumnarStore-backed Logbook.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_replay.py [rows]
+"""
+from beancounter import Logbook, ColumnarStore
+from bench_enter_many import make_rows
+import os
+import sys
+import time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    print('{cpus} CPUs'.format(cpus=os.cpu_count()))
+    for store_name, store in (('list', lambda: None), ('columnar', ColumnarStore)):
+        logbook = Logbook(store=store())
+        for i in range(20):
+            logbook.add_account('account {i}'.format(i=i))
+        logbook.enter_rows(make_rows(logbook.accounts(), count))
+        for processes in sorted({1, 2, 4, os.cpu_count()}):
+            started = time.perf_counter()
+            mismatches = logbook.verify(processes)
+            seconds = time.perf_counter() - started
+            assert not mismatches
+            print('{store:>8}, {processes} processes: {count} transactions in '
+                  '{seconds:.2f}s'.format(store=store_name, processes=processes, count=count,
+                                          seconds=seconds))
+
+
+if __name__ == '__main__':
+    main()
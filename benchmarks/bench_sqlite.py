@@ -0,0 +1,64 @@
+"""
+Writes ledgers of growing size to a SQLiteStore, with batched and unbatched inserts, and
+measures how long re-opening them takes (with 1% of the operations not recorded yet).
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_sqlite.py [rows]
+"""
+from beancounter.io.sqlite import SQLiteStore
+from beancounter.basics.account import _ROW_TYPES
+from bench_enter_many import make_rows
+import os
+import sys
+import tempfile
+import time
+
+
+def write(path, count, batch_size):
+    store = SQLiteStore(path, batch_size=batch_size)
+    logbook = store.open()
+    for i in range(20):
+        logbook.add_account('account {i}'.format(i=i))
+    transactions = [_ROW_TYPES[row[0]](*row[1:])
+                    for row in make_rows(logbook.accounts(), count)]
+    started = time.perf_counter()
+    for transaction in transactions:
+        logbook.enter(transaction)
+    seconds = time.perf_counter() - started
+    # All but the latest 1% of the operations have been recorded.
+    logbook.record_many((operation, transaction.date())
+                        for transaction in transactions[:count - count // 100]
+                        for operation in transaction.operations())
+    store.close()
+    return seconds
+
+
+def reopen(path):
+    started = time.perf_counter()
+    store = SQLiteStore(path)
+    logbook = store.open()
+    seconds = time.perf_counter() - started
+    logbook.balances_at(logbook.transactions()[-1].date())
+    store.close()
+    return seconds
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as directory:
+        for batch_size in (1, 1000):
+            path = os.path.join(directory, 'batch{size}.db'.format(size=batch_size))
+            rows = count // 10 if batch_size == 1 else count
+            seconds = write(path, rows, batch_size)
+            print('enter, batch_size {size:>4}: {rate:,.0f} transactions/s'.format(
+                size=batch_size, rate=rows / seconds))
+        for rows in (count // 100, count // 10, count):
+            path = os.path.join(directory, '{rows}.db'.format(rows=rows))
+            write(path, rows, 1000)
+            print('open, {rows:>8} transactions: {seconds:.3f}s'.format(
+                rows=rows, seconds=reopen(path)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compares the default list storage of a Logbook with ColumnarStore.
+
+Reports memory retained per operation and Logbook.enter throughput. Run from the repository
+root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_storage.py [transactions]
+"""
+from beancounter import Logbook, ColumnarStore, Deposit, Bill, Transfer
+from datetime import date, timedelta
+from decimal import Decimal
+import sys
+import time
+import tracemalloc
+
+
+def make_transactions(logbook, count):
+    """
+    Generates a deterministic mix of deposits, bills and transfers over two accounts.
+    """
+    acc1 = logbook.add_account('checking', balance=Decimal('1000.00'))
+    acc2 = logbook.add_account('savings')
+    start = date(2010, 1, 1)
+    for i in range(count):
+        tx_date = start + timedelta(days=i // 50)
+        amount = Decimal(i % 9973 + 1).scaleb(-2)
+        if i % 10 == 0:
+            yield Transfer(acc1, acc2, amount, tx_date, tx_date)
+        elif i % 3 == 0:
+            yield Deposit(acc1, amount, tx_date, tx_date)
+        else:
+            yield Bill(acc1, amount, tx_date, tx_date)
+
+
+def measure_memory(store, count):
+    """
+    Memory retained by the Logbook per operation, in bytes.
+    """
+    logbook = Logbook(store=store)
+    tracemalloc.start()
+    for transaction in make_transactions(logbook, count):
+        logbook.enter(transaction)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return retained / sum(len(tx.operations()) for tx in logbook.transactions())
+
+
+def measure_rate(store, count):
+    """
+    Transactions built and entered per second.
+    """
+    logbook = Logbook(store=store)
+    started = time.perf_counter()
+    for transaction in make_transactions(logbook, count):
+        logbook.enter(transaction)
+    return count / (time.perf_counter() - started)
+
+
+def main(count=200000):
+    for name, store_class in (('list', lambda: None), ('columnar', ColumnarStore)):
+        per_op = measure_memory(store_class(), count)
+        rate = measure_rate(store_class(), count)
+        print('{name:>10}: {per_op:8.1f} bytes/operation {rate:10.0f} enter/s'.format(
+            name=name, per_op=per_op, rate=rate))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,56 @@
+"""
+Times VarianceReport matching a decade of monthly plans against a ledger of actual bills and
+deposits, and building its monthly table.
+
+Run from the repository root with PYTHONPATH set to it:
+
+    PYTHONPATH=. python benchmarks/bench_variance.py [actuals] [plans]
+"""
+from beancounter import Logbook, Budget, PlannedBill, PlannedIncome, VarianceReport
+from beancounter.basics.frequency import Monthly
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+import sys
+import time
+
+START = date(2005, 1, 1)
+END = date(2014, 12, 31)
+
+
+def make_ledger(actuals, plans, accounts=20, seed=1):
+    rnd = random.Random(seed)
+    logbook = Logbook()
+    accounts = [logbook.add_account('account {i}'.format(i=i)) for i in range(accounts)]
+    categories = ['category {i}'.format(i=i) for i in range(plans)]
+    budget = Budget()
+    for i, category in enumerate(categories):
+        plan_type = PlannedIncome if i % 10 == 0 else PlannedBill
+        budget.add(plan_type(accounts[i % len(accounts)], Decimal(i % 997 + 1),
+                             Monthly(START + timedelta(days=i % 28)), category=category))
+    days = (END - START).days + 1
+    rows = []
+    for i in range(actuals):
+        category = rnd.choice(categories)
+        kind = 'deposit' if categories.index(category) % 10 == 0 else 'bill'
+        tx_date = START + timedelta(days=rnd.randrange(days))
+        rows.append((kind, accounts[categories.index(category) % len(accounts)],
+                     Decimal(rnd.randint(1, 100000)).scaleb(-2), tx_date, tx_date, category))
+    rows.sort(key=lambda row: row[3])
+    logbook.enter_rows(rows)
+    return budget, logbook
+
+
+def main(actuals=200000, plans=100):
+    budget, logbook = make_ledger(actuals, plans)
+    report = VarianceReport(budget, logbook, Monthly(START))
+    for name, measure in (('matches', lambda: report.matches(START, END)),
+                          ('table', lambda: report.table(END))):
+        started = time.perf_counter()
+        measure()
+        print('{name:>8}: {seconds:8.3f} s'.format(name=name,
+                                                   seconds=time.perf_counter() - started))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,82 @@
+"""
+Seeded generators of synthetic ledgers for the benchmarks.
+
+The same parameters and seed always generate the same ledger, so timings of different runs (and
+library versions) are comparable.
+"""
+from beancounter import Logbook, Account
+from beancounter.basics.account import _ROW_TYPES
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+# Default ledger parameters, see make_rows().
+DEFAULTS = {
+    'accounts': 20,
+    'years': 2,
+    'per_day': 100,
+    'transfer_ratio': 0.1,
+    'deposit_ratio': 0.3,
+    'seed': 1,
+}
+
+START = date(2015, 1, 1)
+
+
+def make_rows(accounts, years=2, per_day=100, transfer_ratio=0.1, deposit_ratio=0.3, seed=1):
+    """
+    Generates statement rows (see Logbook.enter_rows()) for years of history, in date order.
+    :param accounts: the accounts of the rows
+    :param years: years of history, from START
+    :param per_day: number of transactions per day
+    :param transfer_ratio: share of transfers between two distinct accounts
+    :param deposit_ratio: share of deposits; the remaining transactions are bills
+    :param seed: random seed
+    """
+    if transfer_ratio + deposit_ratio > 1:
+        raise ValueError('Transfer and deposit ratios add up to more than 1.')
+    if transfer_ratio and len(accounts) < 2:
+        raise ValueError('Transfers need at least two accounts.')
+    rnd = random.Random(seed)
+    for day in range(years * 365):
+        tx_date = START + timedelta(days=day)
+        for _ in range(per_day):
+            amount = Decimal(rnd.randint(1, 100000)).scaleb(-2)
+            kind = rnd.random()
+            account = rnd.choice(accounts)
+            entered = tx_date + timedelta(days=rnd.randint(0, 3))
+            if kind < transfer_ratio:
+                other = rnd.choice(accounts)
+                while other is account:
+                    other = rnd.choice(accounts)
+                yield ('transfer', account, other, amount, tx_date, entered)
+            elif kind < transfer_ratio + deposit_ratio:
+                yield ('deposit', account, amount, tx_date, entered)
+            else:
+                yield ('bill', account, amount, tx_date, entered)
+
+
+def make_accounts(logbook=None, accounts=20):
+    """
+    Returns a list of accounts, added to the Logbook if given.
+    """
+    if logbook is None:
+        return [Account('account {i}'.format(i=i)) for i in range(accounts)]
+    return [logbook.add_account('account {i}'.format(i=i)) for i in range(accounts)]
+
+
+def make_transactions(accounts, **params):
+    """
+    Returns a list of transactions on the accounts, not entered anywhere, see make_rows().
+    """
+    return [_ROW_TYPES[row[0]](*row[1:]) for row in make_rows(accounts, **params)]
+
+
+def make_logbook(accounts=20, **params):
+    """
+    Returns a Logbook with the given number of accounts and its transactions entered, see
+    make_rows().
+    """
+    logbook = Logbook()
+    logbook.enter_rows(make_rows(make_accounts(logbook, accounts), **params))
+    return logbook
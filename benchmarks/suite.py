@@ -0,0 +1,238 @@
+"""
+Benchmark suite of the Logbook, Account, Operation and Frequency hot paths, for catching
+performance regressions, and of the cost of Instrumentation.
+
+Each case runs on a synthetic ledger generated from a fixed seed (see ledger.py), is set up
+afresh and timed `repeat` times; the best time is kept. Results are written as JSON and can be
+compared with a baseline, i.e. the saved results of an earlier run on the same machine with the
+same ledger parameters: the runner exits with status 1 if any case is slower than the baseline
+by more than the tolerance.
+
+Run from the repository root with PYTHONPATH set to it and to benchmarks/ (or use bin/bench):
+
+    PYTHONPATH=.:benchmarks python benchmarks/suite.py --output baseline.json
+    PYTHONPATH=.:benchmarks python benchmarks/suite.py --baseline baseline.json
+"""
+from beancounter import Logbook, Instrumentation
+from beancounter.basics.frequency import Daily
+from itertools import islice
+import argparse
+import gc
+import json
+import ledger
+import pickle
+import platform
+import statistics
+import sys
+import time
+
+FORMAT = 1
+
+
+def _operations(transactions):
+    return [operation for transaction in transactions for operation in transaction.operations()]
+
+
+def logbook_enter(params, *subscribers):
+    logbook = Logbook()
+    for subscriber in subscribers:
+        logbook.subscribe(subscriber)
+    transactions = ledger.make_transactions(ledger.make_accounts(logbook, params['accounts']),
+                                            **_row_params(params))
+
+    def run():
+        enter = logbook.enter
+        for transaction in transactions:
+            enter(transaction)
+        return len(transactions)
+    return run
+
+
+def logbook_enter_instrumented(params):
+    return logbook_enter(params, Instrumentation())
+
+
+def logbook_enter_many(params):
+    logbook = Logbook()
+    transactions = ledger.make_transactions(ledger.make_accounts(logbook, params['accounts']),
+                                            **_row_params(params))
+
+    def run():
+        logbook.enter_many(transactions)
+        return len(transactions)
+    return run
+
+
+def account_enter(params):
+    operations = _operations(ledger.make_transactions(
+        ledger.make_accounts(accounts=params['accounts']), **_row_params(params)))
+
+    def run():
+        for operation in operations:
+            operation._account.enter(operation)
+        return len(operations)
+    return run
+
+
+def account_record(params):
+    operations = _operations(ledger.make_transactions(
+        ledger.make_accounts(accounts=params['accounts']), **_row_params(params)))
+    for operation in operations:
+        operation._account.enter(operation)
+        operation._recorded = operation.date()
+
+    def run():
+        for operation in operations:
+            operation._account.record(operation)
+        return len(operations)
+    return run
+
+
+def operation_record(params):
+    logbook = ledger.make_logbook(**params)
+    operations = _operations(logbook.transactions())
+
+    def run():
+        for operation in operations:
+            operation.record(operation.date())
+        return len(operations)
+    return run
+
+
+def pickle_round_trip(params):
+    logbook = ledger.make_logbook(**params)
+
+    def run():
+        pickle.loads(pickle.dumps(logbook, pickle.HIGHEST_PROTOCOL))
+        return len(logbook.transactions())
+    return run
+
+
+def daily_iteration(params):
+    count = params['years'] * 365 * params['per_day']
+
+    def run():
+        for _ in islice(Daily(ledger.START), count):
+            pass
+        return count
+    return run
+
+
+# Cases by name: each sets up its state from the ledger parameters and returns the timed
+# function, which returns the number of operations it performed.
+CASES = {
+    'logbook_enter': logbook_enter,
+    'logbook_enter_instrumented': logbook_enter_instrumented,
+    'logbook_enter_many': logbook_enter_many,
+    'account_enter': account_enter,
+    'account_record': account_record,
+    'operation_record': operation_record,
+    'pickle_round_trip': pickle_round_trip,
+    'daily_iteration': daily_iteration,
+}
+
+
+def _row_params(params):
+    return {name: value for name, value in params.items() if name != 'accounts'}
+
+
+def measure(case, params, repeat):
+    """
+    Sets up and times a case repeat times.
+    :return: dict of operation count, best and median times in seconds and best rate
+    """
+    times = []
+    for _ in range(repeat):
+        run = case(params)
+        gc.collect()
+        started = time.perf_counter()
+        count = run()
+        times.append(time.perf_counter() - started)
+        del run
+    best = min(times)
+    return {'count': count, 'best': best, 'median': statistics.median(times),
+            'rate': count / best if best else None}
+
+
+def run_suite(params, repeat=5, names=None, log=None):
+    """
+    Runs the cases named (all of them if None) on a ledger generated from params.
+    :param log: stream to print progress to, if given
+    :return: the results, as saved by --output
+    """
+    results = {}
+    for name in names or CASES:
+        if name not in CASES:
+            raise ValueError('Unknown benchmark {name}.'.format(name=name))
+        results[name] = measure(CASES[name], params, repeat)
+        if log is not None:
+            print('{name:>26}: {best:8.4f} s {rate:12.0f} ops/s'.format(
+                name=name, **results[name]), file=log)
+    return {
+        'format': FORMAT,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'params': params,
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compares results with a baseline, case by case.
+    :param tolerance: allowed slowdown, as a fraction of the baseline's best time
+    :return: dict of (best time / baseline best time, regressed) pairs of the cases in both
+    :raises ValueError: if the results are of another format or ledger than the baseline
+    """
+    if baseline.get('format') != results['format']:
+        raise ValueError('Baseline is of format {format}, expected {expected}.'.format(
+            format=baseline.get('format'), expected=results['format']))
+    if baseline['params'] != results['params']:
+        raise ValueError('Baseline ledger {baseline} differs from {params}.'.format(
+            baseline=baseline['params'], params=results['params']))
+    ratios = {}
+    for name, result in results['results'].items():
+        if name in baseline['results']:
+            ratio = result['best'] / baseline['results'][name]['best']
+            ratios[name] = (ratio, ratio > 1 + tolerance)
+    return ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    for name, default in ledger.DEFAULTS.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=type(default), default=default)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--case', action='append', dest='cases', choices=sorted(CASES),
+                        help='case to run, all if not given; may be repeated')
+    parser.add_argument('--output', help='file to write results to, standard output if not given')
+    parser.add_argument('--baseline', help='results file to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown from the baseline (default 0.25, i.e. 25%%)')
+    args = parser.parse_args(argv)
+
+    params = {name: getattr(args, name) for name in ledger.DEFAULTS}
+    results = run_suite(params, args.repeat, args.cases, log=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as stream:
+            json.dump(results, stream, indent=2, sort_keys=True)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        regressed = False
+        for name, (ratio, slower) in compare(results, baseline, args.tolerance).items():
+            regressed = regressed or slower
+            print('{name:>26}: {ratio:6.2f}x baseline{flag}'.format(
+                name=name, ratio=ratio, flag='  REGRESSION' if slower else ''), file=sys.stderr)
+        return 1 if regressed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())